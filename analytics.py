@@ -0,0 +1,195 @@
+import os
+import zoneinfo
+
+import dateutil.tz
+import numpy as np
+import pandas as pd
+
+import columnar
+
+# Formules de 1RM estimé, valables jusqu'à une dizaine de répétitions
+E1RM_FORMULAS = ('epley', 'brzycki')
+
+# Nombre maximal de points envoyés au navigateur par courbe
+CHART_POINT_BUDGET = 400
+
+
+def local_timezone():
+    # Fuseau local nommé, règles d'heure d'été comprises : TZ, sinon la cible
+    # du lien /etc/localtime
+    name = os.environ.get('TZ', '').lstrip(':')
+    if not name and os.path.islink('/etc/localtime'):
+        name = os.path.realpath('/etc/localtime').partition('zoneinfo/')[2]
+    try:
+        return zoneinfo.ZoneInfo(name)
+    except (ValueError, zoneinfo.ZoneInfoNotFoundError):
+        # Windows, TZ au format POSIX : règles du système, conversion plus lente
+        return dateutil.tz.tzlocal()
+
+
+def load_sets(conn, user_id=None):
+    """Séries d'un athlète (ou de tous), en colonnes NumPy.
+
+    Les colonnes viennent de la copie colonnaire projetée en mémoire
+    (columnar.py) ; seuls les noms du catalogue sont lus en SQL.
+    """
+    columns = columnar.load(conn)
+    # Catalogue lu après la synchronisation : il contient tous les exercices copiés
+    catalog = dict(conn.execute('SELECT id, name FROM exercise_catalog').fetchall())
+    if user_id is not None:
+        mask = columns['user_id'] == user_id
+        columns = {name: values[mask] for name, values in columns.items()}
+    return sets_frame(columns, catalog)
+
+
+def sets_frame(columns, catalog):
+    # columns : tableaux session_id, date (epoch), exercise_id, weight, reps
+    exercise_ids = np.array(sorted(catalog), dtype=np.int64)
+    names = [catalog[exercise] for exercise in exercise_ids]
+    codes = np.searchsorted(exercise_ids, columns['exercise_id'])
+
+    return pd.DataFrame({
+        'session_id': columns['session_id'],
+        # Heure locale de chaque séance, avec le décalage de sa propre date
+        'date': pd.to_datetime(columns['date'], unit='s', utc=True)
+        .tz_convert(local_timezone()).tz_localize(None),
+        'exercise': pd.Categorical.from_codes(codes, categories=names) if names
+        else pd.Categorical([]),
+        'weight': columns['weight'],
+        'reps': columns['reps'],
+    }, copy=False)
+
+
+def estimated_1rm(weight, reps, formula='epley'):
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    if formula == 'epley':
+        e1rm = weight * (1 + reps / 30)
+    elif formula == 'brzycki':
+        # Non définie au-delà de 36 répétitions
+        e1rm = np.where(reps < 37, weight * 36 / np.maximum(37 - reps, 1), np.nan)
+    else:
+        raise ValueError(f"Formule inconnue : {formula}")
+    # Une répétition : le 1RM est la charge elle-même
+    return np.where(reps == 1, weight, e1rm)
+
+
+def session_bests(sets, formula='epley'):
+    # Meilleure série de chaque exercice à chaque séance
+    frame = sets.assign(
+        e1rm=estimated_1rm(sets['weight'].to_numpy(), sets['reps'].to_numpy(), formula),
+        volume=sets['weight'].to_numpy() * sets['reps'].to_numpy(),
+    )
+    return (
+        frame.groupby(['exercise', 'session_id'], observed=True, sort=False)
+        .agg(date=('date', 'first'), e1rm=('e1rm', 'max'), top_weight=('weight', 'max'),
+             volume=('volume', 'sum'), sets=('reps', 'size'))
+        .reset_index()
+        .sort_values(['exercise', 'date'], kind='stable')
+        .reset_index(drop=True)
+    )
+
+
+def weekly_volume(sets):
+    # Volume (poids × reps) et nombre de séries par exercice et par semaine
+    week_start = sets['date'].dt.normalize() - pd.to_timedelta(sets['date'].dt.weekday, unit='D')
+    return (
+        sets.assign(week=week_start, volume=sets['weight'].to_numpy() * sets['reps'].to_numpy())
+        .groupby(['exercise', 'week'], observed=True)
+        .agg(volume=('volume', 'sum'), sets=('reps', 'size'))
+        .reset_index()
+    )
+
+
+def pr_timeline(bests):
+    """Séances où le 1RM estimé d'un exercice a dépassé tous les précédents."""
+    running_best = bests.groupby('exercise', observed=True)['e1rm'].cummax()
+    previous_best = running_best.groupby(bests['exercise'], observed=True).shift(1)
+    is_pr = previous_best.isna() | (bests['e1rm'] > previous_best)
+    return bests.loc[is_pr.to_numpy(), ['exercise', 'session_id', 'date', 'e1rm', 'top_weight']]
+
+
+def lttb(x, y, budget):
+    """Indices des points retenus par Largest-Triangle-Three-Buckets.
+
+    Garde le premier et le dernier point, puis dans chaque seau le point
+    qui forme le plus grand triangle avec le point retenu précédent et la
+    moyenne du seau suivant : les pics et les creux survivent.
+    """
+    n = len(y)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # budget - 2 seaux entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    # Moyenne du seau suivant ; pour le dernier seau, le dernier point
+    next_x = np.append(sums_x[1:] / counts[1:], x[-1])
+    next_y = np.append(sums_y[1:] / counts[1:], y[-1])
+
+    selected = np.empty(budget, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket, (start, end) in enumerate(zip(edges[:-1], edges[1:])):
+        area = np.abs(
+            (x[previous] - next_x[bucket]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(frame, x, y, budget=CHART_POINT_BUDGET):
+    # Lignes de `frame` à tracer pour une courbe y(x) d'au plus `budget` points
+    if len(frame) <= budget:
+        return frame
+    x_values = frame[x].to_numpy().astype('datetime64[s]').astype(np.int64)
+    return frame.iloc[lttb(x_values, frame[y].to_numpy(), budget)]
+
+
+def period_volume(weekly, budget=CHART_POINT_BUDGET):
+    """Volume par semaine, ou par mois si les semaines dépassent le budget.
+
+    Les barres sont des sommes : on les regroupe plutôt que d'en écarter.
+    """
+    if len(weekly) <= budget:
+        return weekly, 'semaine'
+    month = weekly['week'].dt.to_period('M').dt.start_time
+    monthly = (
+        weekly.assign(week=month)
+        .groupby('week', as_index=False)
+        .agg(volume=('volume', 'sum'), sets=('sets', 'sum'))
+    )
+    return monthly, 'mois'
+
+
+def calendar_grid(days, year):
+    """Jours d'une année (lignes de db.get_daily_summary) en grille.
+
+    Une ligne par jour de l'année, jours de repos à 0, avec le lundi de sa
+    semaine (colonne de la heatmap) et le jour de la semaine (0 = lundi).
+    """
+    index = pd.date_range(f'{year}-01-01', f'{year}-12-31', freq='D', name='day')
+    frame = pd.DataFrame(days, columns=['day', 'sessions', 'sets', 'volume', 'type'])
+    frame = frame.set_index(pd.to_datetime(frame['day'])).drop(columns='day').reindex(index)
+    frame = frame.fillna({'sessions': 0, 'sets': 0, 'volume': 0.0, 'type': ''})
+    return frame.astype({'sessions': int, 'sets': int}).assign(
+        weekday=index.weekday,
+        week=index - pd.to_timedelta(index.weekday, unit='D'),
+    ).reset_index()
+
+
+def compute(conn, formula='epley', user_id=None):
+    sets = load_sets(conn, user_id)
+    bests = session_bests(sets, formula)
+    return {
+        'sets': sets,
+        'bests': bests,
+        'weekly': weekly_volume(sets),
+        'prs': pr_timeline(bests),
+    }
@@ -1,10 +1,24 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+import concurrent.futures
+from datetime import date, datetime
 import sqlite3
 import json
+import plotly.colors
 import plotly.graph_objects as go
-import os
+from streamlit_calendar import calendar
+import time
+
+import analytics
+import columnar
+import db
+import exporter
+import instrumentation
+import movements
+import program
+import recommendations
+import wods
+import writer
 
 # Configuration de la page
 st.set_page_config(
@@ -13,294 +27,342 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# CSS personnalisé pour le thème sombre et moderne
-st.markdown("""
-<style>
-    /* Thème sombre global */
-    .stApp {
-        background-color: #0E1117;
-        color: #FAFAFA;
-    }
-    
-    /* Style des cartes statistiques */
-    div[data-testid="stMetric"] {
-        background-color: #1E1E1E;
-        padding: 10px;
-        border-radius: 5px;
-        border: 1px solid #333;
-    }
-    
-    /* Style du tableau */
-    .dataframe {
-        background-color: #1E1E1E;
-        color: white;
-    }
-    
-    /* Style des en-têtes de section */
-    h1, h2, h3 {
-        color: #FAFAFA;
-    }
-    
-    /* Style des liens dans la barre latérale */
-    .css-1d391kg {
-        padding-top: 3rem;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Programme d'entraînement
-WORKOUT_PROGRAM = {
-    'PUSH (Lundi)': {
-        'echauffement': ['Tapis (5 min)', 'Élastique'],
-        'exercices': [
-            'Pec deck - 2 séries',
-            'Développé couché machine convergente - 3 séries',
-            'Biceps corde à la poulie (prise marteau) - 3 séries',
-            'Décliné à la machine convergente - 2 séries',
-            'Curl biceps unilatéral poulie - 3 séries',
-            'Dips - 3 séries',
-            'Curl biceps machine - 3 séries',
-            'Développé militaire machine - 3 séries',
-            'Élévation frontale haltère - 3 séries',
-            'Élévation latérale machine - 3 séries'
-        ],
-        'finisher': 'Tapis (20 min de marche)'
-    },
-    'PULL (Mardi)': {
-        'echauffement': ['Tapis (5 min)', 'Élastique'],
-        'exercices': [
-            'Tirage vertical - 3 séries',
-            'Tirage vertical (prise serrée) - 3 séries',
-            'Extension triceps unilatéral poulie haute - 3 séries',
-            'Tirage horizontal (coude levé, arrière d\'épaule) - 3 séries',
-            'Tirage horizontal (coude collé) - 3 séries',
-            'Extension triceps nuque poulie - 3 séries',
-            'Extension triceps unilatéral poulie (prise marteau) - 3 séries'
-        ],
-        'finisher': 'Tapis (20 min de marche)'
-    },
-    'LEG (Mercredi)': {
-        'echauffement': ['Vélo (10 min)', 'Échauffement cheville, genou, hanche'],
-        'exercices': [
-            'Leg extension unilatéral - 4 séries',
-            'Belt squat - 3 séries',
-            'Hip thrust - 3 séries',
-            'Presse - 3 séries',
-            'Abdos - 3 séries',
-            'Lombaires - 3 séries'
-        ],
-        'finisher': 'Tapis (20 min de marche)'
-    },
-    'PUSH (Jeudi)': {
-        'echauffement': ['Tapis (5 min)', 'Élastique'],
-        'exercices': [
-            'Pec deck - 3 séries',
-            'Curl biceps machine - 3 séries',
-            'Développé incliné machine convergente - 4 séries',
-            'Curl biceps (prise marteau) - 4 séries',
-            'Dips - 3 séries',
-            'Développé militaire haltères - 3 séries',
-            'Élévation frontale haltère - 3 séries',
-            'Élévation latérale poulie - 3 séries'
-        ],
-        'finisher': 'Tapis (20 min de marche)'
-    },
-    'PULL (Vendredi)': {
-        'echauffement': ['Tapis (5 min)', 'Élastique'],
-        'exercices': [
-            'Tirage vertical unilatéral - 3 séries',
-            'Extension triceps unilatéral poulie - 3 séries',
-            'Tirage horizontal (prise marteau) - 3 séries',
-            'Extension triceps nuque poulie - 3 séries',
-            'Oiseau à la machine - 3 séries',
-            'Extension triceps à la poulie vis-à-vis - 3 séries'
-        ],
-        'finisher': 'Tapis (20 min de marche)'
-    },
-    'LEG (Samedi)': {
-        'echauffement': ['Vélo (10 min)', 'Échauffement cheville, genou, hanche'],
-        'exercices': [
-            'Leg extension - 3 séries',
-            'Presse - 3 séries',
-            'Fentes - 3 séries',
-            'Ischios - 4 séries',
-            'Hip thrust - 3 séries',
-            'Abdos - 3 séries',
-            'Lombaires - 3 séries'
-        ],
-        'finisher': 'Tapis (20 min de marche)'
-    }
-}
+# Mesure du temps d'exécution du script, affichée en fin de page
+rerun_started = time.perf_counter()
+# Levé jusqu'à la fin du script : un fragment exécuté hors de ce rendu est
+# un rerun du seul fragment
+st.session_state['page_rendering'] = True
 
-def init_database():
-    conn = sqlite3.connect('workout.db')
-    c = conn.cursor()
-    
-    # Table des sessions
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            type TEXT,
-            notes TEXT
+# Reruns de l'interaction en cours : un rerun demandé par le script (rerun())
+# la prolonge, tout autre (widget, chargement) en ouvre une nouvelle
+if st.session_state.pop('rerun_requested', False):
+    st.session_state['interaction_reruns'] = st.session_state.get('interaction_reruns', 0) + 1
+else:
+    st.session_state['interaction_reruns'] = 1
+
+# CSS personnalisé : les couleurs de fond et de texte sont dans
+# .streamlit/config.toml, il ne reste que ce que le thème ne couvre pas
+CUSTOM_CSS = (
+    "<style>"
+    # Style des cartes statistiques
+    'div[data-testid="stMetric"]{background-color:#1E1E1E;padding:10px;border-radius:5px;border:1px solid #333}'
+    # Style du tableau
+    ".dataframe{background-color:#1E1E1E;color:white}"
+    "</style>"
+)
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+# Grandeur colorée dans la heatmap du calendrier
+CALENDAR_METRICS = {'sessions': "Séances", 'volume': "Volume (kg)"}
+WEEKDAYS = ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"]
+
+# Libellés des filtres du catalogue CrossFit
+MOVEMENT_FACETS = {'category': "Catégorie", 'level': "Niveau", 'equipment': "Équipement"}
+
+# Nombre de séances par page de l'historique
+HISTORY_PAGE_SIZE = 20
+
+# Lignes de chaque tableau du panneau de diagnostics
+DIAGNOSTICS_ROWS = 10
+
+# Compteur de connexions ouvertes pendant ce rerun
+connections_at_start = db.connections_opened()
+# Dernière requête notée avant ce rerun
+queries_at_start = instrumentation.last_sequence()
+
+@st.cache_resource
+def startup():
+    # Exécuté une seule fois par processus : migrations du schéma et
+    # analyse du programme d'entraînement
+    db.init_database()
+    return program.compile_program()
+
+PROGRAM = startup()
+
+# Couleur de chaque type de séance dans le calendrier, gris pour les types
+# importés hors programme
+SESSION_TYPE_COLORS = dict(zip(PROGRAM, plotly.colors.qualitative.Plotly))
+
+def save_session(draft_id, warmup_data, finisher_data, notes=''):
+    try:
+        # Les séries validées sont déjà dans le journal : le thread d'écriture
+        # le promeut en séance, la page n'attend pas la fin de l'écriture
+        future = get_writer().submit(db.promote_draft, draft_id, warmup_data, finisher_data, None, notes,
+                                     changes_history=True)
+        st.session_state.setdefault('pending_saves', []).append((draft_id, future))
+        return future
+    except Exception as e:
+        st.error(f"Erreur lors de l'enregistrement de la séance : {str(e)}")
+        return None
+
+def report_pending_saves():
+    # Résultat des sauvegardes envoyées au thread d'écriture lors des reruns précédents
+    pending = []
+    for draft_id, future in st.session_state.get('pending_saves', []):
+        if not future.done():
+            pending.append((draft_id, future))
+        elif future.exception():
+            st.error(f"Erreur lors de l'enregistrement de la séance : {future.exception()}")
+        else:
+            st.success("Séance sauvegardée avec succès !")
+    st.session_state['pending_saves'] = pending
+    return {draft_id for draft_id, _future in pending}
+
+def record_draft_set(exercise_name, position, set_number, weight, reps):
+    try:
+        future = get_writer().submit(db.write_draft_set, st.session_state['draft_id'],
+                                     exercise_name, position, set_number, weight, reps)
+        # Suivie comme les sauvegardes : un échec est signalé par report_draft_writes
+        st.session_state.setdefault('pending_draft_writes', []).append(
+            (exercise_name, set_number, st.session_state.exercises_data[exercise_name][set_number - 1], future)
         )
-    ''')
+    except Exception as e:
+        st.error(f"Erreur lors de l'enregistrement de la série : {str(e)}")
+        # Série non journalisée : elle n'est plus affichée comme validée
+        st.session_state.exercises_data[exercise_name][set_number - 1] = None
+
+def delete_draft_set(exercise_name, set_number):
+    try:
+        future = get_writer().submit(db.remove_draft_set, st.session_state['draft_id'], exercise_name, set_number)
+        st.session_state.setdefault('pending_draft_writes', []).append((exercise_name, set_number, None, future))
+    except Exception as e:
+        st.error(f"Erreur lors de la suppression de la série : {str(e)}")
+
+def report_draft_writes(exercise_name=None, wait=False):
+    # Écritures du journal de séance terminées en erreur (toutes, ou celles
+    # d'un exercice) ; une série non journalisée redevient non validée.
+    # Renvoie le nombre d'échecs
+    failures = 0
+    pending = []
+    for name, set_number, set_data, future in st.session_state.get('pending_draft_writes', []):
+        if exercise_name is not None and name != exercise_name:
+            pending.append((name, set_number, set_data, future))
+            continue
+        if wait:
+            concurrent.futures.wait([future])
+        if not future.done():
+            pending.append((name, set_number, set_data, future))
+        elif future.exception():
+            failures += 1
+            if set_data is None:
+                st.error(f"Erreur lors de la suppression de la série {set_number} ({name}) : {future.exception()}")
+                continue
+            st.error(f"Erreur lors de l'enregistrement de la série {set_number} ({name}) : "
+                     f"{future.exception()}. Validez-la de nouveau.")
+            sets = st.session_state.get('exercises_data', {}).get(name, [])
+            if len(sets) >= set_number and sets[set_number - 1] == set_data:
+                sets[set_number - 1] = None
+    st.session_state['pending_draft_writes'] = pending
+    return failures
+
+def get_open_draft(user_id):
+    try:
+        return db.get_open_draft(user_id)
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération de la séance en cours : {str(e)}")
+        return None
+
+def start_workout(workout, draft_id, draft_sets=(), workout_recommendations=None):
+    st.session_state['workout_started'] = True
+    st.session_state['current_workout'] = workout
+    st.session_state['draft_id'] = draft_id
+    # Suggestions calculées une fois au démarrage, relues à chaque rerun
+    st.session_state['recommendations'] = workout_recommendations or {}
+    st.session_state['exercises_data'] = {}
+    st.session_state['warmup_data'] = []
+    st.session_state['finisher_data'] = None
+    st.session_state['series_count'] = {}
     
-    # Table des exercices
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS exercises (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER,
-            name TEXT,
-            weight REAL,
-            reps INTEGER,
-            FOREIGN KEY (session_id) REFERENCES sessions (id)
-        )
-    ''')
+    # Initialiser les listes pour chaque exercice
+    for exercise in workout.exercises:
+        st.session_state['series_count'][exercise.name] = exercise.num_sets
+        st.session_state['exercises_data'][exercise.name] = []
     
-    # Table des échauffements
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS warmups (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER,
-            activity TEXT,
-            FOREIGN KEY (session_id) REFERENCES sessions (id)
+    # Reprise : replacer les séries déjà validées du journal
+    for exercise_name, set_number, weight, reps in draft_sets:
+        sets = st.session_state['exercises_data'].setdefault(exercise_name, [])
+        while len(sets) < set_number:
+            sets.append(None)
+        sets[set_number - 1] = {'name': exercise_name, 'weight': weight, 'reps': reps}
+        st.session_state['series_count'][exercise_name] = max(
+            st.session_state['series_count'].get(exercise_name, 0), set_number
         )
-    ''')
-    
-    # Table des finishers
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS finishers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER,
-            activity TEXT,
-            duration INTEGER,
-            FOREIGN KEY (session_id) REFERENCES sessions (id)
+
+def rerun():
+    # Rerun compté dans l'interaction en cours par les diagnostics
+    st.session_state['rerun_requested'] = True
+    st.rerun()
+
+def format_date(timestamp, fmt='%d/%m/%Y %H:%M'):
+    # Les dates sont stockées en secondes epoch, affichées en heure locale
+    return datetime.fromtimestamp(timestamp).strftime(fmt)
+
+def get_sessions_page(user_id, days_filter=None, session_type=None, cursor=None):
+    try:
+        return db.get_sessions_page(user_id, days_filter, session_type,
+                                    cursor=cursor, limit=HISTORY_PAGE_SIZE)
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération de l'historique : {str(e)}")
+        return [], None
+
+def search_sessions(user_id, text, days_filter=None, session_type=None):
+    try:
+        return db.search_sessions(text, user_id, days_filter, session_type, limit=HISTORY_PAGE_SIZE)
+    except Exception as e:
+        st.error(f"Erreur lors de la recherche : {str(e)}")
+        return []
+
+@st.cache_resource
+def get_movement_index():
+    # Catalogue CrossFit lu une seule fois par processus ; filtres et
+    # compteurs sont ensuite résolus en mémoire à chaque rerun
+    with db.connection() as conn:
+        return movements.load_index(conn)
+
+def load_movement_index():
+    try:
+        return get_movement_index()
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des mouvements : {str(e)}")
+        return movements.FacetIndex([])
+
+def get_training_years(user_id):
+    try:
+        return db.get_training_years(user_id)
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération du calendrier : {str(e)}")
+        return []
+
+def get_daily_summary(user_id, year):
+    try:
+        # Une lecture de la clé primaire de daily_summary : au plus 366 lignes
+        return db.get_daily_summary(date(year, 1, 1), date(year, 12, 31), user_id)
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération du calendrier : {str(e)}")
+        return []
+
+def get_wods():
+    try:
+        return db.get_wods()
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération des WODs : {str(e)}")
+        return []
+
+def add_wod():
+    # Callback du bouton : le nouveau WOD est sélectionné avant le rerun
+    try:
+        picked = st.session_state.get('wod_movements', [])
+        movement_rows = [
+            (movement_id, st.session_state.get(f"wod_reps_{movement_id}"),
+             st.session_state.get(f"wod_weight_{movement_id}") or None)
+            for movement_id in picked
+        ]
+        wod_type = st.session_state['new_wod_type']
+        st.session_state['wod_id'] = db.create_wod(
+            st.session_state.get('new_wod_name', ''), wod_type,
+            st.session_state['new_wod_time_cap'],
+            st.session_state.get('new_wod_rounds') if wod_type in ["AMRAP", "For Time"] else None,
+            movement_rows, st.session_state.get('new_wod_description', '')
         )
-    ''')
-    
-    conn.commit()
-    conn.close()
+        st.session_state['new_wod_name'] = ""
+        st.session_state['new_wod_description'] = ""
+        st.session_state['wod_movements'] = []
+    except Exception as e:
+        st.error(f"Erreur lors de l'enregistrement du WOD : {str(e)}")
 
-# Initialisation de la base de données au démarrage
-init_database()
+def get_wod_movements(wod_id):
+    try:
+        return db.get_wod_movements(wod_id)
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération du WOD : {str(e)}")
+        return []
 
-def save_session(session_type, exercises_data, warmup_data, finisher_data):
-    session_id = None
+def save_wod_result(wod_id, user_id, rounds, reps, seconds, capped, day, notes):
     try:
-        conn = sqlite3.connect('workout.db')
-        c = conn.cursor()
-        
-        # Enregistrer la séance
-        c.execute('INSERT INTO sessions (date, type, notes) VALUES (?, ?, ?)',
-                  (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), session_type, ''))
-        session_id = c.lastrowid
-        
-        # Enregistrer les activités d'échauffement
-        for activity in warmup_data:
-            c.execute('''
-                INSERT INTO warmups (session_id, activity)
-                VALUES (?, ?)
-            ''', (session_id, activity['name']))
-        
-        # Enregistrer les exercices
-        for exercise in exercises_data:
-            c.execute('''
-                INSERT INTO exercises (session_id, name, weight, reps)
-                VALUES (?, ?, ?, ?)
-            ''', (session_id, exercise['name'], exercise['weight'], exercise['reps']))
-        
-        # Enregistrer l'activité de finisher
-        if finisher_data:
-            c.execute('''
-                INSERT INTO finishers (session_id, activity, duration)
-                VALUES (?, ?, ?)
-            ''', (session_id, finisher_data['name'], finisher_data['duration']))
-        
-        conn.commit()
-        return session_id
+        # Date choisie, à l'heure de la saisie
+        timestamp = int(datetime.combine(day, datetime.now().time()).timestamp())
+        return db.save_wod_result(wod_id, user_id, rounds, reps, seconds, capped, timestamp, notes)
     except Exception as e:
-        st.error(f"Erreur lors de l'enregistrement de la séance : {str(e)}")
+        st.error(f"Erreur lors de l'enregistrement du résultat : {str(e)}")
         return None
-    finally:
-        conn.close()
 
-def get_sessions_history(days_filter=None, session_type=None):
+def get_leaderboard(wod_id, user_id):
     try:
-        conn = sqlite3.connect('workout.db')
-        
-        # Construire la requête de base
-        query = """
-            SELECT 
-                s.id,
-                s.date,
-                s.type,
-                GROUP_CONCAT(DISTINCT w.activity) as warmups,
-                GROUP_CONCAT(DISTINCT e.name || ' (' || e.weight || 'kg x ' || e.reps || ')') as exercises,
-                GROUP_CONCAT(DISTINCT f.activity || ' (' || f.duration || ' min)') as finishers
-            FROM sessions s
-            LEFT JOIN warmups w ON s.id = w.session_id
-            LEFT JOIN exercises e ON s.id = e.session_id
-            LEFT JOIN finishers f ON s.id = f.session_id
-        """
-        
-        conditions = []
-        params = []
-        
-        # Ajouter les conditions de filtrage
-        if days_filter:
-            conditions.append("s.date >= datetime('now', '-' || ? || ' days')")
-            params.append(str(days_filter))
-        
-        if session_type and session_type != "Toutes":
-            conditions.append("s.type = ?")
-            params.append(session_type)
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " GROUP BY s.id, s.date, s.type ORDER BY s.date DESC"
-        
-        # Exécuter la requête
-        df = pd.read_sql_query(query, conn, params=params)
-        
-        # Convertir les résultats en liste de dictionnaires
-        sessions = []
-        for _, row in df.iterrows():
-            session = {
-                'date': row['date'],
-                'type': row['type'],
-                'warmups': row['warmups'].split(',') if row['warmups'] else [],
-                'exercises': row['exercises'].split(',') if row['exercises'] else [],
-                'finishers': row['finishers'].split(',') if row['finishers'] else []
-            }
-            sessions.append(session)
-        
-        return sessions
-        
+        # Lectures de l'index (wod_id, score) de wod_bests, tenu à jour à chaque résultat
+        return db.get_leaderboard(wod_id), db.get_wod_rank(wod_id, user_id)
     except Exception as e:
-        st.error(f"Erreur lors de la récupération de l'historique : {str(e)}")
+        st.error(f"Erreur lors de la récupération du classement : {str(e)}")
+        return [], (None, 0)
+
+def get_wod_stats(user_id):
+    try:
+        return db.get_wod_trends(user_id), db.get_wod_bests(user_id)
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération des statistiques CrossFit : {str(e)}")
+        return [], []
+
+def get_wod_history(wod_id, user_id):
+    try:
+        return db.get_wod_history(wod_id, user_id)
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération des résultats : {str(e)}")
         return []
-    finally:
-        conn.close()
 
-def get_exercise_max_weight(exercise_name):
+def get_session_details(session_id, user_id):
     try:
-        conn = sqlite3.connect('workout.db')
-        # Récupérer le poids max et le nombre de répétitions maximum à ce poids
-        query = """
-            SELECT weight, MAX(reps) as max_reps
-            FROM exercises
-            WHERE name = ?
-            GROUP BY weight
-            ORDER BY weight DESC
-            LIMIT 1
-        """
-        cursor = conn.cursor()
-        cursor.execute(query, (exercise_name,))
-        result = cursor.fetchone()
-        conn.close()
-        
+        return db.get_session_details(session_id, user_id)
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération de la séance : {str(e)}")
+        return None
+
+def with_notes(text, notes):
+    return f"{text} — _{notes}_" if notes else text
+
+def render_session_details(session):
+    if session.get('notes'):
+        st.markdown(f"**Notes:** {session['notes']}")
+
+    if session['warmups']:
+        st.markdown("**Échauffement:**")
+        for warmup in session['warmups']:
+            st.markdown(with_notes(f"- {warmup['activity']}", warmup.get('notes')))
+    
+    if session['exercises']:
+        st.markdown("**Exercices:**")
+        # Regrouper les séries par exercice, dans l'ordre de saisie
+        sets_by_exercise = {}
+        for exercise in session['exercises']:
+            sets_by_exercise.setdefault(exercise['name'], []).append(
+                f"{exercise['weight']} kg × {exercise['reps']}"
+            )
+        for name, sets in sets_by_exercise.items():
+            st.markdown(f"- {name} : {', '.join(sets)}")
+    
+    if session['finishers']:
+        st.markdown("**Finisher:**")
+        for finisher in session['finishers']:
+            st.markdown(with_notes(f"- {finisher['activity']} ({finisher['duration']} min)",
+                                   finisher.get('notes')))
+
+def prepare_export(file_format, user_id, days_filter=None, session_type=None):
+    # Écrit l'export dans un fichier temporaire, bloc par bloc ; le fichier
+    # précédent de la session est supprimé, le dernier l'est avec la session
+    try:
+        previous = st.session_state.pop('history_export', None)
+        if previous:
+            previous['file'].close()
+        st.session_state['history_export'] = {
+            'filters': (user_id, days_filter, session_type), 'format': file_format,
+            'file': exporter.TemporaryExport(file_format, user_id, days_filter, session_type),
+        }
+    except Exception as e:
+        st.error(f"Erreur lors de l'export : {str(e)}")
+
+def get_exercise_max_weight(exercise_name, user_id):
+    try:
+        # Poids max et répétitions à ce poids, lus dans la table des records
+        result = db.get_personal_record(exercise_name, user_id)
+
         if result:
             return {'max_weight': result[0], 'max_reps': result[1]}
         return None
@@ -308,16 +370,294 @@ def get_exercise_max_weight(exercise_name):
         st.error(f"Erreur lors de la récupération du poids max : {str(e)}")
         return None
 
+@st.cache_data
+def get_program_records(session_type, user_id):
+    # Records de tous les exercices de la séance en une seule requête,
+    # gardés en cache jusqu'au prochain save_session
+    records = db.get_personal_records(PROGRAM[session_type].exercise_names, user_id)
+    return {
+        name: {'max_weight': record[0], 'max_reps': record[1]}
+        for name, record in records.items()
+    }
+
+@st.cache_data
+def get_recommendations(session_type, user_id):
+    # Une requête et un calcul NumPy pour tous les exercices de la séance,
+    # gardés en cache par (athlète, type) jusqu'au prochain lot validé
+    return recommendations.recommend(PROGRAM[session_type], user_id)
+
+def load_recommendations(session_type, user_id):
+    try:
+        return get_recommendations(session_type, user_id)
+    except Exception as e:
+        st.error(f"Erreur lors du calcul des suggestions : {str(e)}")
+        return {}
+
+@st.cache_data
+def get_analytics(user_id, formula='epley', version=None):
+    # Séries de l'athlète chargées une fois en colonnes, agrégats vectorisés ;
+    # gardé en cache jusqu'au prochain lot validé par le thread d'écriture.
+    # version (columnar.version) : une copie colonnaire reconstruite ou
+    # prolongée par un autre processus (changes-apply, import) change la clé
+    with db.connection() as conn:
+        progress = analytics.compute(conn, formula, user_id)
+    # Séries projetées en mémoire (columnar) hors du cache : st.cache_data les
+    # copierait (pickle) à chaque rerun, la page n'en affiche que le nombre
+    progress['set_count'] = len(progress.pop('sets'))
+    return progress
+
+def get_users():
+    try:
+        return db.get_users()
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération des athlètes : {str(e)}")
+        return [(db.DEFAULT_USER_ID, "Athlète 1")]
+
+def add_user():
+    # Callback du bouton : exécuté avant le rerun, il peut donc encore
+    # sélectionner le nouvel athlète dans la liste
+    try:
+        st.session_state['user_id'] = db.create_user(st.session_state.get('new_user_name', ''))
+        st.session_state['new_user_name'] = ""
+    except Exception as e:
+        st.error(f"Erreur lors de l'ajout de l'athlète : {str(e)}")
+
+@st.cache_resource
+def get_writer():
+    # Un seul thread d'écriture par processus, partagé par toutes les sessions
+    write_queue = writer.WriteBehindQueue(db.get_pool())
+    # Les records en cache sont périmés dès qu'une séance est validée
+    write_queue.on_commit(get_program_records.clear)
+    write_queue.on_commit(get_recommendations.clear)
+    # Copie colonnaire prolongée avant que les analyses ne soient recalculées
+    write_queue.on_commit(columnar.sync)
+    write_queue.on_commit(get_analytics.clear)
+    return write_queue
+
+def render_diagnostics(render):
+    # Ce rerun, puis les derniers rendus et les requêtes les plus coûteuses
+    # du tampon (toutes sessions et thread d'écriture compris)
+    st.caption(f"Rendu : {render.duration_ms:.0f} ms, dont SQL {render.query_ms:.1f} ms "
+               f"({render.queries} requêtes, {render.rows} lignes)")
+    st.caption(f"Rerun {render.reruns} de cette interaction")
+    events = sorted(instrumentation.thread_queries(queries_at_start),
+                    key=lambda event: event.duration_ms, reverse=True)
+    if events:
+        st.markdown("**Requêtes de ce rerun**")
+        st.dataframe(pd.DataFrame([
+            {'Requête': instrumentation.statement_key(event.sql)[:120],
+             'ms': round(event.duration_ms, 2), 'Lignes': event.rows}
+            for event in events[:DIAGNOSTICS_ROWS]
+        ]), hide_index=True, use_container_width=True)
+
+    st.markdown("**Derniers rendus**")
+    st.dataframe(pd.DataFrame([
+        {'Page': event.page, 'ms': round(event.duration_ms), 'SQL (ms)': round(event.query_ms, 1),
+         'Requêtes': event.queries, 'Rerun': event.reruns}
+        for event in reversed(instrumentation.renders.snapshot()[-DIAGNOSTICS_ROWS:])
+    ]), hide_index=True, use_container_width=True)
+
+    st.markdown("**Requêtes les plus coûteuses**")
+    st.dataframe(pd.DataFrame([
+        {'Requête': group['sql'][:120], 'Appels': group['calls'], 'Total (ms)': round(group['total_ms'], 1),
+         'Max (ms)': round(group['max_ms'], 2), 'Lignes': group['rows']}
+        for group in instrumentation.summarize(instrumentation.queries.snapshot())[:DIAGNOSTICS_ROWS]
+    ]), hide_index=True, use_container_width=True)
+
+@st.fragment
+def render_exercise_block(idx, exercise, max_data, recommendation=None):
+    # Bloc isolé : un clic n'y relance que ce fragment, qui ne lit et
+    # n'écrit que series_count[exercise_name] et exercises_data[exercise_name].
+    # Les boutons modifient l'état avant l'affichage des séries qui le lisent,
+    # aucun st.rerun supplémentaire n'est donc nécessaire
+    block_started = time.perf_counter()
+    # Rerun du seul bloc (clic dans le fragment) : noté comme un rendu
+    fragment_run = not st.session_state.get('page_rendering')
+    block_queries = instrumentation.last_sequence()
+    exercise_name = exercise.name
+    num_sets = exercise.num_sets
+    # Séries de ce bloc dont la journalisation a échoué depuis le dernier clic
+    report_draft_writes(exercise_name)
+
+    # Créer un style CSS personnalisé pour le titre de l'exercice
+    st.markdown(f"""
+        <div style='
+            background-color: #1E1E1E;
+            padding: 10px;
+            border-radius: 5px;
+            margin-bottom: 5px;
+        '>
+            <h3 style='
+                color: white;
+                margin: 0;
+                font-size: 1.5em;
+            '>
+                Exercice {idx} - {exercise_name} ({num_sets} séries)
+            </h3>
+        </div>
+    """, unsafe_allow_html=True)
+
+    with st.expander("", expanded=True):
+        # Afficher le poids max historique en haut de l'exercice
+        if max_data:
+            st.markdown(
+                f"<div style='text-align: right; color: gold;'>Record : {max_data['max_weight']} kg × {max_data['max_reps']} reps</div>",
+                unsafe_allow_html=True
+            )
+
+        # Suggestion pour cette séance, d'après les dernières séances
+        if recommendation and recommendation.sets:
+            weight, reps = recommendation.sets[0]
+            st.caption(
+                f"Suggestion ({recommendation.status}) : {weight:g} kg × {reps} — "
+                f"1RM estimé {recommendation.e1rm:.1f} kg, {recommendation.trend:+.1f} kg/séance "
+                f"sur {recommendation.sessions} séances"
+            )
+
+        # Boutons pour ajouter/supprimer des séries
+        col_add, col_del = st.columns([1, 1])
+        with col_add:
+            if st.button(f"➕ Ajouter une série", key=f"add_{exercise_name}"):
+                st.session_state.series_count[exercise_name] += 1
+
+        with col_del:
+            if st.button(f"➖ Supprimer une série", key=f"del_{exercise_name}"):
+                if st.session_state.series_count[exercise_name] > 1:
+                    st.session_state.series_count[exercise_name] -= 1
+                    if len(st.session_state.exercises_data[exercise_name]) >= st.session_state.series_count[exercise_name]:
+                        removed = st.session_state.exercises_data[exercise_name].pop()
+                        if removed:
+                            delete_draft_set(exercise_name, len(st.session_state.exercises_data[exercise_name]) + 1)
+
+        # Afficher les séries
+        for set_num in range(1, st.session_state.series_count[exercise_name] + 1):
+            st.markdown(f"**Série {set_num}**")
+
+            # Créer des clés uniques sans espaces ni caractères spéciaux
+            safe_exercise_name = exercise_name.replace(" ", "_").replace("(", "").replace(")", "").lower()
+            weight_key = f"weight_{safe_exercise_name}_{set_num}"
+            reps_key = f"reps_{safe_exercise_name}_{set_num}"
+
+            # Vérifier si cette série a déjà été validée
+            set_data = None
+            if exercise_name in st.session_state.exercises_data:
+                if len(st.session_state.exercises_data[exercise_name]) >= set_num:
+                    set_data = st.session_state.exercises_data[exercise_name][set_num - 1]
+            # Sinon, champs pré-remplis avec la suggestion
+            if not set_data and recommendation and recommendation.sets:
+                suggested_weight, suggested_reps = recommendation.suggestion(set_num)
+                set_data = {'weight': suggested_weight, 'reps': suggested_reps}
+
+            # Colonnes pour le poids et les répétitions
+            col1, col2, col3 = st.columns([2, 2, 1])
+
+            with col1:
+                weight = st.number_input(
+                    "Poids (kg)",
+                    min_value=0.0,
+                    value=float(set_data['weight']) if set_data and set_data.get('weight') else 0.0,
+                    step=1.25,
+                    key=weight_key
+                )
+
+            with col2:
+                reps = st.number_input(
+                    "Répétitions",
+                    min_value=0,
+                    value=int(set_data['reps']) if set_data and set_data.get('reps') else 0,
+                    step=1,
+                    key=reps_key
+                )
+
+            with col3:
+                validate_key = f"validate_{safe_exercise_name}_{set_num}"
+                if weight > 0 and reps > 0:
+                    if st.button("✓", key=validate_key):
+                        # Initialiser la liste si elle n'existe pas
+                        if exercise_name not in st.session_state.exercises_data:
+                            st.session_state.exercises_data[exercise_name] = []
+
+                        # S'assurer que la liste a assez d'éléments
+                        while len(st.session_state.exercises_data[exercise_name]) < set_num:
+                            st.session_state.exercises_data[exercise_name].append(None)
+
+                        # Mettre à jour la série
+                        st.session_state.exercises_data[exercise_name][set_num - 1] = {
+                            'name': exercise_name,
+                            'weight': weight,
+                            'reps': reps
+                        }
+                        
+                        # Journaliser la série pour pouvoir reprendre la séance
+                        record_draft_set(exercise_name, idx, set_num, weight, reps)
+
+        # Afficher les séries validées pour cet exercice
+        if exercise_name in st.session_state.exercises_data:
+            st.markdown("### Séries validées")
+            for idx, set_data in enumerate(st.session_state.exercises_data[exercise_name], 1):
+                if set_data:
+                    st.success(f"Série {idx}: {set_data['weight']} kg × {set_data['reps']} reps")
+    
+    st.caption(f"⏱ Rendu du bloc : {(time.perf_counter() - block_started) * 1000:.1f} ms")
+    if fragment_run:
+        instrumentation.record_render(f"💪 Musculation · {exercise_name}", block_started, block_queries)
+
 # Barre latérale
 with st.sidebar:
     st.title("🏋️ Suivi Muscu")
     
+    # Athlète suivi : toutes les lectures et écritures de la page lui sont restreintes
+    st.markdown("### 👤 Athlète")
+    users = dict(get_users())
+    user_id = st.selectbox(
+        "Athlète",
+        list(users),
+        format_func=users.get,
+        key="user_id",
+        label_visibility="collapsed"
+    )
+    with st.expander("Ajouter un athlète"):
+        st.text_input("Nom", key="new_user_name")
+        st.button("Ajouter", on_click=add_user)
+    
+    
     st.markdown("### 📍 Navigation")
     selected_page = st.radio(
         "",
-        ["🏠 Accueil", "💪 Musculation", "🎯 CrossFit", "📊 Historique"],
+        ["🏠 Accueil", "💪 Musculation", "🎯 CrossFit", "📊 Historique", "📅 Calendrier", "📈 Progression"],
         label_visibility="collapsed"
     )
+    
+    # Rempli en fin de script, une fois toutes les requêtes exécutées
+    connections_placeholder = st.empty()
+
+    # Métriques du thread d'écriture
+    with st.expander("File d'écriture"):
+        writer_metrics = get_writer().metrics()
+        st.caption(f"En attente : {writer_metrics['queue_depth']}")
+        st.caption(f"Lots validés : {writer_metrics['batches']} ({writer_metrics['operations']} écritures, "
+                   f"{writer_metrics['errors']} en erreur)")
+        st.caption(f"Taille du dernier lot : {writer_metrics['last_batch_size']} "
+                   f"(max {writer_metrics['max_batch_size']})")
+        st.caption(f"Commit : {writer_metrics['last_commit_ms']:.1f} ms "
+                   f"(moy. {writer_metrics['avg_commit_ms']:.1f} ms, max {writer_metrics['max_commit_ms']:.1f} ms)")
+        if writer_metrics['hook_errors']:
+            st.warning(f"Mises à jour après écriture en échec : {writer_metrics['hook_errors']} "
+                       f"(dernière : {writer_metrics['last_hook_error']})")
+
+    # Diagnostics (facultatifs) : rempli en fin de script, une fois la page rendue
+    show_diagnostics = st.toggle("Diagnostics", key="diagnostics")
+    diagnostics_placeholder = st.empty()
+
+# Changement d'athlète : la séance et l'historique affichés sont les siens.
+# Les écritures en cours du journal de l'athlète précédent se terminent sur
+# son brouillon, mais ne sont plus rapportées sur la séance du nouveau
+if st.session_state.get('active_user') != user_id:
+    st.session_state['active_user'] = user_id
+    for key in ['series_count', 'exercises_data', 'workout_started', 'draft_id', 'current_workout',
+                'pending_draft_writes', 'recommendations', 'history_filters', 'history_cursors',
+                'history_export']:
+        st.session_state.pop(key, None)
 
 # Page principale
 if selected_page == "🏠 Accueil":
@@ -325,103 +665,92 @@ if selected_page == "🏠 Accueil":
     
     # Statistiques rapides
     st.markdown("### 📊 Statistiques Rapides")
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
-    # Récupérer les statistiques depuis la base de données
-    conn = sqlite3.connect('workout.db')
-    c = conn.cursor()
-    
-    # Nombre total de séances
-    c.execute("SELECT COUNT(*) FROM sessions")
-    total_sessions = c.fetchone()[0]
-    
-    # Nombre total d'exercices effectués
-    c.execute("SELECT COUNT(*) FROM exercises")
-    total_exercises = c.fetchone()[0]
-    
-    # Record de poids
-    c.execute("SELECT MAX(weight) FROM exercises")
-    max_weight = c.fetchone()[0] or 0
+    # Compteurs maintenus par les triggers de stats_rollup
+    try:
+        stats = db.get_stats(user_id)
+    except sqlite3.Error as e:
+        st.error(f"Erreur lors de la récupération des statistiques : {str(e)}")
+        stats = {'total_sessions': 0, 'total_sets': 0, 'total_volume': 0, 'max_weight': None}
     
     with col1:
-        st.metric("Nombre total de séances", total_sessions)
+        st.metric("Nombre total de séances", stats['total_sessions'])
     with col2:
-        st.metric("Nombre total d'exercices effectués", total_exercises)
+        st.metric("Nombre total d'exercices effectués", stats['total_sets'])
     with col3:
-        st.metric("Record de poids", f"{max_weight} kg")
+        st.metric("Volume total", f"{stats['total_volume']:,.0f} kg".replace(',', ' '))
+    with col4:
+        st.metric("Record de poids", f"{stats['max_weight'] or 0} kg")
     
     # Dernières performances
     st.markdown("### 🎯 Dernières Performances")
 
     # Récupérer les dernières performances
     try:
-        conn = sqlite3.connect('workout.db')
-        c = conn.cursor()
-        
-        c.execute("""
-            SELECT exercises.name, exercises.weight, exercises.reps, sessions.date
-            FROM exercises
-            JOIN sessions ON exercises.session_id = sessions.id
-            ORDER BY sessions.date DESC
-            LIMIT 10
-        """)
-        performances = c.fetchall()
+        performances = db.get_recent_performances(limit=10, user_id=user_id)
         
         # Créer un DataFrame pour afficher les performances
         if performances:
             df = pd.DataFrame(performances, columns=['Exercice', 'Poids (kg)', 'Répétitions', 'Date'])
-            df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%d/%m/%Y')
+            df['Date'] = df['Date'].map(lambda date: format_date(date, '%d/%m/%Y'))
             st.dataframe(df, use_container_width=True)
         else:
             st.info("Aucune performance enregistrée pour le moment.")
     
     except sqlite3.Error as e:
         st.error(f"Erreur lors de la récupération des données : {str(e)}")
-    finally:
-        conn.close()
 
 elif selected_page == "💪 Musculation":
     st.title("Nouvelle Séance")
     
+    # Brouillons dont la sauvegarde est encore dans la file d'écriture
+    saving_drafts = report_pending_saves()
+    
     # Sélection de la séance
     session_type = st.selectbox(
         "Type de séance",
-        list(WORKOUT_PROGRAM.keys())
+        list(PROGRAM.keys())
     )
     
     if session_type:
-        workout = WORKOUT_PROGRAM[session_type]
+        workout = PROGRAM[session_type]
         
         # Afficher les détails du programme
         with st.expander("Détails du programme", expanded=True):
             st.subheader("Échauffement")
-            for item in workout['echauffement']:
-                st.write(f"• {item}")
+            for item in workout.warmups:
+                st.write(f"• {item.name}")
             
             st.subheader("Exercices")
-            for item in workout['exercices']:
-                st.write(f"• {item}")
+            for item in workout.exercises:
+                st.write(f"• {item.label}")
             
             st.subheader("Finisher")
-            st.write(f"• {workout['finisher']}")
+            st.write(f"• {workout.finisher.name}")
         
         if not st.session_state.get('workout_started', False):
-            if st.button("Commencer la séance"):
-                st.session_state['workout_started'] = True
-                st.session_state['current_workout'] = WORKOUT_PROGRAM[session_type]
-                st.session_state['exercises_data'] = {}  
-                st.session_state['warmup_data'] = []
-                st.session_state['finisher_data'] = None
-                st.session_state['series_count'] = {}
-                
-                # Initialiser les listes pour chaque exercice
-                for exercise in WORKOUT_PROGRAM[session_type]['exercices']:
-                    exercise_name = exercise.split(' - ')[0]
-                    num_sets = int(exercise.split(' - ')[1].split()[0])
-                    st.session_state['series_count'][exercise_name] = num_sets
-                    st.session_state['exercises_data'][exercise_name] = []  
-                
-                st.rerun()
+            # Séance en cours retrouvée dans le journal (rechargement, redémarrage)
+            draft = get_open_draft(user_id)
+            if draft and draft['id'] not in saving_drafts and draft['session_type'] in PROGRAM:
+                st.info(
+                    f"Séance {draft['session_type']} en cours depuis le {format_date(draft['started_at'])} "
+                    f"({len(draft['sets'])} séries validées)"
+                )
+                col_resume, col_discard = st.columns(2)
+                with col_resume:
+                    if st.button("Reprendre la séance"):
+                        start_workout(PROGRAM[draft['session_type']], draft['id'], draft['sets'],
+                                      load_recommendations(draft['session_type'], user_id))
+                        rerun()
+                with col_discard:
+                    if st.button("Abandonner la séance"):
+                        db.discard_draft(draft['id'])
+                        rerun()
+            elif st.button("Commencer la séance"):
+                start_workout(PROGRAM[session_type], db.start_draft(session_type, user_id=user_id),
+                              workout_recommendations=load_recommendations(session_type, user_id))
+                rerun()
         
         if st.session_state.get('workout_started', False):
             workout = st.session_state['current_workout']
@@ -429,147 +758,48 @@ elif selected_page == "💪 Musculation":
             # Suivi de l'échauffement
             st.subheader("Échauffement")
             warmup_data = []
-            for activity in workout['echauffement']:
-                with st.expander(f" {activity}", expanded=True):
-                    default_time = int(activity.split('(')[1].split()[0]) if '(' in activity else 5
+            for activity in workout.warmups:
+                with st.expander(f" {activity.name}", expanded=True):
                     duration = st.number_input(f"Durée (minutes)", 
                                             min_value=1, 
-                                            value=default_time,
-                                            key=f"warmup_{activity}")
-                    notes = st.text_input("Notes", key=f"warmup_notes_{activity}")
+                                            value=activity.default_duration,
+                                            key=f"warmup_{activity.name}")
+                    notes = st.text_input("Notes", key=f"warmup_notes_{activity.name}")
                     warmup_data.append({
-                        'name': activity,
+                        'name': activity.name,
                         'duration': duration,
                         'notes': notes
                     })
             
             # Suivi des exercices
             st.subheader("Exercices")
+
+            try:
+                program_records = get_program_records(workout.name, user_id)
+            except Exception as e:
+                st.error(f"Erreur lors de la récupération des records : {str(e)}")
+                program_records = {}
             
-            for idx, exercise in enumerate(workout['exercices'], 1):
-                exercise_name = exercise.split(' - ')[0]
-                num_sets = int(exercise.split(' - ')[1].split()[0])
-                
-                # Créer un style CSS personnalisé pour le titre de l'exercice
-                st.markdown(f"""
-                    <div style='
-                        background-color: #1E1E1E;
-                        padding: 10px;
-                        border-radius: 5px;
-                        margin-bottom: 5px;
-                    '>
-                        <h3 style='
-                            color: white;
-                            margin: 0;
-                            font-size: 1.5em;
-                        '>
-                            Exercice {idx} - {exercise_name} ({num_sets} séries)
-                        </h3>
-                    </div>
-                """, unsafe_allow_html=True)
-                
-                with st.expander("", expanded=True):
-                    # Afficher le poids max historique en haut de l'exercice
-                    max_data = get_exercise_max_weight(exercise_name)
-                    if max_data:
-                        st.markdown(
-                            f"<div style='text-align: right; color: gold;'>Record : {max_data['max_weight']} kg × {max_data['max_reps']} reps</div>",
-                            unsafe_allow_html=True
-                        )
-                    
-                    # Boutons pour ajouter/supprimer des séries
-                    col_add, col_del = st.columns([1, 1])
-                    with col_add:
-                        if st.button(f"➕ Ajouter une série", key=f"add_{exercise_name}"):
-                            st.session_state.series_count[exercise_name] += 1
-                            st.rerun()
-                    
-                    with col_del:
-                        if st.button(f"➖ Supprimer une série", key=f"del_{exercise_name}"):
-                            if st.session_state.series_count[exercise_name] > 1:
-                                st.session_state.series_count[exercise_name] -= 1
-                                if len(st.session_state.exercises_data[exercise_name]) >= st.session_state.series_count[exercise_name]:
-                                    st.session_state.exercises_data[exercise_name].pop()
-                                st.rerun()
-                    
-                    # Afficher les séries
-                    for set_num in range(1, st.session_state.series_count[exercise_name] + 1):
-                        st.markdown(f"**Série {set_num}**")
-                        
-                        # Créer des clés uniques sans espaces ni caractères spéciaux
-                        safe_exercise_name = exercise_name.replace(" ", "_").replace("(", "").replace(")", "").lower()
-                        weight_key = f"weight_{safe_exercise_name}_{set_num}"
-                        reps_key = f"reps_{safe_exercise_name}_{set_num}"
-                        
-                        # Vérifier si cette série a déjà été validée
-                        set_data = None
-                        if exercise_name in st.session_state.exercises_data:
-                            if len(st.session_state.exercises_data[exercise_name]) >= set_num:
-                                set_data = st.session_state.exercises_data[exercise_name][set_num - 1]
-                        
-                        # Colonnes pour le poids et les répétitions
-                        col1, col2, col3 = st.columns([2, 2, 1])
-                        
-                        with col1:
-                            weight = st.number_input(
-                                "Poids (kg)",
-                                min_value=0.0,
-                                value=float(set_data['weight']) if set_data and set_data.get('weight') else 0.0,
-                                step=1.25,
-                                key=weight_key
-                            )
-                        
-                        with col2:
-                            reps = st.number_input(
-                                "Répétitions",
-                                min_value=0,
-                                value=int(set_data['reps']) if set_data and set_data.get('reps') else 0,
-                                step=1,
-                                key=reps_key
-                            )
-                        
-                        with col3:
-                            validate_key = f"validate_{safe_exercise_name}_{set_num}"
-                            if weight > 0 and reps > 0:
-                                if st.button("✓", key=validate_key):
-                                    # Initialiser la liste si elle n'existe pas
-                                    if exercise_name not in st.session_state.exercises_data:
-                                        st.session_state.exercises_data[exercise_name] = []
-                                    
-                                    # S'assurer que la liste a assez d'éléments
-                                    while len(st.session_state.exercises_data[exercise_name]) < set_num:
-                                        st.session_state.exercises_data[exercise_name].append(None)
-                                    
-                                    # Mettre à jour la série
-                                    st.session_state.exercises_data[exercise_name][set_num - 1] = {
-                                        'name': exercise_name,
-                                        'weight': weight,
-                                        'reps': reps
-                                    }
-                                    st.rerun()
-                    
-                    # Afficher les séries validées pour cet exercice
-                    if exercise_name in st.session_state.exercises_data:
-                        st.markdown("### Séries validées")
-                        for idx, set_data in enumerate(st.session_state.exercises_data[exercise_name], 1):
-                            if set_data:
-                                st.success(f"Série {idx}: {set_data['weight']} kg × {set_data['reps']} reps")
+            for idx, exercise in enumerate(workout.exercises, 1):
+                render_exercise_block(idx, exercise, program_records.get(exercise.name),
+                                      st.session_state.get('recommendations', {}).get(exercise.name))
 
             # Suivi du finisher
             st.subheader("Finisher")
-            with st.expander(f" {workout['finisher']}", expanded=True):
-                default_time = int(workout['finisher'].split('(')[1].split()[0]) if '(' in workout['finisher'] else 20
+            with st.expander(f" {workout.finisher.name}", expanded=True):
                 finisher_duration = st.number_input(f"Durée (minutes)", 
                                               min_value=1, 
-                                              value=default_time,
+                                              value=workout.finisher.default_duration,
                                               key="finisher_duration")
                 finisher_notes = st.text_input("Notes", key="finisher_notes")
                 finisher_data = {
-                    'name': workout['finisher'],
+                    'name': workout.finisher.name,
                     'duration': finisher_duration,
                     'notes': finisher_notes
                 }
             
+            session_notes = st.text_area("Notes de la séance", key="session_notes")
+
             # Bouton de sauvegarde
             if st.button("Sauvegarder la séance"):
                 # Rassembler toutes les données validées
@@ -579,15 +809,20 @@ elif selected_page == "💪 Musculation":
                 
                 if not all_exercises_data:
                     st.error("Aucun exercice n'a été validé. Veuillez valider au moins un exercice avant de sauvegarder.")
+                # La séance est promue depuis le journal : toutes ses séries doivent y être
+                elif report_draft_writes(wait=True):
+                    st.error("Des séries n'ont pas été enregistrées : revalidez-les avant de sauvegarder.")
                 else:
-                    session_id = save_session(session_type, all_exercises_data, warmup_data, finisher_data)
-                    if session_id:
-                        st.success(f"Séance sauvegardée avec succès !")
+                    future = save_session(st.session_state['draft_id'], warmup_data, finisher_data,
+                                          session_notes)
+                    if future is not None:
+                        # Le résultat s'affiche au rerun suivant (report_pending_saves)
                         # Réinitialiser tous les états
                         for key in list(st.session_state.keys()):
-                            if key in ['series_count', 'exercises_data', 'workout_started']:
+                            if key in ['series_count', 'exercises_data', 'workout_started', 'draft_id',
+                                       'pending_draft_writes']:
                                 del st.session_state[key]
-                        st.rerun()
+                        rerun()
 
 elif selected_page == "🎯 CrossFit":
     st.title("CrossFit")
@@ -598,51 +833,229 @@ elif selected_page == "🎯 CrossFit":
     with crossfit_tab1:
         st.header("WOD (Workout of the Day)")
         
-        # Type de WOD
-        wod_type = st.selectbox(
-            "Type de WOD",
-            ["AMRAP", "For Time", "EMOM", "Tabata", "Chipper"]
+        wod_list = get_wods()
+        wods_by_id = {wod['id']: wod for wod in wod_list}
+        if st.session_state.get('wod_id') not in wods_by_id:
+            st.session_state['wod_id'] = None
+        wod_id = st.selectbox(
+            "WOD",
+            [None] + list(wods_by_id),
+            format_func=lambda value: "➕ Nouveau WOD" if value is None else (
+                f"{'⭐ ' if wods_by_id[value]['benchmark'] else ''}{wods_by_id[value]['name']} "
+                f"({wods_by_id[value]['type']})"
+            ),
+            key="wod_id"
         )
         
-        # Configuration du WOD
-        col1, col2 = st.columns(2)
-        with col1:
-            time_cap = st.number_input("Time Cap (minutes)", min_value=1, value=20)
-        with col2:
-            if wod_type in ["AMRAP", "For Time"]:
-                rounds = st.number_input("Rounds", min_value=1, value=1)
-        
-        # Sélection des exercices
-        st.subheader("Exercices")
-        
-        # TODO: Ajouter la sélection d'exercices depuis la base de données
+        if wod_id is None:
+            # Type de WOD
+            wod_type = st.selectbox("Type de WOD", wods.WOD_TYPES, key="new_wod_type")
+            
+            # Configuration du WOD
+            col1, col2 = st.columns(2)
+            with col1:
+                st.number_input("Time Cap (minutes)", min_value=1, value=20, key="new_wod_time_cap")
+            with col2:
+                if wod_type in ["AMRAP", "For Time"]:
+                    st.number_input("Rounds", min_value=1, value=1, key="new_wod_rounds")
+            
+            # Sélection des exercices dans le catalogue, restreint au niveau et
+            # au matériel disponible
+            st.subheader("Exercices")
+            movement_index = load_movement_index()
+            col_level, col_equipment = st.columns([1, 2])
+            with col_level:
+                picker_level = st.selectbox("Niveau", [None] + list(movements.FACETS['level']),
+                                            format_func=lambda value: "Tous" if value is None else value,
+                                            key="wod_level")
+            with col_equipment:
+                picker_equipment = st.multiselect("Matériel disponible", movements.FACETS['equipment'],
+                                                  key="wod_equipment")
+            available = movement_index.search({'level': picker_level, 'equipment': picker_equipment})
+            # Les mouvements déjà choisis restent proposés quand les filtres changent
+            picked = st.session_state.get('wod_movements', [])
+            options = [movement.id for movement in available]
+            options += [movement_id for movement_id in picked if movement_id not in set(options)]
+            picked = st.multiselect(
+                f"Mouvements ({len(available)} disponibles)",
+                options,
+                format_func=lambda movement_id: movement_index.by_id[movement_id].name,
+                key="wod_movements"
+            )
+            
+            # Reps par round et charge de chaque mouvement choisi
+            for movement_id in picked:
+                col_name, col_reps, col_weight = st.columns([2, 1, 1])
+                with col_name:
+                    st.markdown(f"**{movement_index.by_id[movement_id].name}**")
+                with col_reps:
+                    st.number_input("Reps", min_value=1, value=10, key=f"wod_reps_{movement_id}")
+                with col_weight:
+                    st.number_input("Charge (kg)", min_value=0.0, value=0.0, step=2.5,
+                                    key=f"wod_weight_{movement_id}")
+            
+            st.text_input("Nom du WOD", key="new_wod_name")
+            st.text_input("Description", key="new_wod_description")
+            st.button("Enregistrer le WOD", on_click=add_wod, disabled=not picked)
+        else:
+            wod = wods_by_id[wod_id]
+            rounds_label = f", {wod['rounds']} rounds" if wod['rounds'] and wod['rounds'] > 1 else ""
+            st.caption(f"{wod['type']} — time cap {wod['time_cap']} min{rounds_label}")
+            if wod['description']:
+                st.markdown(wod['description'])
+            for movement_name, reps, weight in get_wod_movements(wod_id):
+                st.markdown(f"- {reps} × {movement_name}" + (f" ({weight:g} kg)" if weight else ""))
+            
+            # Saisie d'un résultat, champs selon le type de score
+            st.subheader("Résultat")
+            with st.form("wod_result", clear_on_submit=True):
+                rounds, reps, seconds, capped = 0, 0, None, False
+                if wods.is_timed(wod['type']):
+                    col_minutes, col_seconds = st.columns(2)
+                    with col_minutes:
+                        minutes = st.number_input("Minutes", min_value=0, max_value=wod['time_cap'], value=0)
+                    with col_seconds:
+                        extra_seconds = st.number_input("Secondes", min_value=0, max_value=59, value=0)
+                    capped = st.checkbox("Time cap atteint")
+                    capped_reps = st.number_input("Reps faites (si time cap atteint)", min_value=0, value=0)
+                    # Au time cap, le score est le nombre de reps faites
+                    seconds = minutes * 60 + extra_seconds
+                    reps = capped_reps if capped else 0
+                elif wod['type'] == "AMRAP":
+                    col_rounds, col_reps = st.columns(2)
+                    with col_rounds:
+                        rounds = st.number_input("Rounds complets", min_value=0, value=0)
+                    with col_reps:
+                        reps = st.number_input("Reps du round entamé", min_value=0,
+                                               max_value=wods.ROUND_WEIGHT - 1, value=0)
+                else:
+                    reps = st.number_input("Reps totales", min_value=0, value=0)
+                result_day = st.date_input("Date", value=date.today(), format="DD/MM/YYYY")
+                result_notes = st.text_input("Notes")
+                if st.form_submit_button("Enregistrer le résultat"):
+                    saved = save_wod_result(wod_id, user_id, rounds, reps, seconds, capped,
+                                            result_day, result_notes)
+                    if saved is not None:
+                        _result_id, record = saved
+                        if record:
+                            st.success(f"🏆 Nouveau record sur {wod['name']} !")
+                        else:
+                            st.success("Résultat enregistré !")
+            
+            # Classement : meilleur résultat de chaque athlète
+            st.subheader("Classement")
+            leaderboard, (rank, ranked) = get_leaderboard(wod_id, user_id)
+            if leaderboard:
+                st.dataframe(
+                    pd.DataFrame(
+                        [(row['rank'], row['athlete'], row['score'], format_date(row['date'], '%d/%m/%Y'))
+                         for row in leaderboard],
+                        columns=["Rang", "Athlète", "Score", "Date"]
+                    ),
+                    hide_index=True,
+                    use_container_width=True
+                )
+                if rank is not None:
+                    st.caption(f"Votre rang : {rank} sur {ranked}")
+            else:
+                st.info("Aucun résultat enregistré pour ce WOD.")
         
     with crossfit_tab2:
         st.header("Base de données d'exercices")
         
-        # Filtres
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            category_filter = st.selectbox(
-                "Catégorie",
-                ["Tous", "Gymnastique", "Haltérophilie", "Cardio", "Mobilité"]
-            )
-        with col2:
-            skill_filter = st.selectbox(
-                "Niveau",
-                ["Tous", "Débutant", "Intermédiaire", "Avancé"]
-            )
-        with col3:
-            equipment_filter = st.selectbox(
-                "Équipement",
-                ["Tous", "Poids du corps", "Barre", "Haltères", "Kettlebell", "Machine"]
+        movement_index = load_movement_index()
+
+        # Filtres : valeurs déjà dans la session au début du rerun, pour
+        # afficher à côté de chaque option le nombre de mouvements trouvés
+        movement_filters = {facet: st.session_state.get(f"movement_{facet}") for facet in MOVEMENT_FACETS}
+        facet_counts = movement_index.facet_counts(movement_filters)
+        for column, (facet, label) in zip(st.columns(len(MOVEMENT_FACETS)), MOVEMENT_FACETS.items()):
+            with column:
+                st.selectbox(
+                    label,
+                    [None] + list(movements.FACETS[facet]),
+                    format_func=lambda value, facet=facet: (
+                        "Tous" if value is None else f"{value} ({facet_counts[facet][value]})"
+                    ),
+                    key=f"movement_{facet}"
+                )
+
+        results = movement_index.search(movement_filters)
+        st.caption(f"{len(results)} mouvements sur {len(movement_index)}")
+        if results:
+            st.dataframe(
+                pd.DataFrame(
+                    [(movement.name, movement.category, movement.level, movement.equipment)
+                     for movement in results],
+                    columns=["Mouvement", "Catégorie", "Niveau", "Équipement"]
+                ),
+                hide_index=True,
+                use_container_width=True
             )
-        
-        # TODO: Afficher les exercices filtrés depuis la base de données
+        else:
+            st.info("Aucun mouvement ne correspond à ces filtres.")
         
     with crossfit_tab3:
         st.header("Statistiques")
-        # TODO: Ajouter les statistiques CrossFit
+        
+        # Compteurs mensuels et records de l'athlète : deux lectures d'index,
+        # tenues à jour à chaque résultat enregistré
+        wod_trends, wod_bests = get_wod_stats(user_id)
+        if not wod_trends:
+            st.info("Aucun résultat de WOD enregistré.")
+        else:
+            trends = pd.DataFrame(wod_trends, columns=['month', 'type', 'results', 'prs'])
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("WODs réalisés", int(trends['results'].sum()))
+            with col2:
+                st.metric("Records battus", int(trends['prs'].sum()))
+            with col3:
+                st.metric("WODs différents", len(wod_bests))
+            
+            # Résultats par mois et par type, records en surimpression
+            trends_figure = go.Figure()
+            for wod_type, rows in trends.groupby('type', sort=False):
+                trends_figure.add_trace(go.Bar(
+                    x=rows['month'], y=rows['results'], name=wod_type,
+                    hovertemplate=f"%{{x}}<br>%{{y}} {wod_type}<extra></extra>"
+                ))
+            monthly_prs = trends.groupby('month', as_index=False)['prs'].sum()
+            trends_figure.add_trace(go.Scatter(
+                x=monthly_prs['month'], y=monthly_prs['prs'], name="Records", mode='lines+markers',
+                marker=dict(color='gold', symbol='star', size=9),
+                hovertemplate="%{x}<br>%{y} records<extra></extra>"
+            ))
+            trends_figure.update_layout(title="WODs par mois", template='plotly_dark', barmode='stack',
+                                        xaxis=dict(type='category'), height=400)
+            st.plotly_chart(trends_figure, use_container_width=True)
+            
+            st.subheader("Records personnels")
+            st.dataframe(
+                pd.DataFrame(
+                    [(best['name'], best['type'], best['score'], format_date(best['date'], '%d/%m/%Y'))
+                     for best in wod_bests],
+                    columns=["WOD", "Type", "Meilleur résultat", "Date"]
+                ),
+                hide_index=True,
+                use_container_width=True
+            )
+            
+            # Progression sur un WOD
+            bests_by_wod = {best['wod_id']: best for best in wod_bests}
+            history_wod = st.selectbox("Progression", list(bests_by_wod),
+                                       format_func=lambda value: bests_by_wod[value]['name'],
+                                       key="wod_stats_wod")
+            history = get_wod_history(history_wod, user_id)
+            st.dataframe(
+                pd.DataFrame(
+                    [(format_date(result['date'], '%d/%m/%Y'), result['score'], result['notes'])
+                     for result in history],
+                    columns=["Date", "Score", "Notes"]
+                ),
+                hide_index=True,
+                use_container_width=True
+            )
 
 elif selected_page == "📊 Historique":
     st.title("Historique des Séances")
@@ -661,31 +1074,236 @@ elif selected_page == "📊 Historique":
     with col_filter2:
         session_type_filter = st.selectbox(
             "Type de séance",
-            ["Toutes"] + list(WORKOUT_PROGRAM.keys())
+            ["Toutes"] + list(PROGRAM.keys())
         )
     
-    # Récupérer et afficher l'historique
-    history = get_sessions_history(
-        days_filter=days_filter,
-        session_type=None if session_type_filter == "Toutes" else session_type_filter
-    )
+    session_type = None if session_type_filter == "Toutes" else session_type_filter
+
+    # Recherche plein texte : exercices, type de séance, activités et notes
+    search_text = st.text_input("🔎 Rechercher", placeholder="squat, rameur, épaule...",
+                                key="history_search").strip()
+    
+    # Export des séries filtrées, généré seulement sur demande
+    with st.expander("📥 Exporter"):
+        col_format, col_prepare = st.columns([2, 1])
+        with col_format:
+            export_format = st.selectbox("Format", exporter.EXPORT_FORMATS, key="export_format")
+        with col_prepare:
+            if st.button("Préparer l'export"):
+                prepare_export(export_format, user_id, days_filter, session_type)
+        prepared = st.session_state.get('history_export')
+        if (prepared and prepared['filters'] == (user_id, days_filter, session_type)
+                and prepared['format'] == export_format):
+            with open(prepared['file'].path, 'rb') as f:
+                st.download_button(
+                    f"Télécharger ({prepared['file'].count} séries)", f,
+                    file_name=f"historique.{export_format}",
+                    mime=exporter.MIME_TYPES[export_format],
+                )
+
+    # Curseurs des pages chargées, remis à zéro quand les filtres changent
+    filters = (days_filter, session_type)
+    if st.session_state.get('history_filters') != filters:
+        st.session_state['history_filters'] = filters
+        st.session_state['history_cursors'] = [None]
+    
+    next_cursor = None
+    history = []
+    if search_text:
+        # Les HISTORY_PAGE_SIZE séances les plus pertinentes, par l'index FTS5
+        history = search_sessions(user_id, search_text, days_filter, session_type)
+    else:
+        # Chaque page est une lecture indexée de HISTORY_PAGE_SIZE séances,
+        # sans le détail des séries
+        for cursor in st.session_state['history_cursors']:
+            page, next_cursor = get_sessions_page(user_id, days_filter, session_type, cursor)
+            history.extend(page)
     
     if history:
         for session in history:
-            with st.expander(f"Séance du {session['date']} - {session['type']}"):
-                if session['warmups']:
-                    st.markdown("**Échauffement:**")
-                    for warmup in session['warmups']:
-                        st.markdown(f"- {warmup}")
-                
-                if session['exercises']:
-                    st.markdown("**Exercices:**")
-                    for exercise in session['exercises']:
-                        st.markdown(f"- {exercise}")
-                
-                if session['finishers']:
-                    st.markdown("**Finisher:**")
-                    for finisher in session['finishers']:
-                        st.markdown(f"- {finisher}")
+            # Le détail n'est chargé que pour les séances dépliées
+            opened = st.toggle(
+                f"Séance du {format_date(session['date'])} - {session['type']} ({session['sets']} séries)",
+                key=f"history_open_{session['id']}"
+            )
+            if session.get('snippet'):
+                st.caption(session['snippet'])
+            if opened:
+                details = get_session_details(session['id'], user_id)
+                if details:
+                    with st.container(border=True):
+                        render_session_details(details)
+        
+        if next_cursor is not None:
+            if st.button("Charger plus de séances"):
+                st.session_state['history_cursors'].append(next_cursor)
+                rerun()
+    elif search_text:
+        st.info("Aucune séance ne correspond à la recherche.")
+    else:
+        st.info("Aucune séance enregistrée pour le moment.")
+
+elif selected_page == "📅 Calendrier":
+    st.title("Calendrier")
+
+    years = get_training_years(user_id)
+    if not years:
+        st.info("Aucune séance enregistrée pour le moment.")
     else:
+        col_year, col_metric = st.columns([1, 2])
+        with col_year:
+            year = st.selectbox("Année", years, key="calendar_year")
+        with col_metric:
+            metric = st.radio("Couleur", list(CALENDAR_METRICS), format_func=CALENDAR_METRICS.get,
+                              horizontal=True, key="calendar_metric")
+
+        days = get_daily_summary(user_id, year)
+        grid = analytics.calendar_grid(days, year)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Séances", int(grid['sessions'].sum()))
+        with col2:
+            st.metric("Jours d'entraînement", len(days))
+        with col3:
+            st.metric("Volume", f"{grid['volume'].sum():,.0f} kg".replace(',', ' '))
+
+        # Heatmap de l'année : une colonne par semaine, une ligne par jour
+        cells = grid.pivot(index='weekday', columns='week', values=metric)
+        hover = grid.assign(
+            label=grid['day'].dt.strftime('%d/%m/%Y') + "<br>" + grid['sessions'].astype(str) + " séance(s), "
+            + grid['sets'].astype(str) + " séries, " + grid['volume'].map('{:,.0f} kg'.format)
+            + "<br>" + grid['type']
+        ).pivot(index='weekday', columns='week', values='label')
+        heatmap = go.Figure(go.Heatmap(
+            z=cells.values, x=cells.columns, y=WEEKDAYS, text=hover.values,
+            hovertemplate="%{text}<extra></extra>", colorscale='Greens', xgap=2, ygap=2,
+            colorbar=dict(title=CALENDAR_METRICS[metric]),
+        ))
+        heatmap.update_layout(template='plotly_dark', height=260, yaxis=dict(autorange='reversed'),
+                              margin=dict(t=20, b=20))
+        st.plotly_chart(heatmap, use_container_width=True)
+
+        # Vue par mois : une case par jour, colorée selon le type de la
+        # dernière séance du jour
+        events = [
+            {
+                'title': f"{day['type']} · {day['sets']} séries"
+                         + (f" ({day['sessions']} séances)" if day['sessions'] > 1 else ""),
+                'start': day['day'],
+                'allDay': True,
+                'color': SESSION_TYPE_COLORS.get(day['type'], '#7f7f7f'),
+            }
+            for day in days
+        ]
+        calendar(
+            events=events,
+            options={
+                'initialView': 'dayGridMonth',
+                'initialDate': days[-1]['day'] if days else f"{year}-01-01",
+                'firstDay': 1,
+                'locale': 'fr',
+                'validRange': {'start': f"{year}-01-01", 'end': f"{year + 1}-01-01"},
+            },
+            key=f"calendar_{user_id}_{year}",
+        )
+
+elif selected_page == "📈 Progression":
+    st.title("Progression")
+
+    col_exercise, col_formula = st.columns([3, 1])
+    with col_formula:
+        formula = st.selectbox("Formule du 1RM", analytics.E1RM_FORMULAS,
+                               format_func=str.capitalize)
+
+    try:
+        progress = get_analytics(user_id, formula, columnar.version())
+    except Exception as e:
+        st.error(f"Erreur lors du calcul de la progression : {str(e)}")
+        progress = None
+
+    if progress is None or not progress['set_count']:
         st.info("Aucune séance enregistrée pour le moment.")
+    else:
+        with col_exercise:
+            exercise_name = st.selectbox(
+                "Exercice",
+                list(progress['bests']['exercise'].unique())
+            )
+
+        bests = progress['bests'][progress['bests']['exercise'] == exercise_name]
+        prs = progress['prs'][progress['prs']['exercise'] == exercise_name]
+        weekly = progress['weekly'][progress['weekly']['exercise'] == exercise_name]
+
+        # Zoom : la plage choisie est relue à pleine résolution dans les données
+        # en cache, puis réduite au budget de points ; plus la plage est
+        # courte, plus le tracé est détaillé
+        first_day = bests['date'].min().date()
+        last_day = bests['date'].max().date()
+        if first_day < last_day:
+            date_range = st.slider("Période", min_value=first_day, max_value=last_day,
+                                   value=(first_day, last_day), format="DD/MM/YYYY",
+                                   key=f"progress_range_{exercise_name}")
+            start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+            bests = bests[(bests['date'] >= start) & (bests['date'] < end)]
+            prs = prs[(prs['date'] >= start) & (prs['date'] < end)]
+            weekly = weekly[(weekly['week'] >= start - pd.Timedelta(days=6)) & (weekly['week'] < end)]
+
+        e1rm_points = analytics.downsample(bests, 'date', 'e1rm')
+        pr_points = analytics.downsample(prs, 'date', 'e1rm')
+        volume_points, period = analytics.period_volume(weekly)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("1RM estimé", f"{bests['e1rm'].max():.1f} kg")
+        with col2:
+            st.metric("Records battus", len(prs))
+        with col3:
+            st.metric("Séries", int(weekly['sets'].sum()))
+
+        # 1RM estimé à chaque séance, records en surimpression
+        e1rm_figure = go.Figure()
+        e1rm_figure.add_trace(go.Scatter(
+            x=e1rm_points['date'], y=e1rm_points['e1rm'], mode='lines', name="1RM estimé",
+            customdata=e1rm_points['top_weight'],
+            hovertemplate="%{x|%d/%m/%Y}<br>%{y:.1f} kg (charge max %{customdata} kg)<extra></extra>"
+        ))
+        e1rm_figure.add_trace(go.Scatter(
+            x=pr_points['date'], y=pr_points['e1rm'], mode='markers', name="Record",
+            marker=dict(color='gold', size=9, symbol='star'),
+            hovertemplate="%{x|%d/%m/%Y}<br>Record : %{y:.1f} kg<extra></extra>"
+        ))
+        e1rm_figure.update_layout(title="1RM estimé par séance", template='plotly_dark',
+                                  yaxis_title="kg", height=400)
+        st.plotly_chart(e1rm_figure, use_container_width=True)
+
+        # Volume hebdomadaire et nombre de séries
+        volume_figure = go.Figure()
+        volume_figure.add_trace(go.Bar(
+            x=volume_points['week'], y=volume_points['volume'], name="Volume (kg)",
+            hovertemplate="%{x|%d/%m/%Y}<br>%{y:,.0f} kg<extra></extra>"
+        ))
+        volume_figure.add_trace(go.Scatter(
+            x=volume_points['week'], y=volume_points['sets'], name="Séries", yaxis='y2', mode='lines+markers',
+            hovertemplate="%{x|%d/%m/%Y}<br>%{y} séries<extra></extra>"
+        ))
+        volume_figure.update_layout(
+            title=f"Volume par {period}", template='plotly_dark', height=400,
+            yaxis=dict(title="kg"),
+            yaxis2=dict(title="Séries", overlaying='y', side='right', showgrid=False),
+        )
+        st.plotly_chart(volume_figure, use_container_width=True)
+        st.caption(f"{len(e1rm_points)} points tracés sur {len(bests)} séances")
+
+# Connexions SQLite ouvertes pendant ce rerun (0 une fois le pool chaud)
+connections_placeholder.caption(
+    f"Connexions SQLite ouvertes ce rerun : {db.connections_opened() - connections_at_start}"
+)
+# Rendu de la page noté avec les requêtes de ce rerun
+render = instrumentation.record_render(selected_page, rerun_started, queries_at_start,
+                                       st.session_state['interaction_reruns'])
+st.session_state['page_rendering'] = False
+st.sidebar.caption(f"Temps d'exécution du script : {render.duration_ms:.0f} ms")
+if show_diagnostics:
+    with diagnostics_placeholder.container():
+        render_diagnostics(render)
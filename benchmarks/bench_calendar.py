@@ -0,0 +1,93 @@
+"""Benchmark de la lecture d'une année de calendrier.
+
+Compare, pour des historiques de plus en plus longs :
+- le regroupement des séries de l'année par jour (sessions JOIN exercises) ;
+- la lecture de daily_summary (db.get_daily_summary), au plus 366 lignes.
+
+    python benchmarks/bench_calendar.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+YEARS = (1, 5, 20)
+SESSIONS_PER_WEEK = 5
+SETS_PER_SESSION = 24
+REPEAT = 5
+
+AGGREGATE_QUERY = """
+    SELECT date(s.date, 'unixepoch', 'localtime') AS day, COUNT(DISTINCT s.id),
+           COUNT(e.id), SUM(e.weight * e.reps)
+    FROM sessions s
+    JOIN exercises e ON e.session_id = s.id
+    WHERE s.user_id = ? AND s.date >= ? AND s.date < ?
+    GROUP BY day
+    ORDER BY day
+"""
+
+
+def populate(pool, years):
+    rng = random.Random(42)
+    now = int(time.time())
+    with pool.transaction() as conn:
+        exercise_ids = list(db.get_exercise_ids(conn, [f'Exercice {i}' for i in range(20)]).values())
+        for day in range(years * 365):
+            if day % 7 >= SESSIONS_PER_WEEK:
+                continue
+            session_id = conn.execute(
+                "INSERT INTO sessions (date, type, notes) VALUES (?, ?, '')",
+                (now - day * 86400, rng.choice(('PUSH (Lundi)', 'PULL (Mercredi)', 'LEGS (Vendredi)')))
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, ?, ?)',
+                [(session_id, rng.choice(exercise_ids), rng.uniform(20, 120), rng.randint(6, 12))
+                 for _ in range(SETS_PER_SESSION)]
+            )
+
+
+def best_of(function, *args):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    year = date.today().year
+    start = int(time.mktime(date(year, 1, 1).timetuple()))
+    end = int(time.mktime(date(year + 1, 1, 1).timetuple()))
+    print(f"Année {year}, {SESSIONS_PER_WEEK} séances de {SETS_PER_SESSION} séries par semaine, "
+          f"meilleur temps sur {REPEAT} essais (ms)")
+    print(f"{'années':>7} {'séries':>9} {'regroupement':>13} {'daily_summary':>14} {'lignes':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for years in YEARS:
+            path = os.path.join(tmp, f'calendar_{years}.db')
+            db.DB_PATH = path
+            db.init_database()
+            pool = db.get_pool(path)
+            populate(pool, years)
+            with pool.connection() as conn:
+                sets = conn.execute('SELECT COUNT(*) FROM exercises').fetchone()[0]
+
+            def aggregate():
+                with pool.connection() as conn:
+                    return conn.execute(AGGREGATE_QUERY, (db.DEFAULT_USER_ID, start, end)).fetchall()
+
+            rows = len(db.get_daily_summary(date(year, 1, 1), date(year, 12, 31)))
+            aggregate_time = best_of(aggregate)
+            summary_time = best_of(db.get_daily_summary, date(year, 1, 1), date(year, 12, 31))
+            print(f"{years:>7} {sets:>9} {aggregate_time:>13.1f} {summary_time:>14.2f} {rows:>7}")
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
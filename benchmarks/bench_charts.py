@@ -0,0 +1,61 @@
+"""Benchmark de la courbe de 1RM estimé selon la longueur de l'historique.
+
+Compare, pour un exercice, la figure construite avec toutes les séances à
+celle réduite à CHART_POINT_BUDGET points par LTTB : taille du JSON envoyé
+au navigateur et temps de construction/sérialisation.
+
+    python benchmarks/bench_charts.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+
+SESSIONS = (1_000, 10_000, 50_000, 200_000)
+REPEAT = 3
+
+
+def synthetic_bests(sessions):
+    rng = np.random.default_rng(42)
+    dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(np.arange(sessions) * 6, unit='h')
+    e1rm = 60 + np.cumsum(rng.normal(0.01, 0.5, sessions))
+    return pd.DataFrame({'date': dates, 'e1rm': e1rm, 'top_weight': e1rm * 0.8})
+
+
+def figure_json(points):
+    figure = go.Figure(go.Scatter(
+        x=points['date'], y=points['e1rm'], mode='lines', customdata=points['top_weight']
+    ))
+    return figure.to_json()
+
+
+def measure(build):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        payload = build()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, len(payload)
+
+
+def main():
+    print(f"{'séances':>8} {'complet ms':>11} {'complet Ko':>11} {'réduit ms':>10} {'réduit Ko':>10}")
+    for sessions in SESSIONS:
+        bests = synthetic_bests(sessions)
+        full_ms, full_size = measure(lambda: figure_json(bests))
+        reduced_ms, reduced_size = measure(
+            lambda: figure_json(analytics.downsample(bests, 'date', 'e1rm'))
+        )
+        print(f"{sessions:>8} {full_ms:>11.1f} {full_size / 1024:>11.0f} "
+              f"{reduced_ms:>10.1f} {reduced_size / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark de la copie colonnaire (columnar.py) face à la lecture SQL.
+
+Pour chaque taille de base, mesure le volume total par exercice calculé :
+- en SQL : fetchall des séries puis tableaux NumPy (chemin d'avant) ;
+- sur la copie à froid : fichiers évincés du cache du système si possible ;
+- sur la copie à chaud : pages déjà en mémoire.
+
+    python benchmarks/bench_columnar.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import columnar
+import db
+
+SETS = (10_000, 100_000, 500_000)
+SETS_PER_SESSION = 20
+REPEAT = 5
+
+
+def populate(pool, sets):
+    rng = random.Random(42)
+    now = int(time.time())
+    with pool.transaction() as conn:
+        exercise_ids = list(db.get_exercise_ids(conn, [f'Exercice {i}' for i in range(30)]).values())
+        for day in range(sets // SETS_PER_SESSION):
+            session_id = conn.execute(
+                "INSERT INTO sessions (date, type, notes) VALUES (?, ?, '')",
+                (now - day * 86400, 'PUSH (Lundi)')
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, ?, ?)',
+                [(session_id, rng.choice(exercise_ids), rng.uniform(20, 120), rng.randint(6, 12))
+                 for _ in range(SETS_PER_SESSION)]
+            )
+
+
+def volume_sql(conn):
+    rows = conn.execute('''
+        SELECT e.session_id, s.date, e.exercise_id, e.weight, e.reps
+        FROM exercises e JOIN sessions s ON s.id = e.session_id
+    ''').fetchall()
+    table = np.array(rows, dtype=np.float64)
+    return np.bincount(table[:, 2].astype(np.int64), weights=table[:, 3] * table[:, 4])
+
+
+def volume_columnar(conn):
+    columns = columnar.load(conn)
+    return np.bincount(columns['exercise_id'], weights=columns['weight'] * columns['reps'])
+
+
+def evict(path):
+    # Retirer les colonnes du cache de pages (Linux uniquement)
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for name, _dtype in columnar.COLUMNS:
+        fd = os.open(os.path.join(path, name + '.bin'), os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def best_of(function, *args, before=None):
+    timings = []
+    for _ in range(REPEAT):
+        if before:
+            before()
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    print(f"Meilleur temps sur {REPEAT} essais")
+    print(f"{'séries':>8} {'SQL ms':>8} {'construction ms':>16} {'froid ms':>9} {'chaud ms':>9}")
+    for sets in SETS:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = os.path.join(tmp, 'bench.db')
+            db.init_database()
+            pool = db.get_pool()
+            populate(pool, sets)
+            with pool.connection() as conn:
+                started = time.perf_counter()
+                columnar.sync(conn)
+                build_ms = (time.perf_counter() - started) * 1000
+                assert np.allclose(volume_sql(conn), volume_columnar(conn))
+
+                sql_ms = best_of(volume_sql, conn)
+                path = columnar.store_path()
+                cold_ms = best_of(volume_columnar, conn, before=lambda: evict(path))
+                warm_ms = best_of(volume_columnar, conn)
+            pool.close()
+        print(f"{sets:>8} {sql_ms:>8.1f} {build_ms:>16.1f} {cold_ms:>9.1f} {warm_ms:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark de get_sessions_history selon le nombre de séries par séance.
+
+Compare l'ancienne requête (triple LEFT JOIN + GROUP_CONCAT DISTINCT) au
+moteur actuel qui agrège chaque table fille séparément.
+
+    python benchmarks/bench_history.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+SESSIONS = 200
+SETS_PER_SESSION = (4, 8, 16, 32, 64)
+REPEAT = 3
+
+LEGACY_QUERY = """
+    SELECT
+        s.id,
+        s.date,
+        s.type,
+        GROUP_CONCAT(DISTINCT w.activity) as warmups,
+        GROUP_CONCAT(DISTINCT c.name || ' (' || e.weight || 'kg x ' || e.reps || ')') as exercises,
+        GROUP_CONCAT(DISTINCT f.activity || ' (' || f.duration || ' min)') as finishers
+    FROM sessions s
+    LEFT JOIN warmups w ON s.id = w.session_id
+    LEFT JOIN exercises e ON s.id = e.session_id
+    LEFT JOIN exercise_catalog c ON c.id = e.exercise_id
+    LEFT JOIN finishers f ON s.id = f.session_id
+    GROUP BY s.id, s.date, s.type ORDER BY s.date DESC
+"""
+
+
+def populate(pool, sets_per_session):
+    rng = random.Random(42)
+    extras = max(1, sets_per_session // 4)
+    now = int(time.time())
+    with pool.transaction() as conn:
+        exercise_ids = db.get_exercise_ids(conn, [f'Exercice {i // 3}' for i in range(sets_per_session)])
+        for day in range(SESSIONS):
+            session_id = conn.execute(
+                "INSERT INTO sessions (date, type, notes) VALUES (?, ?, '')",
+                (now - day * 86400, 'PUSH (Lundi)')
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO warmups (session_id, activity) VALUES (?, ?)',
+                [(session_id, f'Échauffement {i}') for i in range(extras)]
+            )
+            conn.executemany(
+                'INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, ?, ?)',
+                [(session_id, exercise_ids[f'Exercice {i // 3}'], rng.choice((20.0, 22.5, 25.0)), rng.randint(6, 12))
+                 for i in range(sets_per_session)]
+            )
+            conn.executemany(
+                'INSERT INTO finishers (session_id, activity, duration) VALUES (?, ?, ?)',
+                [(session_id, f'Finisher {i}', 20) for i in range(extras)]
+            )
+
+
+def best_of(func):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print(f"{SESSIONS} séances, meilleur temps sur {REPEAT} essais")
+    print(f"{'séries/séance':>14} {'ancienne (ms)':>14} {'actuelle (ms)':>14} {'µs/série':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sets_per_session in SETS_PER_SESSION:
+            path = os.path.join(tmp, f'history_{sets_per_session}.db')
+            db.DB_PATH = path
+            db.init_database()
+            pool = db.get_pool(path)
+            populate(pool, sets_per_session)
+
+            def legacy():
+                with pool.connection() as conn:
+                    conn.execute(LEGACY_QUERY).fetchall()
+
+            legacy_time = best_of(legacy)
+            current_time = best_of(lambda: db.get_sessions_history(db.DEFAULT_USER_ID))
+            per_set = current_time / (SESSIONS * sets_per_session) * 1e6
+            print(f"{sets_per_session:>14} {legacy_time * 1000:>14.1f} {current_time * 1000:>14.1f} {per_set:>10.2f}")
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
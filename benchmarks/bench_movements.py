@@ -0,0 +1,93 @@
+"""Benchmark des filtres du catalogue CrossFit.
+
+Pour chaque taille de catalogue (le vrai, puis des copies renommées),
+résout toutes les combinaisons de filtres Catégorie x Niveau x Équipement
+avec les compteurs de chaque facette :
+- en SQL : liste filtrée + un GROUP BY par facette (index composites) ;
+- dans l'index à facettes (movements.FacetIndex) : ET de bitsets.
+Temps moyen par combinaison, liste des mouvements comprise.
+
+    python benchmarks/bench_movements.py
+"""
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import movements
+
+COPIES = (1, 10, 100)
+
+
+def populate(pool, copies):
+    rows = movements.catalogue()
+    with pool.transaction() as conn:
+        for copy in range(1, copies):
+            db.add_movements(conn, [(f'{name} #{copy}', *facets) for name, *facets in rows])
+
+
+def sql_filter(conn, filters):
+    def where(facets):
+        conditions = [f'{facet} = ?' for facet in facets if filters[facet]]
+        params = [filters[facet] for facet in facets if filters[facet]]
+        return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    clause, params = where(movements.FACETS)
+    results = conn.execute(
+        f'SELECT id, name, category, level, equipment FROM crossfit_movements{clause} ORDER BY name', params
+    ).fetchall()
+    counts = {}
+    for facet in movements.FACETS:
+        clause, params = where([other for other in movements.FACETS if other != facet])
+        counts[facet] = dict(conn.execute(
+            f'SELECT {facet}, COUNT(*) FROM crossfit_movements{clause} GROUP BY {facet}', params
+        ).fetchall())
+    return results, counts
+
+
+def index_filter(index, filters):
+    return index.search(filters), index.facet_counts(filters)
+
+
+def combinations():
+    choices = [(None,) + values for values in movements.FACETS.values()]
+    return [dict(zip(movements.FACETS, combination)) for combination in itertools.product(*choices)]
+
+
+def main():
+    filters = combinations()
+    print(f"{len(filters)} combinaisons de filtres, temps moyen par combinaison (µs)")
+    print(f"{'mouvements':>11} {'SQL':>9} {'bitsets':>9} {'chargement (ms)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for copies in COPIES:
+            path = os.path.join(tmp, f'movements_{copies}.db')
+            db.DB_PATH = path
+            db.init_database()
+            pool = db.get_pool(path)
+            populate(pool, copies)
+
+            with pool.connection() as conn:
+                started = time.perf_counter()
+                index = movements.load_index(conn)
+                load_time = (time.perf_counter() - started) * 1000
+
+                started = time.perf_counter()
+                for combination in filters:
+                    sql_filter(conn, combination)
+                sql_time = (time.perf_counter() - started) / len(filters) * 1e6
+
+            started = time.perf_counter()
+            for combination in filters:
+                index_filter(index, combination)
+            index_time = (time.perf_counter() - started) / len(filters) * 1e6
+
+            print(f"{len(index):>11} {sql_time:>9.0f} {index_time:>9.0f} {load_time:>16.1f}")
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
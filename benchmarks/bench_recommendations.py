@@ -0,0 +1,107 @@
+"""Benchmark du calcul des suggestions au démarrage d'une séance.
+
+Pour des historiques de plus en plus longs, compare pour les exercices
+d'une journée du programme :
+- une requête par exercice (dernières séances), calcul en Python ;
+- recommendations.recommend : une requête groupée et un calcul NumPy.
+
+    python benchmarks/bench_recommendations.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+import db
+import program
+import recommendations
+
+YEARS = (1, 5, 10)
+SESSION_TYPE = 'PUSH (Lundi)'
+REPEAT = 5
+
+PER_EXERCISE_QUERY = """
+    SELECT s.id, e.weight, e.reps
+    FROM sessions s
+    JOIN exercises e ON e.session_id = s.id
+    JOIN exercise_catalog c ON c.id = e.exercise_id
+    WHERE s.user_id = ? AND c.name = ? AND s.id IN (
+        SELECT s2.id FROM sessions s2
+        WHERE s2.user_id = ?
+          AND EXISTS (SELECT 1 FROM exercises e2 WHERE e2.session_id = s2.id AND e2.exercise_id = c.id)
+        ORDER BY s2.date DESC, s2.id DESC
+        LIMIT ?
+    )
+    ORDER BY s.date, s.id, e.id
+"""
+
+
+def populate(pool, workout, years):
+    rng = random.Random(years)
+    now = int(time.time())
+    with pool.transaction() as conn:
+        exercise_ids = db.get_exercise_ids(conn, workout.exercise_names)
+        # Une séance de ce type par semaine, charges en progression lente
+        for week in range(years * 52, 0, -1):
+            session_id = conn.execute(
+                "INSERT INTO sessions (date, type, notes) VALUES (?, ?, '')",
+                (now - week * 7 * 86400, SESSION_TYPE)
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, ?, ?)',
+                [(session_id, exercise_ids[exercise.name], 20 + (years * 52 - week) * 0.1, rng.randint(8, 12))
+                 for exercise in workout.exercises for _ in range(exercise.num_sets)]
+            )
+
+
+def per_exercise(pool, workout):
+    suggestions = {}
+    with pool.connection() as conn:
+        for exercise in workout.exercises:
+            rows = conn.execute(PER_EXERCISE_QUERY, (db.DEFAULT_USER_ID, exercise.name, db.DEFAULT_USER_ID,
+                                                    recommendations.HISTORY_SESSIONS)).fetchall()
+            sessions = {}
+            for session_id, weight, reps in rows:
+                sessions.setdefault(session_id, []).append((weight, reps))
+            bests = [max(analytics.estimated_1rm(weight, reps) for weight, reps in sets)
+                     for sets in sessions.values()]
+            last_sets = list(sessions.values())[-1] if sessions else []
+            suggestions[exercise.name] = (bests, last_sets)
+    return suggestions
+
+
+def best_of(function, *args):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    workout = program.compile_program()[SESSION_TYPE]
+    print(f"{SESSION_TYPE} : {len(workout.exercises)} exercices, meilleur temps sur {REPEAT} essais (ms)")
+    print(f"{'années':>7} {'séries':>9} {'par exercice':>13} {'groupé':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for years in YEARS:
+            path = os.path.join(tmp, f'recommendations_{years}.db')
+            db.DB_PATH = path
+            db.init_database()
+            pool = db.get_pool(path)
+            populate(pool, workout, years)
+            with pool.connection() as conn:
+                sets = conn.execute('SELECT COUNT(*) FROM exercises').fetchone()[0]
+
+            loop_time = best_of(per_exercise, pool, workout)
+            batched_time = best_of(recommendations.recommend, workout)
+            print(f"{years:>7} {sets:>9} {loop_time:>13.1f} {batched_time:>8.1f}")
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Latence d'un rerun Streamlit et coût de l'analyse du programme.
+
+Deux mesures :
+
+1. l'analyse des libellés de WORKOUT_PROGRAM (split(' - '), split('('))
+   telle qu'elle était refaite à chaque rendu, comparée à la lecture du
+   modèle compilé par program.compile_program ;
+2. la durée de reruns complets de l'application via streamlit.testing
+   (AppTest), page par page. Pour comparer avec une version antérieure :
+
+    git show <commit>:app.py > /tmp/app_avant.py
+    python benchmarks/bench_rerun.py --app /tmp/app_avant.py
+    python benchmarks/bench_rerun.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import program
+
+PAGES = ("🏠 Accueil", "💪 Musculation", "📊 Historique")
+
+
+def parse_on_every_render(workout_program):
+    # Reproduit les analyses faites à chaque rendu de la page Musculation
+    for day in workout_program.values():
+        for exercise in day['exercices']:
+            exercise.split(' - ')[0]
+            int(exercise.split(' - ')[1].split()[0])
+        for activity in day['echauffement']:
+            int(activity.split('(')[1].split()[0]) if '(' in activity else 5
+        finisher = day['finisher']
+        int(finisher.split('(')[1].split()[0]) if '(' in finisher else 20
+
+
+def read_compiled(compiled):
+    for day in compiled.values():
+        for exercise in day.exercises:
+            exercise.name
+            exercise.num_sets
+        for activity in day.warmups:
+            activity.default_duration
+        day.finisher.default_duration
+
+
+def bench_program(iterations=10000):
+    compiled = program.compile_program()
+    for label, func, arg in (
+        ("analyse à chaque rendu", parse_on_every_render, program.WORKOUT_PROGRAM),
+        ("modèle compilé", read_compiled, compiled),
+    ):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func(arg)
+        elapsed = (time.perf_counter() - start) / iterations
+        print(f"{label:<25} {elapsed * 1e6:8.1f} µs par rendu")
+
+
+def bench_reruns(app_path, reruns=20):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit n'est pas installé : mesure des reruns ignorée")
+        return
+
+    for page in PAGES:
+        app = AppTest.from_file(app_path, default_timeout=30)
+        app.run()
+        app.sidebar.radio[0].set_value(page).run()
+        timings = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - start)
+        print(f"{page:<18} médiane {statistics.median(timings) * 1000:7.1f} ms  "
+              f"max {max(timings) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"), help="script Streamlit à mesurer")
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+    app_path = os.path.abspath(args.app)
+
+    print("== Analyse du programme ==")
+    bench_program()
+
+    print("\n== Reruns ==")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Base vide dédiée, pour ne pas toucher à workout.db
+        os.environ['WORKOUT_DB'] = os.path.join(tmp, 'workout.db')
+        os.chdir(tmp)
+        bench_reruns(app_path, args.reruns)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark de la recherche plein texte (FTS5) face à LIKE '%...%'.
+
+Pour chaque taille d'historique, cherche des mots présents dans beaucoup
+de séances (nom d'exercice) ou dans très peu (note rare) :
+- LIKE : parcours de toutes les séances, de leurs séries et activités ;
+- FTS5 : db.search_sessions, classement bm25 et extraits compris.
+
+    python benchmarks/bench_search.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+SESSIONS = (1_000, 10_000, 50_000)
+SETS_PER_SESSION = 12
+REPEAT = 5
+EXERCISES = [f'Exercice {name}' for name in ('squat', 'tirage', 'presse', 'fentes', 'dips', 'rowing')]
+NOTES = ['', '', '', 'bonne séance', 'fatigué', 'genou sensible', 'épaule raide']
+QUERIES = ('squat', 'genou', 'tendinite')
+
+LIKE_QUERY = """
+    SELECT s.id, s.date, s.type FROM sessions s
+    WHERE s.type LIKE :pattern OR s.notes LIKE :pattern
+       OR EXISTS (SELECT 1 FROM exercises e JOIN exercise_catalog c ON c.id = e.exercise_id
+                  WHERE e.session_id = s.id AND c.name LIKE :pattern)
+       OR EXISTS (SELECT 1 FROM warmups w WHERE w.session_id = s.id
+                  AND (w.activity LIKE :pattern OR w.notes LIKE :pattern))
+       OR EXISTS (SELECT 1 FROM finishers f WHERE f.session_id = s.id
+                  AND (f.activity LIKE :pattern OR f.notes LIKE :pattern))
+    ORDER BY s.date DESC
+    LIMIT 20
+"""
+
+
+def populate(pool, sessions):
+    rng = random.Random(42)
+    now = int(time.time())
+    with pool.transaction() as conn:
+        exercise_ids = list(db.get_exercise_ids(conn, EXERCISES).values())
+        for day in range(sessions):
+            notes = rng.choice(NOTES)
+            # Un mot rare : une séance sur 2 000
+            if day % 2000 == 0:
+                notes = 'tendinite'
+            session_id = conn.execute(
+                'INSERT INTO sessions (date, type, notes) VALUES (?, ?, ?)',
+                (now - day * 3600, 'PUSH (Lundi)', notes)
+            ).lastrowid
+            conn.execute('INSERT INTO warmups (session_id, activity, notes) VALUES (?, ?, ?)',
+                         (session_id, 'Rameur', rng.choice(NOTES)))
+            conn.executemany(
+                'INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, ?, ?)',
+                [(session_id, rng.choice(exercise_ids), 40.0, 10) for _ in range(SETS_PER_SESSION)]
+            )
+
+
+def best_of(function, *args):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    print(f"{SETS_PER_SESSION} séries par séance, meilleur temps sur {REPEAT} essais (ms)")
+    print(f"{'séances':>8} {'mot':>10} {'trouvées':>9} {'LIKE':>9} {'FTS5':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sessions in SESSIONS:
+            path = os.path.join(tmp, f'search_{sessions}.db')
+            db.DB_PATH = path
+            db.init_database()
+            pool = db.get_pool(path)
+            populate(pool, sessions)
+
+            for query in QUERIES:
+                def like():
+                    with pool.connection() as conn:
+                        return conn.execute(LIKE_QUERY, {'pattern': f'%{query}%'}).fetchall()
+
+                found = len(db.search_sessions(query, db.DEFAULT_USER_ID, limit=sessions))
+                like_time = best_of(like)
+                fts_time = best_of(db.search_sessions, query, db.DEFAULT_USER_ID)
+                print(f"{sessions:>8} {query:>10} {found:>9} {like_time:>9.1f} {fts_time:>9.1f}")
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark des lectures d'un athlète quand leur nombre augmente.
+
+La base grandit de 1 à 500 athlètes ayant chacun le même historique ; pour
+un échantillon d'athlètes, mesure la médiane (p50) de chaque lecture de
+l'application. Les index commençant par user_id doivent garder ces temps
+constants, quelle que soit la taille totale de la base.
+
+    python benchmarks/bench_users.py
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+USERS = (1, 10, 100, 500)
+SESSIONS_PER_USER = 60
+SETS_PER_SESSION = 8
+SAMPLE = 20
+REPEAT = 5
+EXERCISES = [f'Exercice {i}' for i in range(12)]
+
+
+def populate(pool, first_user, last_user):
+    rng = random.Random(first_user)
+    now = int(time.time())
+    with pool.transaction() as conn:
+        exercise_ids = list(db.get_exercise_ids(conn, EXERCISES).values())
+        for user in range(first_user, last_user + 1):
+            user_id = db.get_user_id(conn, f'Athlète {user}')
+            for day in range(SESSIONS_PER_USER):
+                sets = [(rng.choice(exercise_ids), rng.uniform(20, 120), rng.randint(6, 12))
+                        for _ in range(SETS_PER_SESSION)]
+                date = now - day * 86400
+                session_id = conn.execute(
+                    "INSERT INTO sessions (user_id, date, type, notes) VALUES (?, ?, ?, '')",
+                    (user_id, date, 'PUSH (Lundi)')
+                ).lastrowid
+                conn.executemany(
+                    'INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, ?, ?)',
+                    [(session_id,) + row for row in sets]
+                )
+                db.update_personal_records(
+                    conn, [(session_id,) + row for row in sets], date, user_id
+                )
+
+
+def p50(function, user_ids):
+    timings = []
+    for user_id in user_ids:
+        for _ in range(REPEAT):
+            started = time.perf_counter()
+            function(user_id)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+
+def main():
+    print(f"{SESSIONS_PER_USER} séances x {SETS_PER_SESSION} séries par athlète, "
+          f"p50 sur {SAMPLE} athlètes x {REPEAT} essais (µs)")
+    print(f"{'athlètes':>9} {'séries':>9} {'page':>8} {'détails':>8} {'stats':>8} {'records':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.db')
+        db.DB_PATH = path
+        db.init_database()
+        pool = db.get_pool(path)
+        # L'athlète par défaut créé par la migration est le premier
+        populated = 0
+        for users in USERS:
+            populate(pool, populated + 1, users)
+            populated = users
+            with pool.connection() as conn:
+                user_ids = [row[0] for row in conn.execute('SELECT id FROM users')]
+                total = conn.execute('SELECT COUNT(*) FROM exercises').fetchone()[0]
+                sample = random.Random(users).sample(user_ids, min(SAMPLE, len(user_ids)))
+                latest = dict(conn.execute(
+                    f"SELECT user_id, MAX(id) FROM sessions WHERE user_id IN ({', '.join('?' * len(sample))}) "
+                    "GROUP BY user_id", sample
+                ).fetchall())
+
+            page = p50(lambda user_id: db.get_sessions_page(user_id), sample)
+            details = p50(lambda user_id: db.get_session_details(latest[user_id], user_id), sample)
+            stats = p50(db.get_stats, sample)
+            records = p50(lambda user_id: db.get_personal_records(EXERCISES, user_id), sample)
+            print(f"{users:>9} {total:>9} {page:>8.0f} {details:>8.0f} {stats:>8.0f} {records:>8.0f}")
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
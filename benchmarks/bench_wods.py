@@ -0,0 +1,104 @@
+"""Benchmark du classement d'un WOD et des statistiques CrossFit.
+
+Pour un nombre croissant de résultats (répartis entre athlètes et WODs de
+référence), compare :
+- le classement recalculé depuis wod_results (meilleur par athlète, tri) à
+  la lecture de l'index de wod_bests (db.get_leaderboard) ;
+- les compteurs mensuels recalculés depuis wod_results à la lecture de
+  wod_trends (db.get_wod_trends) ;
+et mesure le coût d'un résultat enregistré (db.record_wod_result).
+
+    python benchmarks/bench_wods.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+RESULTS = (1_000, 10_000, 100_000)
+USERS = 200
+REPEAT = 5
+
+LEADERBOARD_QUERY = """
+    SELECT u.name, r.rounds, r.reps, r.seconds, r.capped, r.date FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY score DESC, id) AS position
+        FROM wod_results WHERE wod_id = ?
+    ) r
+    JOIN users u ON u.id = r.user_id
+    WHERE r.position = 1
+    ORDER BY r.score DESC, r.date
+    LIMIT 10
+"""
+
+TRENDS_QUERY = """
+    SELECT strftime('%Y-%m', r.date, 'unixepoch', 'localtime') AS month, w.wod_type, COUNT(*)
+    FROM wod_results r
+    JOIN wods w ON w.id = r.wod_id
+    WHERE r.user_id = ?
+    GROUP BY month, w.wod_type
+    ORDER BY month, w.wod_type
+"""
+
+
+def populate(pool, results, user_ids, wods):
+    rng = random.Random(results)
+    now = int(time.time())
+    started = time.perf_counter()
+    with pool.transaction() as conn:
+        for _ in range(results):
+            wod = rng.choice(wods)
+            db.record_wod_result(conn, wod['id'], rng.choice(user_ids), rng.randint(0, 15),
+                                 rng.randint(0, 29), rng.randint(120, 1200), False,
+                                 now - rng.randint(0, 3 * 365) * 86400)
+    return (time.perf_counter() - started) / results * 1e6
+
+
+def best_of(function, *args):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    print(f"{USERS} athlètes, WODs de référence, meilleur temps sur {REPEAT} essais (ms)")
+    print(f"{'résultats':>10} {'ajout (µs)':>11} {'classement tri':>15} {'wod_bests':>10} "
+          f"{'tendances calcul':>17} {'wod_trends':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for results in RESULTS:
+            path = os.path.join(tmp, f'wods_{results}.db')
+            db.DB_PATH = path
+            db.init_database()
+            pool = db.get_pool(path)
+            with pool.transaction() as conn:
+                user_ids = [db.get_user_id(conn, f'Athlète {user}') for user in range(1, USERS + 1)]
+            wods = db.get_wods()
+            insert_time = populate(pool, results, user_ids, wods)
+            wod_id = wods[0]['id']
+
+            def leaderboard():
+                with pool.connection() as conn:
+                    return conn.execute(LEADERBOARD_QUERY, (wod_id,)).fetchall()
+
+            def trends():
+                with pool.connection() as conn:
+                    return conn.execute(TRENDS_QUERY, (user_ids[0],)).fetchall()
+
+            sorted_time = best_of(leaderboard)
+            bests_time = best_of(db.get_leaderboard, wod_id)
+            trends_time = best_of(trends)
+            stored_time = best_of(db.get_wod_trends, user_ids[0])
+            print(f"{results:>10} {insert_time:>11.0f} {sorted_time:>15.2f} {bests_time:>10.2f} "
+                  f"{trends_time:>17.2f} {stored_time:>11.2f}")
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Générateur de bases synthétiques réalistes, reproductible (graine).
+
+Chaque athlète suit les six journées de WORKOUT_PROGRAM, au jour de la
+semaine indiqué dans leur nom, pendant N années jusqu'à la date de fin :
+- assiduité propre à l'athlète, vacances et semaines manquées ;
+- double progression par exercice (8 à 12 reps, puis +2,5 kg), avec des
+  semaines de décharge et des séries ratées ;
+- échauffements, finisher et notes occasionnelles ;
+- quelques résultats de WODs de référence par mois.
+Les séances passent par db.insert_session et db.record_wod_result : records,
+compteurs, recherche, calendrier et classements sont à jour.
+
+    python benchmarks/generate.py synthetique.db --years 5 --athletes 3 --seed 42
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import columnar
+import db
+import program
+
+# Jour de la semaine (0 = lundi) de chaque journée, lu dans son nom
+WEEKDAYS = {'Lundi': 0, 'Mardi': 1, 'Mercredi': 2, 'Jeudi': 3, 'Vendredi': 4, 'Samedi': 5, 'Dimanche': 6}
+
+REP_RANGE = (8, 12)
+WEIGHT_INCREMENT = 2.5
+DELOAD_EVERY_WEEKS = (6, 10)
+VACATION_WEEKS_PER_YEAR = 3
+WODS_PER_MONTH = 2
+
+NOTES = ('bonne séance', 'fatigué', 'genou sensible', 'épaule raide', 'manque de sommeil',
+         'nouvelles chaussures', 'salle bondée', 'record en vue')
+
+# Séances écrites par transaction
+SESSIONS_PER_TRANSACTION = 200
+
+
+def schedule():
+    # (jour de la semaine, journée du programme), dans l'ordre de la semaine
+    compiled = program.compile_program()
+    days = []
+    for name, workout in compiled.items():
+        weekday = next(value for day, value in WEEKDAYS.items() if day in name)
+        days.append((weekday, workout))
+    return sorted(days, key=lambda item: item[0])
+
+
+class Athlete:
+    """État d'entraînement simulé d'un athlète."""
+    __slots__ = ('name', 'rng', 'attendance', 'weights', 'ceilings', 'reps', 'deload_week', 'vacations')
+
+    def __init__(self, name, rng, exercise_names, years):
+        self.name = name
+        self.rng = rng
+        self.attendance = rng.uniform(0.7, 0.95)
+        # Charge de départ de chaque exercice, en pas de 1,25 kg
+        self.weights = {exercise: round(rng.uniform(8, 64) / 1.25) * 1.25 for exercise in exercise_names}
+        # Plafond de chaque exercice : la progression ralentit en s'en approchant
+        self.ceilings = {exercise: weight * rng.uniform(1.8, 3.0) for exercise, weight in self.weights.items()}
+        self.reps = {exercise: REP_RANGE[0] for exercise in exercise_names}
+        self.deload_week = rng.randint(*DELOAD_EVERY_WEEKS)
+        # Semaines de vacances consécutives, une période par an
+        self.vacations = set()
+        for year in range(years):
+            first = year * 52 + rng.randrange(52 - VACATION_WEEKS_PER_YEAR)
+            self.vacations.update(range(first, first + VACATION_WEEKS_PER_YEAR))
+
+    def __repr__(self):
+        return f"Athlete({self.name!r})"
+
+    def train(self, workout, week):
+        # Séries d'une séance ; met à jour la progression de chaque exercice
+        deload = week == self.deload_week
+        if week > self.deload_week:
+            self.deload_week = week + self.rng.randint(*DELOAD_EVERY_WEEKS)
+        sets = []
+        for exercise in workout.exercises:
+            target = self.reps[exercise.name]
+            weight = self.weights[exercise.name]
+            if deload:
+                weight = round(weight * 0.9 / 1.25) * 1.25
+            done = []
+            for set_number in range(exercise.num_sets):
+                # Fatigue : les dernières séries perdent plus souvent une rep
+                reps = target
+                if self.rng.random() < 0.15 * set_number:
+                    reps -= 1
+                if self.rng.random() < 0.05:
+                    reps -= 1
+                done.append(max(reps, 1))
+                sets.append({'name': exercise.name, 'weight': weight, 'reps': done[-1]})
+            if deload or self.rng.random() > 1 - (weight / self.ceilings[exercise.name]) ** 2:
+                continue
+            if min(done) >= REP_RANGE[1]:
+                self.weights[exercise.name] += WEIGHT_INCREMENT
+                self.reps[exercise.name] = REP_RANGE[0]
+            elif min(done) >= target:
+                self.reps[exercise.name] = min(target + 1, REP_RANGE[1])
+        return sets
+
+
+def _timestamp(day, rng):
+    # Séance en fin de journée, heure locale
+    minutes = rng.randint(17 * 60, 20 * 60)
+    return int(datetime.combine(day, datetime.min.time()).timestamp()) + minutes * 60
+
+
+def _activities(workout, rng):
+    warmups = [{'name': activity.name, 'duration': activity.default_duration,
+                'notes': rng.choice(NOTES) if rng.random() < 0.03 else ''}
+               for activity in workout.warmups]
+    finisher = {'name': workout.finisher.name,
+                'duration': max(5, workout.finisher.default_duration + rng.randint(-5, 5)), 'notes': ''}
+    return warmups, finisher
+
+
+def generate(path, years=1, athletes=1, seed=42, end=None):
+    """Crée la base `path` ; renvoie les compteurs écrits."""
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=365 * years)
+    # Lundi de la première semaine
+    start -= timedelta(days=start.weekday())
+    weeks = (end - start).days // 7 + 1
+    days = schedule()
+    exercise_names = sorted({exercise.name for _weekday, workout in days for exercise in workout.exercises})
+
+    db.DB_PATH = path
+    db.init_database()
+    pool = db.get_pool(path)
+    counts = {'athletes': 0, 'sessions': 0, 'sets': 0, 'wod_results': 0}
+    benchmark_wods = [wod for wod in db.get_wods() if wod['benchmark']]
+
+    for number in range(1, athletes + 1):
+        athlete_rng = random.Random(rng.random())
+        with pool.transaction() as conn:
+            user_id = db.DEFAULT_USER_ID if number == 1 else db.get_user_id(conn, f'Athlète {number}')
+        athlete = Athlete(f'Athlète {number}', athlete_rng, exercise_names, years)
+        counts['athletes'] += 1
+
+        sessions, wod_results = [], []
+        for week in range(weeks):
+            if week in athlete.vacations:
+                continue
+            for weekday, workout in days:
+                day = start + timedelta(days=week * 7 + weekday)
+                if day > end or athlete_rng.random() > athlete.attendance:
+                    continue
+                sets = athlete.train(workout, week)
+                warmups, finisher = _activities(workout, athlete_rng)
+                notes = athlete_rng.choice(NOTES) if athlete_rng.random() < 0.1 else ''
+                sessions.append((workout.name, sets, warmups, finisher, _timestamp(day, athlete_rng), notes))
+            # Quelques WODs par mois, le dimanche
+            sunday = start + timedelta(days=week * 7 + 6)
+            if benchmark_wods and sunday <= end and athlete_rng.random() < WODS_PER_MONTH * 12 / 52:
+                wod_results.append((athlete_rng.choice(benchmark_wods), _timestamp(sunday, athlete_rng)))
+            if len(sessions) >= SESSIONS_PER_TRANSACTION or week == weeks - 1:
+                with pool.transaction() as conn:
+                    for session_type, sets, warmups, finisher, timestamp, notes in sessions:
+                        db.insert_session(conn, session_type, sets, warmups, finisher, timestamp, user_id, notes)
+                        counts['sessions'] += 1
+                        counts['sets'] += len(sets)
+                    for wod, timestamp in wod_results:
+                        _write_wod_result(conn, wod, user_id, timestamp, athlete_rng)
+                        counts['wod_results'] += 1
+                sessions, wod_results = [], []
+
+    # Copie colonnaire recréée : un reste d'une base précédente au même chemin est écarté
+    with pool.connection() as conn:
+        columnar.rebuild(conn)
+    return counts
+
+
+def _write_wod_result(conn, wod, user_id, timestamp, rng):
+    if wod['type'] == 'AMRAP':
+        db.record_wod_result(conn, wod['id'], user_id, rng.randint(8, 22), rng.randint(0, 29), date=timestamp)
+    elif rng.random() < 0.1:
+        db.record_wod_result(conn, wod['id'], user_id, reps=rng.randint(20, 120), capped=True, date=timestamp)
+    else:
+        cap = wod['time_cap'] * 60
+        db.record_wod_result(conn, wod['id'], user_id, seconds=rng.randint(cap // 4, cap - 1), date=timestamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="Base à créer")
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--athletes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=date.fromisoformat, help="Dernier jour (AAAA-MM-JJ), aujourd'hui par défaut")
+    args = parser.parse_args()
+    if os.path.exists(args.path):
+        raise SystemExit(f"{args.path} existe déjà")
+
+    started = time.perf_counter()
+    counts = generate(args.path, args.years, args.athletes, args.seed, args.end)
+    print(f"{counts['athletes']} athlètes, {counts['sessions']} séances, {counts['sets']} séries, "
+          f"{counts['wod_results']} résultats de WOD en {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
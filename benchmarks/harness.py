@@ -0,0 +1,237 @@
+"""Suite de benchmarks de l'application sur des bases synthétiques.
+
+Pour chaque base générée (benchmarks/generate.py : 1, 5 et 10 ans par
+défaut) :
+- chaque fonction de données utilisée par les pages est appelée
+  --iterations fois ;
+- chaque page est rendue via streamlit.testing (AppTest), --reruns fois.
+Rapporte p50/p95 de la latence et le pic mémoire (tracemalloc : allocations
+Python uniquement, pas le cache de pages de SQLite), puis compare aux
+références de benchmarks/baselines.json : un p95 ou un pic mémoire au-delà
+de la tolérance est signalé comme régression (code de sortie 1).
+
+    python benchmarks/harness.py                    # 1, 5 et 10 ans, 1 athlète
+    python benchmarks/harness.py --years 5 --athletes 20 --skip-pages
+    python benchmarks/harness.py --save-baseline    # enregistre les références
+
+Les références dépendent de la machine : les enregistrer sur celle qui
+exécute la comparaison.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analytics
+import db
+import generate
+import program
+import recommendations
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baselines.json')
+APP_PATH = os.path.join(ROOT, 'app.py')
+
+# Régression : p95 plus de 50 % au-dessus de la référence (et d'au moins
+# 1 ms, en dessous c'est du bruit), ou pic mémoire plus de 25 % au-dessus
+TIME_TOLERANCE = 0.5
+MIN_DELTA_MS = 1.0
+MEMORY_TOLERANCE = 0.25
+MIN_DELTA_KB = 64
+
+PAGES = ("🏠 Accueil", "💪 Musculation", "🎯 CrossFit", "📊 Historique", "📅 Calendrier", "📈 Progression")
+SESSION_TYPE = 'PUSH (Lundi)'
+
+
+def measure(function, iterations):
+    # Un appel d'échauffement (caches, pages SQLite), les appels chronométrés,
+    # puis un appel sous tracemalloc pour le pic mémoire
+    function()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'peak_kb': peak / 1024,
+    }
+
+
+def data_functions(user_id):
+    """(nom, fonction sans argument) des lectures et écritures des pages."""
+    workout = program.compile_program()[SESSION_TYPE]
+    exercise = workout.exercise_names[1]
+    with db.connection() as conn:
+        latest = conn.execute(
+            'SELECT MAX(id), MAX(date) FROM sessions WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        fran = conn.execute("SELECT id FROM wods WHERE name = 'Fran'").fetchone()[0]
+    session_id, last_date = latest
+    year = date.fromtimestamp(last_date).year
+
+    def compute_analytics():
+        with db.connection() as conn:
+            return analytics.compute(conn, 'epley', user_id)
+
+    def save_session():
+        sets = [{'name': name, 'weight': 40.0, 'reps': 10} for name in workout.exercise_names]
+        db.save_session(SESSION_TYPE, sets, [], None, None, user_id)
+
+    return [
+        ('db.get_stats', lambda: db.get_stats(user_id)),
+        ('db.get_sessions_history (30 j)', lambda: db.get_sessions_history(user_id, 30)),
+        ('db.get_sessions_history (tout)', lambda: db.get_sessions_history(user_id)),
+        ('db.get_sessions_page', lambda: db.get_sessions_page(user_id)),
+        ('db.get_session_details', lambda: db.get_session_details(session_id, user_id)),
+        ('db.get_personal_record', lambda: db.get_personal_record(exercise, user_id)),
+        ('db.get_personal_records', lambda: db.get_personal_records(workout.exercise_names, user_id)),
+        ('db.search_sessions', lambda: db.search_sessions('genou', user_id)),
+        ('db.get_daily_summary', lambda: db.get_daily_summary(date(year, 1, 1), date(year, 12, 31), user_id)),
+        ('db.get_leaderboard', lambda: db.get_leaderboard(fran)),
+        ('db.get_wod_trends', lambda: db.get_wod_trends(user_id)),
+        ('recommendations.recommend', lambda: recommendations.recommend(workout, user_id)),
+        ('analytics.compute', compute_analytics),
+        # En dernier : chaque appel ajoute une séance
+        ('db.save_session', save_session),
+    ]
+
+
+def page_renders(reruns):
+    """Rendus des pages via AppTest ; [] si streamlit n'est pas installé."""
+    try:
+        import streamlit as st
+        from streamlit.logger import set_log_level
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit n'est pas installé : rendus des pages ignorés")
+        return []
+
+    # Avertissements de rendu (libellés vides...) : hors sujet ici
+    st.config.set_option('logger.level', 'error')
+    set_log_level('error')
+
+    # Ressources et données en cache d'une base précédente écartées
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    results = []
+    for page in PAGES + ("💪 Musculation (séance)",):
+        app = AppTest.from_file(APP_PATH, default_timeout=120)
+        app.run()
+        app.sidebar.radio[0].set_value(page.split(' (')[0]).run()
+        if page.endswith("(séance)"):
+            # Séance démarrée (ou reprise, base réutilisée) : blocs d'exercices, suggestions pré-remplies
+            next(button for button in app.button
+                 if button.label in ("Commencer la séance", "Reprendre la séance")).click().run()
+        if app.exception:
+            raise RuntimeError(f"{page} : {app.exception[0].value}")
+        results.append((f"page {page}", measure(app.run, reruns)))
+    return results
+
+
+def dataset_key(years, athletes):
+    return f"{years} ans x {athletes} athlètes"
+
+
+def compare(result, baseline):
+    # Statut d'une mesure face à sa référence
+    if baseline is None:
+        return "nouveau"
+    slower = (result['p95_ms'] > baseline['p95_ms'] * (1 + TIME_TOLERANCE)
+              and result['p95_ms'] - baseline['p95_ms'] > MIN_DELTA_MS)
+    heavier = (result['peak_kb'] > baseline['peak_kb'] * (1 + MEMORY_TOLERANCE)
+               and result['peak_kb'] - baseline['peak_kb'] > MIN_DELTA_KB)
+    if slower or heavier:
+        return "RÉGRESSION " + ", ".join(
+            label for label, flag in (("p95", slower), ("mémoire", heavier)) if flag
+        )
+    return "OK"
+
+
+def run_dataset(data_dir, work_dir, years, athletes, seed, iterations, reruns, skip_pages):
+    # Base générée gardée intacte ; les mesures (écritures comprises) portent sur une copie
+    source = os.path.join(data_dir, f'synthetique_{years}a_{athletes}x_{seed}.db')
+    if not os.path.exists(source):
+        started = time.perf_counter()
+        counts = generate.generate(source, years, athletes, seed)
+        db.get_pool(source).close()
+        print(f"  base générée en {time.perf_counter() - started:.1f} s : {counts['sessions']} séances, "
+              f"{counts['sets']} séries, {counts['wod_results']} résultats de WOD")
+    path = os.path.join(work_dir, 'mesure_' + os.path.basename(source))
+    shutil.copyfile(source, path)
+    db.DB_PATH = path
+    db.init_database()
+    # L'application ouverte par AppTest lit la même base
+    os.environ['WORKOUT_DB'] = path
+
+    results = [(name, measure(function, iterations))
+               for name, function in data_functions(db.DEFAULT_USER_ID)]
+    if not skip_pages:
+        results += page_renders(reruns)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, nargs='+', default=[1, 5, 10], help="Durées d'historique générées")
+    parser.add_argument("--athletes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=30, help="Appels chronométrés par fonction")
+    parser.add_argument("--reruns", type=int, default=10, help="Reruns chronométrés par page")
+    parser.add_argument("--skip-pages", action="store_true", help="Ne pas mesurer les pages (AppTest)")
+    parser.add_argument("--data-dir", help="Garder les bases générées dans ce dossier (réutilisées ensuite)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichier JSON des références")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les mesures comme références")
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    regressions = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        data_dir = args.data_dir or work_dir
+        os.makedirs(data_dir, exist_ok=True)
+        for years in args.years:
+            key = dataset_key(years, args.athletes)
+            print(f"== {key} ==")
+            results = run_dataset(data_dir, work_dir, years, args.athletes, args.seed, args.iterations,
+                                  args.reruns, args.skip_pages)
+            print(f"{'mesure':<34} {'p50 (ms)':>9} {'p95 (ms)':>9} {'pic (Ko)':>9}  statut")
+            for name, result in results:
+                status = compare(result, baselines.get(key, {}).get(name))
+                regressions += status.startswith("RÉGRESSION")
+                print(f"{name:<34} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                      f"{result['peak_kb']:>9.0f}  {status}")
+            if args.save_baseline:
+                baselines[key] = {name: result for name, result in results}
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f"Références enregistrées dans {args.baseline}")
+    elif regressions:
+        print(f"{regressions} régressions par rapport à {args.baseline}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
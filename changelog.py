@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import columnar
+import db
+
+# Modifications lues ou appliquées par transaction
+CHANGES_CHUNK = 1000
+
+# Tables dont columnar.py garde une copie (séries, et date et athlète des séances)
+COLUMNAR_TABLES = ('exercises', 'sessions')
+
+
+def database_id(conn):
+    return conn.execute("SELECT value FROM database_info WHERE key = 'id'").fetchone()[0]
+
+
+def last_seq(conn):
+    return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM changelog').fetchone()[0]
+
+
+def iter_changes(conn, since=0, chunk_size=CHANGES_CHUNK):
+    """Modifications de numéro strictement supérieur à `since`, dans l'ordre."""
+    cursor = conn.execute('''
+        SELECT seq, table_name, op, row_id, data FROM changelog
+        WHERE seq > ?
+        ORDER BY seq
+    ''', (since,))
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        for seq, table, op, row_id, data in rows:
+            yield {'seq': seq, 'table': table, 'op': op, 'id': row_id,
+                   'data': json.loads(data) if data is not None else None}
+
+
+def export_changes(f, since=0):
+    """Écrit en JSON lines les modifications postérieures à `since`.
+
+    La première ligne identifie la base source et le filigrane de départ ;
+    renvoie (nombre de modifications, dernier seq exporté).
+    """
+    count = 0
+    with db.connection() as conn:
+        f.write(json.dumps({'database': database_id(conn), 'since': since}) + '\n')
+        last = since
+        for change in iter_changes(conn, since):
+            f.write(json.dumps(change, ensure_ascii=False) + '\n')
+            count += 1
+            last = change['seq']
+    return count, last
+
+
+def _table_columns(conn):
+    return {
+        table: {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        for table in db.CHANGELOG_TABLES
+    }
+
+
+def _local_references(conn):
+    """Tables locales (non répliquées) qui référencent une table répliquée.
+
+    Renvoie table répliquée -> [(table locale, colonne)] : records,
+    classements, compteurs et brouillons de cette base.
+    """
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql NOT LIKE 'CREATE VIRTUAL%'"
+    )]
+    references = {}
+    for table in tables:
+        if table in db.CHANGELOG_TABLES:
+            continue
+        for foreign_key in conn.execute(f'PRAGMA foreign_key_list({table})'):
+            parent, column = foreign_key[2], foreign_key[3]
+            if parent in db.CHANGELOG_TABLES:
+                references.setdefault(parent, []).append((table, column))
+    return references
+
+
+def apply_change(conn, change, columns, references=None):
+    table = change['table']
+    if table not in columns:
+        raise ValueError(f"Table non répliquée : {table}")
+    if change['op'] == 'D':
+        # Lignes locales qui référencent la ligne supprimée (records et
+        # classements recalculés ensuite) : supprimées d'abord, sinon la
+        # clé étrangère fait échouer la suppression
+        for local_table, column in (references or {}).get(table, ()):
+            conn.execute(f'DELETE FROM {local_table} WHERE {column} = ?', (change['id'],))
+        conn.execute(f'DELETE FROM {table} WHERE id = ?', (change['id'],))
+        return
+    # Colonnes inconnues de cette base (schéma plus récent) ignorées
+    data = {key: value for key, value in change['data'].items() if key in columns[table]}
+    names = ', '.join(data)
+    updates = ', '.join(f'{name} = excluded.{name}' for name in data if name != 'id')
+    conn.execute(f'''
+        INSERT INTO {table} ({names}) VALUES ({', '.join('?' * len(data))})
+        ON CONFLICT (id) DO UPDATE SET {updates}
+    ''', list(data.values()))
+
+
+def apply_changes(lines, chunk_size=CHANGES_CHUNK):
+    """Applique un export de export_changes (itérable de lignes JSON).
+
+    Les modifications déjà appliquées depuis la même source sont ignorées ;
+    un export qui commence après le dernier seq appliqué est refusé (trou
+    dans la suite). Renvoie (modifications appliquées, dernier seq).
+    """
+    lines = iter(lines)
+    header = json.loads(next(lines))
+    source = header['database']
+    applied = 0
+    # Séries ou séances modifiées en place : la copie colonnaire, qui ne fait
+    # qu'ajouter les nouvelles lignes, doit être reconstruite
+    rewritten = False
+
+    with db.connection() as conn:
+        if source == database_id(conn):
+            raise ValueError("Modifications issues de cette même base")
+        row = conn.execute('SELECT last_seq FROM sync_state WHERE source = ?', (source,)).fetchone()
+        last = row[0] if row else 0
+        if header['since'] > last:
+            raise ValueError(
+                f"Modifications {last + 1} à {header['since']} manquantes : exporter depuis --since {last}"
+            )
+        columns = _table_columns(conn)
+        references = _local_references(conn)
+
+    changes = (json.loads(line) for line in lines if line.strip())
+    while True:
+        with db.transaction() as conn:
+            chunk = 0
+            for change in changes:
+                if change['seq'] > last:
+                    apply_change(conn, change, columns, references)
+                    last = change['seq']
+                    applied += 1
+                    rewritten = rewritten or (change['op'] in ('U', 'D')
+                                              and change['table'] in COLUMNAR_TABLES)
+                chunk += 1
+                if chunk >= chunk_size:
+                    break
+            conn.execute('''
+                INSERT INTO sync_state (source, last_seq) VALUES (?, ?)
+                ON CONFLICT (source) DO UPDATE SET last_seq = excluded.last_seq
+            ''', (source, last))
+        if chunk < chunk_size:
+            break
+
+    # Records et classements recalculés (tenus à jour par l'application,
+    # pas par trigger) ; une reconstruction de la copie colonnaire change sa
+    # version, ce qui invalide les analyses en cache de l'application
+    if applied:
+        db.rebuild_personal_records()
+        db.rebuild_wod_stats()
+        if rewritten:
+            columnar.rebuild()
+        else:
+            columnar.sync()
+    return applied, last
+
+
+def table_checksums(conn):
+    # Empreinte du contenu de chaque table répliquée, colonnes triées par nom
+    checksums = {}
+    for table in db.CHANGELOG_TABLES:
+        columns = sorted(row[1] for row in conn.execute(f'PRAGMA table_info({table})'))
+        digest = hashlib.sha256()
+        for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id"):
+            digest.update(repr(row).encode())
+        checksums[table] = digest.hexdigest()
+    return checksums
+
+
+def verify_replay():
+    """Rejoue tout le journal dans une base vide et compare les empreintes.
+
+    Renvoie (empreintes de la base, empreintes de la copie rejouée).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        replica = db.ConnectionPool(os.path.join(tmp, 'replay.db'))
+        try:
+            with db.connection() as source, replica.connection() as target:
+                # Journal et tables lus dans le même instantané
+                source.execute('BEGIN')
+                db.migrate(target)
+                columns = _table_columns(target)
+                references = _local_references(target)
+                with target:
+                    for change in iter_changes(source):
+                        apply_change(target, change, columns, references)
+                expected = table_checksums(source)
+                source.rollback()
+                return expected, table_checksums(target)
+        finally:
+            replica.close()
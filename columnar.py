@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import db
+
+# Colonnes de la copie colonnaire de exercises, une par fichier binaire brut
+COLUMNS = (
+    ('session_id', '<i8'),
+    ('user_id', '<i4'),
+    ('date', '<i8'),
+    ('exercise_id', '<i4'),
+    ('weight', '<f8'),
+    ('reps', '<i4'),
+)
+
+# Lignes lues par requête lors d'une reconstruction
+SYNC_CHUNK = 50_000
+
+# Tables copiées : une modification en place de l'une d'elles impose une reconstruction
+SOURCE_TABLES = ('exercises', 'sessions')
+
+_lock = threading.Lock()
+
+
+def store_path(db_path=None):
+    # Répertoire à côté de la base : workout.db -> workout.db.columns/
+    return (db_path or db.DB_PATH) + '.columns'
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Copie créée avec d'autres colonnes : à reconstruire
+    if meta.get('columns') != [name for name, _dtype in COLUMNS]:
+        return None
+    # Fichier de colonne absent ou tronqué : copie inutilisable
+    for name, dtype in COLUMNS:
+        column = os.path.join(path, name + '.bin')
+        if not os.path.exists(column) or os.path.getsize(column) < meta['rows'] * np.dtype(dtype).itemsize:
+            return None
+    return meta
+
+
+def _write_meta(path, meta):
+    # Remplacement atomique : le filigrane n'avance qu'une fois les
+    # colonnes écrites
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+
+def _append(path, meta, rows):
+    # rows : tuples (id, puis une valeur par colonne de COLUMNS). Chaque
+    # colonne est convertie dans son propre type : un passage par float64
+    # arrondirait les entiers au-delà de 2**53
+    table = list(zip(*rows))
+    for index, (name, dtype) in enumerate(COLUMNS, 1):
+        values = np.array(table[index], dtype=dtype)
+        with open(os.path.join(path, name + '.bin'), 'r+b') as f:
+            # Ignorer une fin de fichier écrite par un ajout interrompu
+            f.truncate(meta['rows'] * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(values.tobytes())
+    meta['rows'] += len(rows)
+    meta['max_id'] = rows[-1][0]
+    _write_meta(path, meta)
+
+
+def _reset(path):
+    os.makedirs(path, exist_ok=True)
+    for name, _dtype in COLUMNS:
+        # Nouveau fichier plutôt que troncature : les tableaux déjà projetés
+        # (cache de analytics) gardent l'ancien contenu
+        column = os.path.join(path, name + '.bin')
+        open(column + '.tmp', 'wb').close()
+        os.replace(column + '.tmp', column)
+    # Génération : distingue une copie reconstruite de la précédente
+    meta = {'rows': 0, 'max_id': 0, 'generation': time.time_ns(),
+            'columns': [name for name, _dtype in COLUMNS]}
+    _write_meta(path, meta)
+    return meta
+
+
+def sync(conn=None):
+    """Ajoute à la copie colonnaire les séries insérées depuis le filigrane.
+
+    Filigrane : dernier exercises.id copié et dernier seq du journal des
+    modifications (changelog). Journal inchangé : rien à lire. Si une
+    séance ou une série a été modifiée ou supprimée depuis (ou si la base
+    n'est plus la même), la copie est reconstruite. Renvoie le nombre de
+    lignes ajoutées.
+    """
+    if conn is None:
+        with db.connection() as conn:
+            return sync(conn)
+
+    path = store_path()
+    with _lock:
+        meta = _read_meta(path)
+        # Lus avant les séries : une écriture intercalée sera vue au prochain appel
+        database = conn.execute("SELECT value FROM database_info WHERE key = 'id'").fetchone()[0]
+        seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM changelog').fetchone()[0]
+        # Copie vide (juste reconstruite) : rien ne peut y être périmé
+        if meta is not None and meta['max_id']:
+            # Copie d'une autre base, d'un journal plus long, ou d'avant le filigrane du journal
+            if meta.get('database') != database or meta.get('changelog_seq', seq + 1) > seq:
+                meta = None
+            elif meta['changelog_seq'] == seq:
+                return 0
+            elif conn.execute(f'''
+                SELECT 1 FROM changelog
+                WHERE seq > ? AND op IN ('U', 'D')
+                  AND table_name IN ({', '.join('?' * len(SOURCE_TABLES))})
+                LIMIT 1
+            ''', (meta['changelog_seq'], *SOURCE_TABLES)).fetchone():
+                meta = None
+        if meta is None:
+            meta = _reset(path)
+        meta['database'] = database
+
+        added = 0
+        cursor = conn.execute('''
+            SELECT e.id, e.session_id, s.user_id, s.date, e.exercise_id, e.weight, e.reps
+            FROM exercises e
+            JOIN sessions s ON s.id = e.session_id
+            WHERE e.id > ?
+            ORDER BY e.id
+        ''', (meta['max_id'],))
+        while True:
+            rows = cursor.fetchmany(SYNC_CHUNK)
+            if not rows:
+                break
+            _append(path, meta, rows)
+            added += len(rows)
+        meta['changelog_seq'] = seq
+        _write_meta(path, meta)
+        return added
+
+
+def rebuild(conn=None):
+    # Reconstruction forcée (sync reconstruit seul après une modification en place)
+    with _lock:
+        _reset(store_path())
+    return sync(conn)
+
+
+def version():
+    """(génération, lignes) de la copie, None si elle n'existe pas encore.
+
+    Change à chaque ajout et à chaque reconstruction, y compris par un autre
+    processus (debug_db.py changes-apply) : sert de clé aux caches d'analyses.
+    """
+    with _lock:
+        meta = _read_meta(store_path())
+    if meta is None:
+        return None
+    return meta.get('generation', 0), meta['rows']
+
+
+def load(conn=None):
+    """Colonnes de la copie, projetées en mémoire par numpy.memmap.
+
+    Aucune ligne n'est matérialisée en Python : les tableaux renvoyés
+    pointent directement sur les pages des fichiers.
+    """
+    sync(conn)
+    path = store_path()
+    columns = {}
+    # Fichiers projetés sous le verrou : une synchronisation du thread
+    # d'écriture ne peut pas les remplacer entre la lecture de meta et mmap.
+    # Une fois ouverts, ils gardent leur contenu (_reset crée de nouveaux
+    # fichiers, _append n'écrit qu'après les lignes projetées)
+    with _lock:
+        rows = _read_meta(path)['rows']
+        for name, dtype in COLUMNS:
+            if rows:
+                columns[name] = np.memmap(os.path.join(path, name + '.bin'), dtype=dtype,
+                                          mode='r', shape=(rows,))
+            else:
+                columns[name] = np.empty(0, dtype=dtype)
+    return columns
@@ -0,0 +1,1946 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import instrumentation
+import movements
+import wods
+
+# Chemin de la base de données (surchargeable pour les tests et benchmarks)
+DB_PATH = os.environ.get('WORKOUT_DB', 'workout.db')
+
+# Pragmas appliqués une seule fois, à l'ouverture de chaque connexion
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA mmap_size=134217728',
+)
+
+
+class ConnectionPool:
+    """Pool de connexions SQLite partagé par tous les threads du processus.
+
+    Streamlit relance le script (souvent dans un nouveau thread) à chaque
+    interaction : les connexions sont donc empruntées puis rendues au pool
+    au lieu d'être ouvertes et fermées à chaque requête.
+    """
+
+    def __init__(self, path=DB_PATH, max_size=8):
+        self.path = path
+        self.max_size = max_size
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _open(self):
+        # Requêtes notées (texte, durée, lignes) par le module instrumentation
+        conn = sqlite3.connect(self.path, check_same_thread=False,
+                               factory=instrumentation.InstrumentedConnection)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn):
+        # Annuler une éventuelle transaction restée ouverte
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def transaction(self):
+        # Commit si le bloc se termine normalement, rollback sinon
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    # Un seul pool par fichier et par processus : le module n'est importé
+    # qu'une fois, il survit donc aux reruns de Streamlit
+    path = path or DB_PATH
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def connection():
+    return get_pool().connection()
+
+
+def transaction():
+    return get_pool().transaction()
+
+
+def connections_opened():
+    return get_pool().opened
+
+
+# Recalcul complet des compteurs de stats_rollup, dans l'ordre des colonnes
+# (ligne unique des schémas v1 à v5)
+STATS_FROM_SCRATCH_V1 = '''
+    (SELECT COUNT(*) FROM sessions),
+    (SELECT COUNT(*) FROM exercises),
+    (SELECT COALESCE(SUM(weight * reps), 0) FROM exercises),
+    (SELECT MAX(weight) FROM exercises)
+'''
+
+STATS_COLUMNS = ('total_sessions', 'total_sets', 'total_volume', 'max_weight')
+
+# Triggers de stats_rollup des schémas v1 à v5 (ils ne lisent que weight et
+# reps, d'où leur reprise telle quelle en v2)
+STATS_TRIGGERS_V1 = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_session_insert AFTER INSERT ON sessions
+    BEGIN
+        UPDATE stats_rollup SET total_sessions = total_sessions + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_session_delete AFTER DELETE ON sessions
+    BEGIN
+        UPDATE stats_rollup SET total_sessions = total_sessions - 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_exercise_insert AFTER INSERT ON exercises
+    BEGIN
+        UPDATE stats_rollup SET
+            total_sets = total_sets + 1,
+            total_volume = total_volume + COALESCE(NEW.weight * NEW.reps, 0),
+            max_weight = CASE WHEN max_weight IS NULL OR NEW.weight > max_weight
+                              THEN NEW.weight ELSE max_weight END
+        WHERE id = 1;
+    END
+    ''',
+    # Le record global n'est recalculé que si la série supprimée l'égalait
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_exercise_delete AFTER DELETE ON exercises
+    BEGIN
+        UPDATE stats_rollup SET
+            total_sets = total_sets - 1,
+            total_volume = total_volume - COALESCE(OLD.weight * OLD.reps, 0),
+            max_weight = CASE WHEN OLD.weight >= max_weight
+                              THEN (SELECT MAX(weight) FROM exercises) ELSE max_weight END
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_exercise_update AFTER UPDATE OF weight, reps ON exercises
+    BEGIN
+        UPDATE stats_rollup SET
+            total_volume = total_volume - COALESCE(OLD.weight * OLD.reps, 0)
+                                        + COALESCE(NEW.weight * NEW.reps, 0),
+            max_weight = CASE WHEN OLD.weight >= max_weight
+                              THEN (SELECT MAX(weight) FROM exercises)
+                              WHEN max_weight IS NULL OR NEW.weight > max_weight
+                              THEN NEW.weight ELSE max_weight END
+        WHERE id = 1;
+    END
+    ''',
+)
+
+# Recalcul des records personnels depuis tout l'historique (schémas v2 à v5)
+REBUILD_RECORDS_V2_SQL = '''
+    INSERT INTO personal_records (exercise_id, weight, reps, date, session_id)
+    SELECT exercise_id, weight, reps, date, session_id
+    FROM (
+        SELECT e.exercise_id, e.weight, e.reps, s.date, e.session_id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY e.exercise_id
+                   ORDER BY e.weight DESC, e.reps DESC, e.id
+               ) AS rank
+        FROM exercises e
+        JOIN sessions s ON s.id = e.session_id
+    )
+    WHERE rank = 1
+'''
+
+# Compteurs de la page d'accueil recalculés pour chaque athlète, dans
+# l'ordre (user_id, STATS_COLUMNS)
+STATS_BY_USER_SQL = '''
+    SELECT u.id, COUNT(DISTINCT s.id), COUNT(e.id),
+           COALESCE(SUM(e.weight * e.reps), 0), MAX(e.weight)
+    FROM users u
+    LEFT JOIN sessions s ON s.user_id = u.id
+    LEFT JOIN exercises e ON e.session_id = s.id
+    GROUP BY u.id
+'''
+
+# Triggers de stats_rollup par athlète (schéma v6). La ligne d'un athlète
+# est créée avec lui ; une série retrouve son athlète par sa séance
+STATS_TRIGGERS = (
+    '''
+    CREATE TRIGGER trg_stats_user_insert AFTER INSERT ON users
+    BEGIN
+        INSERT OR IGNORE INTO stats_rollup (user_id) VALUES (NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER trg_stats_session_insert AFTER INSERT ON sessions
+    BEGIN
+        UPDATE stats_rollup SET total_sessions = total_sessions + 1 WHERE user_id = NEW.user_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER trg_stats_session_delete AFTER DELETE ON sessions
+    BEGIN
+        UPDATE stats_rollup SET total_sessions = total_sessions - 1 WHERE user_id = OLD.user_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER trg_stats_exercise_insert AFTER INSERT ON exercises
+    BEGIN
+        UPDATE stats_rollup SET
+            total_sets = total_sets + 1,
+            total_volume = total_volume + COALESCE(NEW.weight * NEW.reps, 0),
+            max_weight = CASE WHEN max_weight IS NULL OR NEW.weight > max_weight
+                              THEN NEW.weight ELSE max_weight END
+        WHERE user_id = (SELECT user_id FROM sessions WHERE id = NEW.session_id);
+    END
+    ''',
+    # Le record de l'athlète n'est recalculé que si la série supprimée l'égalait
+    '''
+    CREATE TRIGGER trg_stats_exercise_delete AFTER DELETE ON exercises
+    BEGIN
+        UPDATE stats_rollup SET
+            total_sets = total_sets - 1,
+            total_volume = total_volume - COALESCE(OLD.weight * OLD.reps, 0),
+            max_weight = CASE WHEN OLD.weight >= max_weight
+                              THEN (SELECT MAX(e.weight) FROM sessions s
+                                    JOIN exercises e ON e.session_id = s.id
+                                    WHERE s.user_id = stats_rollup.user_id)
+                              ELSE max_weight END
+        WHERE user_id = (SELECT user_id FROM sessions WHERE id = OLD.session_id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER trg_stats_exercise_update AFTER UPDATE OF weight, reps ON exercises
+    BEGIN
+        UPDATE stats_rollup SET
+            total_volume = total_volume - COALESCE(OLD.weight * OLD.reps, 0)
+                                        + COALESCE(NEW.weight * NEW.reps, 0),
+            max_weight = CASE WHEN OLD.weight >= max_weight
+                              THEN (SELECT MAX(e.weight) FROM sessions s
+                                    JOIN exercises e ON e.session_id = s.id
+                                    WHERE s.user_id = stats_rollup.user_id)
+                              WHEN max_weight IS NULL OR NEW.weight > max_weight
+                              THEN NEW.weight ELSE max_weight END
+        WHERE user_id = (SELECT user_id FROM sessions WHERE id = NEW.session_id);
+    END
+    ''',
+)
+
+# Recalcul des records personnels de chaque athlète depuis tout l'historique
+REBUILD_RECORDS_SQL = '''
+    INSERT INTO personal_records (user_id, exercise_id, weight, reps, date, session_id)
+    SELECT user_id, exercise_id, weight, reps, date, session_id
+    FROM (
+        SELECT s.user_id, e.exercise_id, e.weight, e.reps, s.date, e.session_id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY s.user_id, e.exercise_id
+                   ORDER BY e.weight DESC, e.reps DESC, e.id
+               ) AS rank
+        FROM exercises e
+        JOIN sessions s ON s.id = e.session_id
+    )
+    WHERE rank = 1
+'''
+
+# Athlète auquel sont rattachées les séances antérieures au schéma v6
+DEFAULT_USER_ID = 1
+
+# Lectures d'historique sur tous les athlètes (exports, maintenance) : à
+# passer explicitement, user_id n'a pas de valeur par défaut
+ALL_USERS = 'tous'
+
+
+def _schema_v1(conn):
+    # Schéma d'origine : dates en texte, noms d'exercices dans chaque série
+    statements = (
+        # Table des sessions
+        '''
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            type TEXT,
+            notes TEXT
+        )
+        ''',
+        # Table des exercices
+        '''
+        CREATE TABLE IF NOT EXISTS exercises (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER,
+            name TEXT,
+            weight REAL,
+            reps INTEGER,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+        ''',
+        # Table des échauffements
+        '''
+        CREATE TABLE IF NOT EXISTS warmups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER,
+            activity TEXT,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+        ''',
+        # Table des finishers
+        '''
+        CREATE TABLE IF NOT EXISTS finishers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER,
+            activity TEXT,
+            duration INTEGER,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+        ''',
+        # Records personnels, tenus à jour par save_session
+        '''
+        CREATE TABLE IF NOT EXISTS personal_records (
+            exercise TEXT PRIMARY KEY,
+            weight REAL NOT NULL,
+            reps INTEGER NOT NULL,
+            date DATETIME,
+            session_id INTEGER,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+        ''',
+        # Compteurs de la page d'accueil, maintenus par les triggers
+        '''
+        CREATE TABLE IF NOT EXISTS stats_rollup (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_sessions INTEGER NOT NULL DEFAULT 0,
+            total_sets INTEGER NOT NULL DEFAULT 0,
+            total_volume REAL NOT NULL DEFAULT 0,
+            max_weight REAL
+        )
+        ''',
+        # Ligne unique, calculée depuis l'historique existant à la création
+        f'''
+        INSERT INTO stats_rollup (id, total_sessions, total_sets, total_volume, max_weight)
+        SELECT 1, {STATS_FROM_SCRATCH_V1}
+        WHERE NOT EXISTS (SELECT 1 FROM stats_rollup)
+        ''',
+    ) + STATS_TRIGGERS_V1
+    for statement in statements:
+        conn.execute(statement)
+
+
+def _schema_v2(conn):
+    """Dates en secondes epoch, catalogue d'exercices et index.
+
+    Les tables sessions et exercises sont reconstruites (méthode
+    recommandée par SQLite pour changer le type d'une colonne). Les
+    anciennes dates texte étaient en heure locale.
+    """
+    conn.execute('''
+        CREATE TABLE exercise_catalog (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO exercise_catalog (name)
+        SELECT name FROM exercises
+        WHERE name IS NOT NULL
+        GROUP BY name
+        ORDER BY MIN(id)
+    ''')
+
+    conn.execute('''
+        CREATE TABLE sessions_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            type TEXT,
+            notes TEXT
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO sessions_v2 (id, date, type, notes)
+        SELECT id,
+               COALESCE(CAST(strftime('%s', date, 'utc') AS INTEGER),
+                        CAST(strftime('%s', 'now') AS INTEGER)),
+               type, notes
+        FROM sessions
+    ''')
+
+    conn.execute('''
+        CREATE TABLE exercises_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL,
+            exercise_id INTEGER NOT NULL,
+            weight REAL NOT NULL,
+            reps INTEGER NOT NULL,
+            FOREIGN KEY (session_id) REFERENCES sessions (id),
+            FOREIGN KEY (exercise_id) REFERENCES exercise_catalog (id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO exercises_v2 (id, session_id, exercise_id, weight, reps)
+        SELECT e.id, e.session_id, c.id, COALESCE(e.weight, 0), COALESCE(e.reps, 0)
+        FROM exercises e
+        JOIN exercise_catalog c ON c.name = e.name
+        WHERE e.session_id IS NOT NULL
+    ''')
+
+    # Les triggers et index des anciennes tables disparaissent avec elles
+    conn.execute('DROP TABLE exercises')
+    conn.execute('DROP TABLE sessions')
+    conn.execute('ALTER TABLE sessions_v2 RENAME TO sessions')
+    conn.execute('ALTER TABLE exercises_v2 RENAME TO exercises')
+
+    conn.execute('DROP TABLE personal_records')
+    conn.execute('''
+        CREATE TABLE personal_records (
+            exercise_id INTEGER PRIMARY KEY,
+            weight REAL NOT NULL,
+            reps INTEGER NOT NULL,
+            date INTEGER NOT NULL,
+            session_id INTEGER NOT NULL,
+            FOREIGN KEY (exercise_id) REFERENCES exercise_catalog (id),
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+    ''')
+    conn.execute(REBUILD_RECORDS_V2_SQL)
+
+    # Les séries sans séance ou sans nom n'ont pas été reprises
+    conn.execute(f'''
+        INSERT OR REPLACE INTO stats_rollup (id, {', '.join(STATS_COLUMNS)})
+        SELECT 1, {STATS_FROM_SCRATCH_V1}
+    ''')
+
+    for statement in STATS_TRIGGERS_V1 + (
+        # Historique : pagination par (date, id), filtrée ou non par type
+        'CREATE INDEX idx_sessions_date_id ON sessions (date, id)',
+        'CREATE INDEX idx_sessions_type_date_id ON sessions (type, date, id)',
+        # Détail d'une séance et dernières performances, sans lire la table
+        'CREATE INDEX IF NOT EXISTS idx_exercises_session ON exercises (session_id, exercise_id, weight, reps)',
+        # Séries d'un exercice (records, progression)
+        'CREATE INDEX idx_exercises_exercise ON exercises (exercise_id, weight, reps)',
+        'CREATE INDEX IF NOT EXISTS idx_warmups_session ON warmups (session_id)',
+        'CREATE INDEX IF NOT EXISTS idx_finishers_session ON finishers (session_id)',
+    ):
+        conn.execute(statement)
+
+
+def _schema_v3(conn):
+    # Journal des séances en cours : chaque série validée y est ajoutée
+    # immédiatement, la séance survit ainsi à une reconnexion ou un redémarrage
+    conn.execute('''
+        CREATE TABLE drafts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_type TEXT NOT NULL,
+            started_at INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE draft_sets (
+            draft_id INTEGER NOT NULL,
+            exercise_id INTEGER NOT NULL,
+            set_number INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            weight REAL NOT NULL,
+            reps INTEGER NOT NULL,
+            validated_at INTEGER NOT NULL,
+            PRIMARY KEY (draft_id, exercise_id, set_number),
+            FOREIGN KEY (draft_id) REFERENCES drafts (id) ON DELETE CASCADE,
+            FOREIGN KEY (exercise_id) REFERENCES exercise_catalog (id)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _schema_v4(conn):
+    # Avancement des imports en masse (importer.py), pour reprendre un
+    # import interrompu à la dernière séance validée
+    conn.execute('''
+        CREATE TABLE import_progress (
+            source TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            lines_done INTEGER NOT NULL DEFAULT 0,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            sets INTEGER NOT NULL DEFAULT 0,
+            started_at INTEGER NOT NULL,
+            finished_at INTEGER
+        )
+    ''')
+    # Index et triggers supprimés le temps d'un import, recréés à la fin
+    conn.execute('''
+        CREATE TABLE deferred_schema (
+            name TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            sql TEXT NOT NULL
+        )
+    ''')
+
+
+# Tables répliquées par le journal des modifications, dans l'ordre des clés
+# étrangères ; records, compteurs et brouillons sont recalculés ou locaux
+CHANGELOG_TABLES = ('users', 'exercise_catalog', 'sessions', 'exercises', 'warmups', 'finishers',
+                    'wods', 'wod_movements', 'wod_results')
+
+
+def _changelog_tables(conn):
+    # Tables répliquées déjà créées à ce stade des migrations
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [table for table in CHANGELOG_TABLES if table in existing]
+
+
+def _row_json(conn, table, alias):
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    return 'json_object(' + ', '.join(f"'{column}', {alias}.{column}" for column in columns) + ')'
+
+
+def create_changelog_triggers(conn):
+    """(Re)crée les triggers du journal d'après les colonnes actuelles.
+
+    À rappeler dans toute migration qui modifie une table répliquée.
+    """
+    for table in _changelog_tables(conn):
+        for event, op, alias in (('insert', 'I', 'NEW'), ('update', 'U', 'NEW'), ('delete', 'D', 'OLD')):
+            data = 'NULL' if op == 'D' else _row_json(conn, table, 'NEW')
+            conn.execute(f'DROP TRIGGER IF EXISTS trg_changelog_{table}_{event}')
+            conn.execute(f'''
+                CREATE TRIGGER trg_changelog_{table}_{event} AFTER {event.upper()} ON {table}
+                BEGIN
+                    INSERT INTO changelog (table_name, op, row_id, data, changed_at)
+                    VALUES ('{table}', '{op}', {alias}.id, {data}, CAST(strftime('%s', 'now') AS INTEGER));
+                END
+            ''')
+
+
+def _log_existing_rows(conn, tables):
+    for table in tables:
+        conn.execute(f'''
+            INSERT INTO changelog (table_name, op, row_id, data, changed_at)
+            SELECT '{table}', 'I', id, {_row_json(conn, table, table)}, CAST(strftime('%s', 'now') AS INTEGER)
+            FROM {table}
+            ORDER BY id
+        ''')
+
+
+def _schema_v5(conn):
+    # Journal des modifications : une ligne par insertion, modification ou
+    # suppression dans les tables répliquées, numérotée par seq croissant
+    conn.execute('''
+        CREATE TABLE changelog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL CHECK (op IN ('I', 'U', 'D')),
+            row_id INTEGER NOT NULL,
+            data TEXT,
+            changed_at INTEGER NOT NULL
+        )
+    ''')
+    # Identité de la base, reprise dans l'en-tête des exports de modifications
+    conn.execute('''
+        CREATE TABLE database_info (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    conn.execute("INSERT INTO database_info (key, value) VALUES ('id', lower(hex(randomblob(16))))")
+    # Dernière modification appliquée depuis chaque base source
+    conn.execute('''
+        CREATE TABLE sync_state (
+            source TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL
+        )
+    ''')
+
+    # Lignes existantes journalisées comme des insertions : rejouer le
+    # journal depuis le début reconstruit toute la base
+    _log_existing_rows(conn, _changelog_tables(conn))
+    create_changelog_triggers(conn)
+
+
+def _schema_v6(conn):
+    """Plusieurs athlètes par base.
+
+    Chaque séance (et chaque séance en cours) appartient à un athlète ;
+    l'historique existant est rattaché au premier. Index, records et
+    compteurs commencent tous par user_id.
+    """
+    conn.execute('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    conn.execute("INSERT INTO users (id, name) VALUES (?, 'Athlète 1')", (DEFAULT_USER_ID,))
+
+    # Clés étrangères désactivées par migrate : ALTER TABLE accepte alors
+    # une colonne REFERENCES avec une valeur par défaut non nulle
+    conn.execute(f'''
+        ALTER TABLE sessions ADD COLUMN user_id INTEGER NOT NULL
+            DEFAULT {DEFAULT_USER_ID} REFERENCES users (id)
+    ''')
+    conn.execute(f'''
+        ALTER TABLE drafts ADD COLUMN user_id INTEGER NOT NULL
+            DEFAULT {DEFAULT_USER_ID} REFERENCES users (id)
+    ''')
+
+    for statement in (
+        'DROP INDEX IF EXISTS idx_sessions_date_id',
+        'DROP INDEX IF EXISTS idx_sessions_type_date_id',
+        # Historique d'un athlète : pagination par (date, id), filtrée ou non par type
+        'CREATE INDEX idx_sessions_user_date_id ON sessions (user_id, date, id)',
+        'CREATE INDEX idx_sessions_user_type_date_id ON sessions (user_id, type, date, id)',
+        'CREATE INDEX idx_drafts_user ON drafts (user_id, id)',
+    ):
+        conn.execute(statement)
+
+    conn.execute('DROP TABLE personal_records')
+    conn.execute('''
+        CREATE TABLE personal_records (
+            user_id INTEGER NOT NULL,
+            exercise_id INTEGER NOT NULL,
+            weight REAL NOT NULL,
+            reps INTEGER NOT NULL,
+            date INTEGER NOT NULL,
+            session_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, exercise_id),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (exercise_id) REFERENCES exercise_catalog (id),
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+    ''')
+    conn.execute(REBUILD_RECORDS_SQL)
+
+    for trigger in ('session_insert', 'session_delete', 'exercise_insert', 'exercise_delete', 'exercise_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS trg_stats_{trigger}')
+    conn.execute('DROP TABLE stats_rollup')
+    conn.execute('''
+        CREATE TABLE stats_rollup (
+            user_id INTEGER PRIMARY KEY,
+            total_sessions INTEGER NOT NULL DEFAULT 0,
+            total_sets INTEGER NOT NULL DEFAULT 0,
+            total_volume REAL NOT NULL DEFAULT 0,
+            max_weight REAL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    conn.execute(f"INSERT INTO stats_rollup (user_id, {', '.join(STATS_COLUMNS)}) {STATS_BY_USER_SQL}")
+    for statement in STATS_TRIGGERS:
+        conn.execute(statement)
+
+    # users rejoint les tables répliquées, sessions y gagne user_id
+    _log_existing_rows(conn, ['users'])
+    create_changelog_triggers(conn)
+
+
+# Document de recherche d'une séance (rowid = id de la séance) : type,
+# exercices distincts, échauffements et finishers, notes de la séance et de
+# ses activités ; {where} restreint les séances indexées
+SEARCH_DOCUMENT_SQL = '''
+    INSERT INTO session_search (rowid, type, exercises, activities, notes)
+    SELECT s.id, s.type,
+        (SELECT COALESCE(group_concat(name, ' · '), '') FROM (
+            SELECT DISTINCT c.name FROM exercises e
+            JOIN exercise_catalog c ON c.id = e.exercise_id
+            WHERE e.session_id = s.id)),
+        (SELECT COALESCE(group_concat(activity, ' · '), '') FROM (
+            SELECT activity FROM warmups WHERE session_id = s.id
+            UNION ALL SELECT activity FROM finishers WHERE session_id = s.id)),
+        (SELECT COALESCE(group_concat(notes, ' · '), '') FROM (
+            SELECT s.notes AS notes
+            UNION ALL SELECT notes FROM warmups WHERE session_id = s.id
+            UNION ALL SELECT notes FROM finishers WHERE session_id = s.id)
+         WHERE notes <> '')
+    FROM sessions s
+    WHERE {where}
+'''
+
+
+def _reindex_sessions(ids):
+    # Corps de trigger : documents des séances `ids` (liste SQL) supprimés
+    # puis réécrits en entier. Pas d'INSERT OR REPLACE : dans un trigger, la
+    # clause de conflit de l'instruction appelante (upsert de changelog.py)
+    # remplace la sienne
+    return (f'DELETE FROM session_search WHERE rowid IN ({ids});\n'
+            + SEARCH_DOCUMENT_SQL.format(where=f's.id IN ({ids})') + ';')
+
+
+# Triggers de l'index de recherche (préfixe trg_search_, différés par
+# importer.py comme ceux des compteurs). Une série ne réindexe sa séance
+# que si elle y ajoute ou retire un exercice. Ceux d'insertion sont
+# remplacés en v12 (SEARCH_INSERT_TRIGGERS)
+SEARCH_TRIGGERS = (
+    f'''
+    CREATE TRIGGER trg_search_session_insert AFTER INSERT ON sessions
+    BEGIN
+        {_reindex_sessions('NEW.id')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_search_session_update AFTER UPDATE OF type, notes ON sessions
+    BEGIN
+        {_reindex_sessions('NEW.id')}
+    END
+    ''',
+    '''
+    CREATE TRIGGER trg_search_session_delete AFTER DELETE ON sessions
+    BEGIN
+        DELETE FROM session_search WHERE rowid = OLD.id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_search_exercise_insert AFTER INSERT ON exercises
+    WHEN NOT EXISTS (SELECT 1 FROM exercises
+                     WHERE session_id = NEW.session_id AND exercise_id = NEW.exercise_id AND id <> NEW.id)
+    BEGIN
+        {_reindex_sessions('NEW.session_id')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_search_exercise_delete AFTER DELETE ON exercises
+    WHEN NOT EXISTS (SELECT 1 FROM exercises
+                     WHERE session_id = OLD.session_id AND exercise_id = OLD.exercise_id)
+    BEGIN
+        {_reindex_sessions('OLD.session_id')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_search_exercise_update AFTER UPDATE OF session_id, exercise_id ON exercises
+    BEGIN
+        {_reindex_sessions('OLD.session_id, NEW.session_id')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_search_catalog_update AFTER UPDATE OF name ON exercise_catalog
+    BEGIN
+        {_reindex_sessions('SELECT session_id FROM exercises WHERE exercise_id = NEW.id')}
+    END
+    ''',
+) + tuple(
+    f'''
+    CREATE TRIGGER trg_search_{table}_{event} AFTER {event.upper()} ON {table}
+    BEGIN
+        {_reindex_sessions(ids)}
+    END
+    '''
+    for table in ('warmups', 'finishers')
+    for event, ids in (
+        ('insert', 'NEW.session_id'),
+        ('update', 'OLD.session_id, NEW.session_id'),
+        ('delete', 'OLD.session_id'),
+    )
+)
+
+
+def _schema_v7(conn):
+    """Notes et recherche plein texte.
+
+    Échauffements et finishers gardent les notes saisies avec eux ; une
+    table FTS5 indexe chaque séance (type, exercices, activités, notes).
+    """
+    conn.execute("ALTER TABLE warmups ADD COLUMN notes TEXT NOT NULL DEFAULT ''")
+    conn.execute("ALTER TABLE finishers ADD COLUMN notes TEXT NOT NULL DEFAULT ''")
+
+    # remove_diacritics : « developpe » trouve « Développé »
+    conn.execute('''
+        CREATE VIRTUAL TABLE session_search USING fts5 (
+            type, exercises, activities, notes,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute(SEARCH_DOCUMENT_SQL.format(where='1'))
+    for statement in SEARCH_TRIGGERS:
+        conn.execute(statement)
+
+    # warmups et finishers y gagnent notes
+    create_changelog_triggers(conn)
+
+
+# Jour local d'une date epoch, clé de daily_summary
+LOCAL_DAY = "date({}, 'unixepoch', 'localtime')"
+
+# Résumé par athlète et par jour recalculé depuis les séances ; {where}
+# restreint les séances prises en compte. Avec un seul MAX(), SQLite prend
+# les colonnes nues (s.type) sur la ligne du maximum : le type retenu est
+# celui de la dernière séance du jour
+DAILY_SUMMARY_SQL = f'''
+    INSERT INTO daily_summary (user_id, day, sessions, sets, volume, type, last_date)
+    SELECT s.user_id, {LOCAL_DAY.format('s.date')} AS day, COUNT(*),
+           COALESCE(SUM((SELECT COUNT(*) FROM exercises e WHERE e.session_id = s.id)), 0),
+           COALESCE(SUM((SELECT SUM(e.weight * e.reps) FROM exercises e WHERE e.session_id = s.id)), 0),
+           s.type, MAX(s.date)
+    FROM sessions s
+    {{where}}
+    GROUP BY s.user_id, day
+'''
+
+
+def _recompute_day(user_id, date):
+    # Corps de trigger : ligne du jour local de `date` recalculée depuis les
+    # séances de l'athlète (supprimée s'il n'en reste aucune). Le jour local
+    # est toujours dans les 24 h autour du jour UTC, d'où la plage indexée
+    day = LOCAL_DAY.format(date)
+    return (
+        f'DELETE FROM daily_summary WHERE user_id = {user_id} AND day = {day};\n'
+        + DAILY_SUMMARY_SQL.format(where=f'''
+            WHERE s.user_id = {user_id}
+              AND s.date >= CAST(strftime('%s', {day}) AS INTEGER) - 86400
+              AND s.date < CAST(strftime('%s', {day}) AS INTEGER) + 2 * 86400
+              AND {LOCAL_DAY.format('s.date')} = {day}
+        ''') + ';'
+    )
+
+
+# Triggers de daily_summary : ajouts en incrémental, suppressions et
+# déplacements de séance par recalcul du jour concerné
+DAILY_TRIGGERS = (
+    f'''
+    CREATE TRIGGER trg_daily_session_insert AFTER INSERT ON sessions
+    BEGIN
+        INSERT INTO daily_summary (user_id, day, sessions, type, last_date)
+        VALUES (NEW.user_id, {LOCAL_DAY.format('NEW.date')}, 1, NEW.type, NEW.date)
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            sessions = sessions + 1,
+            type = CASE WHEN excluded.last_date >= last_date THEN excluded.type ELSE type END,
+            last_date = MAX(last_date, excluded.last_date);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_daily_session_delete AFTER DELETE ON sessions
+    BEGIN
+        {_recompute_day('OLD.user_id', 'OLD.date')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_daily_session_update AFTER UPDATE OF user_id, date, type ON sessions
+    BEGIN
+        {_recompute_day('OLD.user_id', 'OLD.date')}
+        {_recompute_day('NEW.user_id', 'NEW.date')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_daily_exercise_insert AFTER INSERT ON exercises
+    BEGIN
+        UPDATE daily_summary SET
+            sets = sets + 1,
+            volume = volume + COALESCE(NEW.weight * NEW.reps, 0)
+        WHERE (user_id, day) = (SELECT user_id, {LOCAL_DAY.format('date')} FROM sessions
+                                WHERE id = NEW.session_id);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_daily_exercise_delete AFTER DELETE ON exercises
+    BEGIN
+        UPDATE daily_summary SET
+            sets = sets - 1,
+            volume = volume - COALESCE(OLD.weight * OLD.reps, 0)
+        WHERE (user_id, day) = (SELECT user_id, {LOCAL_DAY.format('date')} FROM sessions
+                                WHERE id = OLD.session_id);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_daily_exercise_update AFTER UPDATE OF weight, reps ON exercises
+    BEGIN
+        UPDATE daily_summary SET
+            volume = volume - COALESCE(OLD.weight * OLD.reps, 0) + COALESCE(NEW.weight * NEW.reps, 0)
+        WHERE (user_id, day) = (SELECT user_id, {LOCAL_DAY.format('date')} FROM sessions
+                                WHERE id = NEW.session_id);
+    END
+    ''',
+)
+
+
+def _schema_v8(conn):
+    """Résumé quotidien pour le calendrier.
+
+    Une ligne par athlète et par jour local d'entraînement : une année se lit
+    en une plage de clé primaire d'au plus 366 lignes.
+    """
+    conn.execute('''
+        CREATE TABLE daily_summary (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            sets INTEGER NOT NULL DEFAULT 0,
+            volume REAL NOT NULL DEFAULT 0,
+            type TEXT NOT NULL,
+            last_date INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(DAILY_SUMMARY_SQL.format(where=''))
+    for statement in DAILY_TRIGGERS:
+        conn.execute(statement)
+
+
+def add_movements(conn, rows):
+    # Mouvements (nom, catégorie, niveau, équipement) absents du catalogue
+    conn.executemany('''
+        INSERT OR IGNORE INTO crossfit_movements (name, category, level, equipment)
+        VALUES (?, ?, ?, ?)
+    ''', rows)
+
+
+def _schema_v9(conn):
+    """Catalogue des mouvements CrossFit (movements.py).
+
+    Les index composites servent les filtres combinés en SQL ; l'application
+    les résout dans l'index à facettes chargé en mémoire.
+    """
+    conn.execute('''
+        CREATE TABLE crossfit_movements (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            category TEXT NOT NULL,
+            level TEXT NOT NULL,
+            equipment TEXT NOT NULL
+        )
+    ''')
+    for statement in (
+        'CREATE INDEX idx_movements_category ON crossfit_movements (category, level, equipment)',
+        'CREATE INDEX idx_movements_equipment ON crossfit_movements (equipment, level)',
+        'CREATE INDEX idx_movements_level ON crossfit_movements (level, equipment)',
+    ):
+        conn.execute(statement)
+    add_movements(conn, movements.catalogue())
+
+
+# Meilleur résultat de chaque athlète sur chaque WOD ; à score égal, le
+# premier enregistré garde la place
+WOD_BESTS_SQL = '''
+    INSERT INTO wod_bests (wod_id, user_id, result_id, score, date)
+    SELECT wod_id, user_id, id, score, date FROM (
+        SELECT wod_id, user_id, id, score, date,
+               ROW_NUMBER() OVER (PARTITION BY wod_id, user_id ORDER BY score DESC, id) AS position
+        FROM wod_results
+    )
+    WHERE position = 1
+'''
+
+# Résultats et records par mois et par type ; un résultat est un record
+# s'il bat tous les précédents de l'athlète sur ce WOD (pas le premier)
+WOD_TRENDS_SQL = '''
+    INSERT INTO wod_trends (user_id, month, wod_type, results, prs)
+    SELECT user_id, strftime('%Y-%m', date, 'unixepoch', 'localtime'), wod_type,
+           COUNT(*), SUM(previous IS NOT NULL AND score > previous)
+    FROM (
+        SELECT r.user_id, r.date, w.wod_type, r.score,
+               MAX(r.score) OVER (
+                   PARTITION BY r.wod_id, r.user_id ORDER BY r.id
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+               ) AS previous
+        FROM wod_results r
+        JOIN wods w ON w.id = r.wod_id
+    )
+    GROUP BY 1, 2, 3
+'''
+
+
+def _add_wod(conn, name, wod_type, time_cap, rounds, description, movement_rows, benchmark=False):
+    # `movement_rows` : tuples (movement_id, reps, weight), dans l'ordre du WOD
+    wod_id = conn.execute('''
+        INSERT INTO wods (name, wod_type, time_cap, rounds, description, benchmark)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (name, wod_type, time_cap, rounds, description, int(benchmark))).lastrowid
+    conn.executemany('''
+        INSERT INTO wod_movements (wod_id, position, movement_id, reps, weight)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(wod_id, position, movement_id, reps, weight)
+          for position, (movement_id, reps, weight) in enumerate(movement_rows, 1)])
+    return wod_id
+
+
+def _schema_v10(conn):
+    """WODs, résultats et classements.
+
+    wods et wod_movements décrivent les WODs (ceux de référence sont créés
+    ici), wod_results leurs résultats avec un score comparable (wods.score).
+    wod_bests (meilleur résultat par athlète et par WOD, index par score) et
+    wod_trends (compteurs mensuels) sont tenus à jour à chaque résultat par
+    record_wod_result : classement et statistiques sont des lectures d'index.
+    """
+    conn.execute('''
+        CREATE TABLE wods (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            wod_type TEXT NOT NULL,
+            time_cap INTEGER NOT NULL,
+            rounds INTEGER,
+            description TEXT NOT NULL DEFAULT '',
+            benchmark INTEGER NOT NULL DEFAULT 0,
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE wod_movements (
+            id INTEGER PRIMARY KEY,
+            wod_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            movement_id INTEGER NOT NULL,
+            reps INTEGER,
+            weight REAL,
+            UNIQUE (wod_id, position),
+            FOREIGN KEY (wod_id) REFERENCES wods (id),
+            FOREIGN KEY (movement_id) REFERENCES crossfit_movements (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE wod_results (
+            id INTEGER PRIMARY KEY,
+            wod_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            date INTEGER NOT NULL,
+            rounds INTEGER NOT NULL DEFAULT 0,
+            reps INTEGER NOT NULL DEFAULT 0,
+            seconds INTEGER,
+            capped INTEGER NOT NULL DEFAULT 0,
+            score REAL NOT NULL,
+            notes TEXT NOT NULL DEFAULT '',
+            FOREIGN KEY (wod_id) REFERENCES wods (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    # Progression d'un athlète sur un WOD, par date
+    conn.execute('CREATE INDEX idx_wod_results_user_wod_date ON wod_results (user_id, wod_id, date)')
+    conn.execute('''
+        CREATE TABLE wod_bests (
+            wod_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            result_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            date INTEGER NOT NULL,
+            PRIMARY KEY (wod_id, user_id),
+            FOREIGN KEY (result_id) REFERENCES wod_results (id)
+        ) WITHOUT ROWID
+    ''')
+    # Classement d'un WOD : parcours de l'index dans l'ordre, sans tri
+    conn.execute('CREATE INDEX idx_wod_bests_rank ON wod_bests (wod_id, score DESC, date)')
+    conn.execute('CREATE INDEX idx_wod_bests_user ON wod_bests (user_id)')
+    conn.execute('''
+        CREATE TABLE wod_trends (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            wod_type TEXT NOT NULL,
+            results INTEGER NOT NULL,
+            prs INTEGER NOT NULL,
+            PRIMARY KEY (user_id, month, wod_type)
+        ) WITHOUT ROWID
+    ''')
+
+    movement_ids = dict(conn.execute('SELECT name, id FROM crossfit_movements'))
+    for name, wod_type, time_cap, rounds, description, rows in wods.BENCHMARK_WODS:
+        _add_wod(conn, name, wod_type, time_cap, rounds, description,
+                 [(movement_ids[movement], reps, weight) for movement, reps, weight in rows],
+                 benchmark=True)
+    # WODs de référence journalisés comme des insertions : une copie rejouée
+    # reprend leur date de création
+    _log_existing_rows(conn, ['wods', 'wod_movements'])
+    create_changelog_triggers(conn)
+
+
+def _schema_v11(conn):
+    # Séances insérées par chaque lot d'un import (plage d'ids contiguë, le
+    # lot étant écrit sous verrou) : un import relancé avec --restart
+    # supprime celles de l'import précédent
+    conn.execute('''
+        CREATE TABLE import_batches (
+            source TEXT NOT NULL,
+            first_session_id INTEGER NOT NULL,
+            last_session_id INTEGER NOT NULL,
+            PRIMARY KEY (source, first_session_id)
+        ) WITHOUT ROWID
+    ''')
+
+
+# Triggers d'insertion de l'index de recherche suspendus tant que
+# search_deferred a une ligne : posée par insert_session et promote_draft le
+# temps d'écrire une séance complète, dont le document est ensuite écrit une
+# seule fois (et non à chaque activité et à chaque nouvel exercice)
+SEARCH_ACTIVE = 'NOT EXISTS (SELECT 1 FROM search_deferred)'
+
+SEARCH_INSERT_TRIGGERS = (
+    ('trg_search_session_insert', f'''
+    CREATE TRIGGER trg_search_session_insert AFTER INSERT ON sessions
+    WHEN {SEARCH_ACTIVE}
+    BEGIN
+        {_reindex_sessions('NEW.id')}
+    END
+    '''),
+    ('trg_search_exercise_insert', f'''
+    CREATE TRIGGER trg_search_exercise_insert AFTER INSERT ON exercises
+    WHEN {SEARCH_ACTIVE}
+     AND NOT EXISTS (SELECT 1 FROM exercises
+                     WHERE session_id = NEW.session_id AND exercise_id = NEW.exercise_id AND id <> NEW.id)
+    BEGIN
+        {_reindex_sessions('NEW.session_id')}
+    END
+    '''),
+) + tuple(
+    (f'trg_search_{table}_insert', f'''
+    CREATE TRIGGER trg_search_{table}_insert AFTER INSERT ON {table}
+    WHEN {SEARCH_ACTIVE}
+    BEGIN
+        {_reindex_sessions('NEW.session_id')}
+    END
+    ''')
+    for table in ('warmups', 'finishers')
+)
+
+
+def _schema_v12(conn):
+    conn.execute('CREATE TABLE search_deferred (active INTEGER PRIMARY KEY)')
+    for name, statement in SEARCH_INSERT_TRIGGERS:
+        # Trigger différé par un import interrompu : recréé en fin d'import
+        # avec sa nouvelle définition
+        if conn.execute('UPDATE deferred_schema SET sql = ? WHERE name = ?', (statement, name)).rowcount:
+            continue
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        conn.execute(statement)
+
+
+# Migrations du schéma, appliquées dans l'ordre ; la version courante de la
+# base est stockée dans PRAGMA user_version
+MIGRATIONS = (
+    (1, _schema_v1),
+    (2, _schema_v2),
+    (3, _schema_v3),
+    (4, _schema_v4),
+    (5, _schema_v5),
+    (6, _schema_v6),
+    (7, _schema_v7),
+    (8, _schema_v8),
+    (9, _schema_v9),
+    (10, _schema_v10),
+    (11, _schema_v11),
+    (12, _schema_v12),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    # Les clés étrangères doivent être désactivées hors transaction pour
+    # pouvoir reconstruire des tables référencées
+    conn.execute('PRAGMA foreign_keys=OFF')
+    try:
+        for version, migration in MIGRATIONS:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Relu sous verrou : un autre processus a pu migrer entre-temps
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    conn.rollback()
+                    continue
+                migration(conn)
+                violations = conn.execute('PRAGMA foreign_key_check').fetchall()
+                if violations:
+                    raise sqlite3.IntegrityError(
+                        f"Migration {version} : {len(violations)} clés étrangères invalides"
+                    )
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    finally:
+        conn.execute('PRAGMA foreign_keys=ON')
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def init_database():
+    with connection() as conn:
+        if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            migrate(conn)
+
+
+def get_users():
+    with connection() as conn:
+        return conn.execute('SELECT id, name FROM users ORDER BY id').fetchall()
+
+
+def create_user(name):
+    name = ' '.join(name.split())
+    if not name:
+        raise ValueError("Nom d'athlète vide")
+    try:
+        with transaction() as conn:
+            return conn.execute('INSERT INTO users (name) VALUES (?)', (name,)).lastrowid
+    except sqlite3.IntegrityError:
+        raise ValueError(f"L'athlète {name} existe déjà") from None
+
+
+def get_user_id(conn, name):
+    # Identifiant d'un athlète, créé au besoin
+    conn.execute('INSERT OR IGNORE INTO users (name) VALUES (?)', (name,))
+    return conn.execute('SELECT id FROM users WHERE name = ?', (name,)).fetchone()[0]
+
+
+def get_exercise_ids(conn, exercise_names):
+    # Identifiants du catalogue, créés au besoin pour les nouveaux noms
+    exercise_names = list(dict.fromkeys(exercise_names))
+    if not exercise_names:
+        return {}
+    conn.executemany('INSERT OR IGNORE INTO exercise_catalog (name) VALUES (?)',
+                     [(name,) for name in exercise_names])
+    placeholders = ', '.join('?' * len(exercise_names))
+    return dict(conn.execute(
+        f'SELECT name, id FROM exercise_catalog WHERE name IN ({placeholders})',
+        exercise_names
+    ).fetchall())
+
+
+def _insert_activities(conn, session_id, warmup_data, finisher_data):
+    # Enregistrer les activités d'échauffement
+    conn.executemany('INSERT INTO warmups (session_id, activity, notes) VALUES (?, ?, ?)',
+                     [(session_id, activity['name'], activity.get('notes') or '') for activity in warmup_data])
+
+    # Enregistrer l'activité de finisher
+    if finisher_data:
+        conn.execute('INSERT INTO finishers (session_id, activity, duration, notes) VALUES (?, ?, ?, ?)',
+                     (session_id, finisher_data['name'], finisher_data['duration'],
+                      finisher_data.get('notes') or ''))
+
+
+@contextmanager
+def search_deferred(conn):
+    # Triggers d'insertion de la recherche suspendus pendant le bloc, dans la
+    # transaction de l'appelant : aucune autre connexion ne voit la ligne
+    conn.execute('INSERT INTO search_deferred (active) VALUES (1)')
+    try:
+        yield
+    finally:
+        conn.execute('DELETE FROM search_deferred')
+
+
+def index_sessions(conn, first_id, last_id):
+    # Documents de recherche des séances first_id à last_id, écrites sous
+    # search_deferred
+    conn.execute('DELETE FROM session_search WHERE rowid BETWEEN ? AND ?', (first_id, last_id))
+    conn.execute(SEARCH_DOCUMENT_SQL.format(where='s.id BETWEEN ? AND ?'), (first_id, last_id))
+
+
+def index_session(conn, session_id):
+    index_sessions(conn, session_id, session_id)
+
+
+def insert_session(conn, session_type, exercises_data, warmup_data, finisher_data, date=None,
+                   user_id=DEFAULT_USER_ID, notes=''):
+    # Écrit une séance complète sur `conn`, dans la transaction de l'appelant
+    date = int(date if date is not None else time.time())
+
+    with search_deferred(conn):
+        # Enregistrer la séance
+        session_id = conn.execute(
+            'INSERT INTO sessions (user_id, date, type, notes) VALUES (?, ?, ?, ?)',
+            (user_id, date, session_type, notes or '')
+        ).lastrowid
+
+        _insert_activities(conn, session_id, warmup_data, finisher_data)
+
+        # Enregistrer les exercices
+        exercise_ids = get_exercise_ids(conn, (exercise['name'] for exercise in exercises_data))
+        sets = [(session_id, exercise_ids[exercise['name']], exercise['weight'], exercise['reps'])
+                for exercise in exercises_data]
+        conn.executemany(
+            'INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, ?, ?)',
+            sets
+        )
+    index_session(conn, session_id)
+
+    # Mettre à jour les records personnels dans la même transaction
+    update_personal_records(conn, sets, date, user_id)
+    return session_id
+
+
+def save_session(session_type, exercises_data, warmup_data, finisher_data, date=None,
+                 user_id=DEFAULT_USER_ID, notes=''):
+    with transaction() as conn:
+        return insert_session(conn, session_type, exercises_data, warmup_data, finisher_data, date,
+                              user_id, notes)
+
+
+def start_draft(session_type, started_at=None, user_id=DEFAULT_USER_ID):
+    started_at = int(started_at if started_at is not None else time.time())
+    with transaction() as conn:
+        return conn.execute('INSERT INTO drafts (user_id, session_type, started_at) VALUES (?, ?, ?)',
+                            (user_id, session_type, started_at)).lastrowid
+
+
+def write_draft_set(conn, draft_id, exercise_name, position, set_number, weight, reps):
+    # Une seule ligne écrite par série validée ; revalider une série la remplace
+    exercise_id = get_exercise_ids(conn, [exercise_name])[exercise_name]
+    conn.execute('''
+        INSERT OR REPLACE INTO draft_sets
+            (draft_id, exercise_id, set_number, position, weight, reps, validated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (draft_id, exercise_id, set_number, position, weight, reps, int(time.time())))
+
+
+def record_draft_set(draft_id, exercise_name, position, set_number, weight, reps):
+    with transaction() as conn:
+        write_draft_set(conn, draft_id, exercise_name, position, set_number, weight, reps)
+
+
+def remove_draft_set(conn, draft_id, exercise_name, set_number):
+    conn.execute('''
+        DELETE FROM draft_sets
+        WHERE draft_id = ? AND set_number = ?
+          AND exercise_id = (SELECT id FROM exercise_catalog WHERE name = ?)
+    ''', (draft_id, set_number, exercise_name))
+
+
+def delete_draft_set(draft_id, exercise_name, set_number):
+    with transaction() as conn:
+        remove_draft_set(conn, draft_id, exercise_name, set_number)
+
+
+def discard_draft(draft_id):
+    with transaction() as conn:
+        conn.execute('DELETE FROM drafts WHERE id = ?', (draft_id,))
+
+
+def get_open_draft(user_id=DEFAULT_USER_ID):
+    # Séance en cours la plus récente de l'athlète, avec ses séries validées
+    with connection() as conn:
+        row = conn.execute(
+            'SELECT id, session_type, started_at FROM drafts WHERE user_id = ? ORDER BY id DESC LIMIT 1',
+            (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        sets = conn.execute('''
+            SELECT c.name, d.set_number, d.weight, d.reps
+            FROM draft_sets d
+            JOIN exercise_catalog c ON c.id = d.exercise_id
+            WHERE d.draft_id = ?
+            ORDER BY d.position, d.set_number
+        ''', (row[0],)).fetchall()
+    return {'id': row[0], 'session_type': row[1], 'started_at': row[2], 'sets': sets}
+
+
+def promote_draft(conn, draft_id, warmup_data, finisher_data, date=None, notes=''):
+    """Transforme un brouillon en séance, dans la transaction de l'appelant.
+
+    Les séries sont copiées de draft_sets vers exercises par un
+    INSERT ... SELECT, sans repasser par l'application.
+    """
+    date = int(date if date is not None else time.time())
+    draft = conn.execute('SELECT user_id FROM drafts WHERE id = ?', (draft_id,)).fetchone()
+    if draft is None:
+        raise ValueError(f"Séance en cours introuvable : {draft_id}")
+    user_id = draft[0]
+    with search_deferred(conn):
+        session_id = conn.execute('''
+            INSERT INTO sessions (user_id, date, type, notes)
+            SELECT user_id, ?, session_type, ? FROM drafts WHERE id = ?
+        ''', (date, notes or '', draft_id)).lastrowid
+
+        _insert_activities(conn, session_id, warmup_data, finisher_data)
+
+        conn.execute('''
+            INSERT INTO exercises (session_id, exercise_id, weight, reps)
+            SELECT ?, exercise_id, weight, reps
+            FROM draft_sets
+            WHERE draft_id = ?
+            ORDER BY position, set_number
+        ''', (session_id, draft_id))
+    index_session(conn, session_id)
+    sets = conn.execute(
+        'SELECT session_id, exercise_id, weight, reps FROM exercises WHERE session_id = ?',
+        (session_id,)
+    ).fetchall()
+    update_personal_records(conn, sets, date, user_id)
+
+    # Les séries du brouillon sont supprimées en cascade
+    conn.execute('DELETE FROM drafts WHERE id = ?', (draft_id,))
+    return session_id
+
+
+def finalize_draft(draft_id, warmup_data, finisher_data, date=None, notes=''):
+    with transaction() as conn:
+        return promote_draft(conn, draft_id, warmup_data, finisher_data, date, notes)
+
+
+def update_personal_records(conn, sets, date, user_id=DEFAULT_USER_ID):
+    # `sets` : tuples (session_id, exercise_id, weight, reps). Une série ne
+    # remplace le record que si elle est plus lourde, ou aussi lourde avec
+    # plus de reps
+    conn.executemany('''
+        INSERT INTO personal_records (user_id, exercise_id, weight, reps, date, session_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, exercise_id) DO UPDATE SET
+            weight = excluded.weight,
+            reps = excluded.reps,
+            date = excluded.date,
+            session_id = excluded.session_id
+        WHERE excluded.weight > personal_records.weight
+           OR (excluded.weight = personal_records.weight
+               AND excluded.reps > personal_records.reps)
+    ''', [(user_id, exercise_id, weight, reps, date, session_id)
+          for session_id, exercise_id, weight, reps in sets])
+
+
+def get_recent_sets(exercise_names, user_id=DEFAULT_USER_ID, sessions=6, since=None):
+    """Séries des `sessions` dernières séances de chaque exercice, en une requête.
+
+    Lignes (exercise_id, nom, session_id, date, weight, reps) triées par
+    exercice, date puis ordre de saisie. Pour chaque exercice, l'index
+    (user_id, date, id) est parcouru à rebours jusqu'à la dernière séance
+    voulue ; `since` (epoch) borne ce parcours pour un exercice abandonné.
+    """
+    exercise_names = list(exercise_names)
+    if not exercise_names:
+        return []
+    placeholders = ', '.join('?' * len(exercise_names))
+    with connection() as conn:
+        return conn.execute(f'''
+            SELECT c.id, c.name, s.id, s.date, e.weight, e.reps
+            FROM exercise_catalog c
+            JOIN sessions s ON s.id IN (
+                SELECT recent.id FROM sessions recent
+                WHERE recent.user_id = ? AND recent.date >= ?
+                  AND EXISTS (SELECT 1 FROM exercises done
+                              WHERE done.session_id = recent.id AND done.exercise_id = c.id)
+                ORDER BY recent.date DESC, recent.id DESC
+                LIMIT ?
+            )
+            JOIN exercises e ON e.session_id = s.id AND e.exercise_id = c.id
+            WHERE c.name IN ({placeholders})
+            ORDER BY c.id, s.date, s.id, e.id
+        ''', [user_id, since or 0, sessions] + exercise_names).fetchall()
+
+
+def get_personal_record(exercise_name, user_id=DEFAULT_USER_ID):
+    with connection() as conn:
+        return conn.execute('''
+            SELECT r.weight, r.reps, r.date, r.session_id
+            FROM exercise_catalog c
+            JOIN personal_records r ON r.user_id = ? AND r.exercise_id = c.id
+            WHERE c.name = ?
+        ''', (user_id, exercise_name)).fetchone()
+
+
+def rebuild_personal_records():
+    # Recalcule la table à partir de tout l'historique
+    with transaction() as conn:
+        conn.execute('DELETE FROM personal_records')
+        conn.execute(REBUILD_RECORDS_SQL)
+        return conn.execute('SELECT COUNT(*) FROM personal_records').fetchone()[0]
+
+
+def get_personal_records(exercise_names, user_id=DEFAULT_USER_ID):
+    # Records d'une liste d'exercices en une seule requête
+    exercise_names = list(exercise_names)
+    if not exercise_names:
+        return {}
+    placeholders = ', '.join('?' * len(exercise_names))
+    with connection() as conn:
+        rows = conn.execute(f'''
+            SELECT c.name, r.weight, r.reps, r.date, r.session_id
+            FROM exercise_catalog c
+            JOIN personal_records r ON r.user_id = ? AND r.exercise_id = c.id
+            WHERE c.name IN ({placeholders})
+        ''', [user_id] + exercise_names).fetchall()
+    return {row[0]: row[1:] for row in rows}
+
+
+def _history_filters(user_id, days_filter=None, session_type=None):
+    # Clause WHERE commune à la requête des séances et à celles des détails ;
+    # ALL_USERS : tous les athlètes (exports, maintenance)
+    if user_id is None:
+        raise ValueError("Athlète requis (db.ALL_USERS pour tous les athlètes)")
+    conditions = []
+    params = []
+
+    if user_id != ALL_USERS:
+        conditions.append("s.user_id = ?")
+        params.append(user_id)
+
+    if days_filter:
+        conditions.append("s.date >= ?")
+        params.append(int(time.time()) - int(days_filter) * 86400)
+
+    if session_type and session_type != "Toutes":
+        conditions.append("s.type = ?")
+        params.append(session_type)
+
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+
+def _new_session(session_id, date, session_type, **extra):
+    return {
+        'id': session_id,
+        'date': date,
+        'type': session_type,
+        'warmups': [],
+        'exercises': [],
+        'finishers': [],
+        **extra,
+    }
+
+
+def _attach_details(conn, sessions, selected, params):
+    # Remplit les séances (dict id -> séance) avec une requête par table
+    # fille, restreinte aux séances renvoyées par la sous-requête `selected`
+    for session_id, activity, notes in conn.execute(
+            f"SELECT session_id, activity, notes FROM warmups WHERE session_id IN ({selected}) ORDER BY id",
+            params):
+        sessions[session_id]['warmups'].append({'activity': activity, 'notes': notes})
+
+    set_numbers = {}
+    for session_id, name, weight, reps in conn.execute(
+            f"""
+            SELECT e.session_id, c.name, e.weight, e.reps
+            FROM exercises e
+            JOIN exercise_catalog c ON c.id = e.exercise_id
+            WHERE e.session_id IN ({selected})
+            ORDER BY e.id
+            """,
+            params):
+        # Numéro de série dans l'ordre de saisie, par exercice et par séance
+        set_number = set_numbers.get((session_id, name), 0) + 1
+        set_numbers[(session_id, name)] = set_number
+        sessions[session_id]['exercises'].append({
+            'name': name,
+            'set_number': set_number,
+            'weight': weight,
+            'reps': reps,
+        })
+
+    for session_id, activity, duration, notes in conn.execute(
+            f"""
+            SELECT session_id, activity, duration, notes
+            FROM finishers WHERE session_id IN ({selected}) ORDER BY id
+            """,
+            params):
+        sessions[session_id]['finishers'].append({'activity': activity, 'duration': duration, 'notes': notes})
+
+
+def get_sessions_history(user_id, days_filter=None, session_type=None):
+    """Historique structuré : une entrée par séance, une entrée par série.
+
+    Chaque table fille est agrégée séparément (une requête chacune), ce qui
+    évite le produit échauffements × exercices × finishers d'une triple
+    jointure et garde les séries identiques distinctes.
+    """
+    where, params = _history_filters(user_id, days_filter, session_type)
+
+    with connection() as conn:
+        sessions = {
+            row[0]: _new_session(*row[:3], notes=row[3])
+            for row in conn.execute(
+                f"SELECT s.id, s.date, s.type, s.notes FROM sessions s{where} ORDER BY s.date DESC, s.id DESC",
+                params)
+        }
+        if sessions:
+            _attach_details(conn, sessions, f"SELECT s.id FROM sessions s{where}", params)
+
+    return list(sessions.values())
+
+
+def get_sessions_page(user_id, days_filter=None, session_type=None, cursor=None, limit=20):
+    """Une page de séances, de la plus récente à la plus ancienne.
+
+    Pagination par curseur sur (date, id) : `cursor` est la clé de la
+    dernière séance de la page précédente, et la requête reprend juste
+    après elle en parcourant l'index, quelle que soit la taille de
+    l'historique. Renvoie (séances, curseur de la page suivante ou None).
+    Les détails ne sont pas chargés, voir get_session_details.
+    """
+    where, params = _history_filters(user_id, days_filter, session_type)
+    if cursor is not None:
+        where += (" AND " if where else " WHERE ") + "(s.date, s.id) < (?, ?)"
+        params += list(cursor)
+
+    with connection() as conn:
+        rows = conn.execute(f'''
+            SELECT s.id, s.date, s.type,
+                   (SELECT COUNT(*) FROM exercises e WHERE e.session_id = s.id) AS sets
+            FROM sessions s{where}
+            ORDER BY s.date DESC, s.id DESC
+            LIMIT ?
+        ''', params + [limit + 1]).fetchall()
+
+    sessions = [
+        {'id': session_id, 'date': date, 'type': session_type_, 'sets': sets}
+        for session_id, date, session_type_, sets in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = sessions[-1]
+        next_cursor = (last['date'], last['id'])
+    return sessions, next_cursor
+
+
+def get_session_details(session_id, user_id):
+    where, params = _history_filters(user_id)
+    where += (" AND " if where else " WHERE ") + "s.id = ?"
+    with connection() as conn:
+        row = conn.execute(f'SELECT s.id, s.date, s.type, s.notes FROM sessions s{where}',
+                           params + [session_id]).fetchone()
+        if row is None:
+            return None
+        sessions = {session_id: _new_session(*row[:3], notes=row[3])}
+        _attach_details(conn, sessions, '?', [session_id])
+    return sessions[session_id]
+
+
+def search_query(text):
+    # Texte saisi -> requête FTS5 : chaque mot entre guillemets (opérateurs
+    # et ponctuation neutralisés), cherché comme préfixe, tous requis
+    return ' '.join('"' + term.replace('"', '""') + '"*' for term in text.split())
+
+
+def search_sessions(text, user_id, days_filter=None, session_type=None, limit=20):
+    """Séances correspondant à `text`, les plus pertinentes (bm25) puis les
+    plus récentes d'abord.
+
+    Chaque séance porte un extrait du champ trouvé, termes entre ** ; les
+    filtres sont ceux de l'historique.
+    """
+    query = search_query(text)
+    if not query:
+        return []
+    where, params = _history_filters(user_id, days_filter, session_type)
+    where += (" AND " if where else " WHERE ") + "session_search MATCH ?"
+
+    with connection() as conn:
+        # Séries comptées après le classement, pour les seules séances gardées
+        rows = conn.execute(f'''
+            WITH hits AS (
+                SELECT s.id, s.date, s.type, rank,
+                       snippet(session_search, -1, '**', '**', '…', 12) AS snippet
+                FROM session_search
+                JOIN sessions s ON s.id = session_search.rowid{where}
+                ORDER BY rank, s.date DESC
+                LIMIT ?
+            )
+            SELECT id, date, type,
+                   (SELECT COUNT(*) FROM exercises e WHERE e.session_id = hits.id) AS sets,
+                   snippet
+            FROM hits
+            ORDER BY rank, date DESC
+        ''', params + [query, limit]).fetchall()
+
+    return [
+        {'id': session_id, 'date': date, 'type': session_type_, 'sets': sets, 'snippet': snippet}
+        for session_id, date, session_type_, sets, snippet in rows
+    ]
+
+
+def index_new_sessions(conn):
+    # Indexe les séances sans document : celles d'un import hors ligne,
+    # pendant lequel les triggers de recherche sont différés (une séance
+    # enregistrée entre-temps a le sien, même avec un id plus grand)
+    conn.execute(SEARCH_DOCUMENT_SQL.format(
+        where='NOT EXISTS (SELECT 1 FROM session_search WHERE rowid = s.id)'
+    ))
+
+
+def rebuild_search_index():
+    with transaction() as conn:
+        conn.execute('DELETE FROM session_search')
+        conn.execute(SEARCH_DOCUMENT_SQL.format(where='1'))
+        # Fusion des segments de l'index en un seul
+        conn.execute("INSERT INTO session_search (session_search) VALUES ('optimize')")
+        return conn.execute('SELECT COUNT(*) FROM session_search').fetchone()[0]
+
+
+def rebuild_daily_summary(conn):
+    # Recalcul complet, dans la transaction de l'appelant
+    conn.execute('DELETE FROM daily_summary')
+    conn.execute(DAILY_SUMMARY_SQL.format(where=''))
+    return conn.execute('SELECT COUNT(*) FROM daily_summary').fetchone()[0]
+
+
+def get_daily_summary(first_day, last_day, user_id=DEFAULT_USER_ID):
+    """Jours d'entraînement entre deux dates incluses (date ou 'AAAA-MM-JJ').
+
+    Lecture d'une plage de la clé primaire (user_id, day) ; les jours sans
+    séance n'ont pas de ligne.
+    """
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT day, sessions, sets, volume, type FROM daily_summary
+            WHERE user_id = ? AND day BETWEEN ? AND ?
+            ORDER BY day
+        ''', (user_id, str(first_day), str(last_day))).fetchall()
+    return [
+        {'day': day, 'sessions': sessions, 'sets': sets, 'volume': volume, 'type': session_type}
+        for day, sessions, sets, volume, session_type in rows
+    ]
+
+
+def get_training_years(user_id=DEFAULT_USER_ID):
+    # Années du premier au dernier jour d'entraînement, les plus récentes d'abord
+    with connection() as conn:
+        first, last = conn.execute(
+            'SELECT MIN(day), MAX(day) FROM daily_summary WHERE user_id = ?', (user_id,)
+        ).fetchone()
+    if first is None:
+        return []
+    return list(range(int(last[:4]), int(first[:4]) - 1, -1))
+
+
+def get_stats(user_id=DEFAULT_USER_ID):
+    # Lecture en temps constant des compteurs de la page d'accueil
+    with connection() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(STATS_COLUMNS)} FROM stats_rollup WHERE user_id = ?", (user_id,)
+        ).fetchone()
+    return dict(zip(STATS_COLUMNS, row or (0, 0, 0, None)))
+
+
+def check_stats_rollup(fix=False):
+    """Compare stats_rollup à un recalcul complet depuis les tables.
+
+    Renvoie (valeurs stockées, valeurs recalculées), deux dicts
+    user_id -> compteurs. Avec fix=True, les lignes sont remplacées par les
+    valeurs recalculées.
+    """
+    with transaction() as conn:
+        stored = {
+            row[0]: dict(zip(STATS_COLUMNS, row[1:]))
+            for row in conn.execute(f"SELECT user_id, {', '.join(STATS_COLUMNS)} FROM stats_rollup")
+        }
+        expected_rows = conn.execute(STATS_BY_USER_SQL).fetchall()
+        if fix:
+            conn.execute('DELETE FROM stats_rollup')
+            conn.executemany(f'''
+                INSERT INTO stats_rollup (user_id, {', '.join(STATS_COLUMNS)})
+                VALUES (?, ?, ?, ?, ?)
+            ''', expected_rows)
+    expected = {row[0]: dict(zip(STATS_COLUMNS, row[1:])) for row in expected_rows}
+    return stored, expected
+
+
+def get_recent_performances(limit=10, user_id=DEFAULT_USER_ID):
+    # Séries des séances les plus récentes de l'athlète, via l'index (user_id, date, id)
+    with connection() as conn:
+        return conn.execute('''
+            SELECT c.name, e.weight, e.reps, s.date
+            FROM sessions s
+            JOIN exercises e ON e.session_id = s.id
+            JOIN exercise_catalog c ON c.id = e.exercise_id
+            WHERE s.user_id = ?
+            ORDER BY s.date DESC, s.id DESC
+            LIMIT ?
+        ''', (user_id, limit)).fetchall()
+
+
+def get_wods():
+    # WODs de référence d'abord, puis ceux de la box par nom
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT id, name, wod_type, time_cap, rounds, description, benchmark FROM wods
+            ORDER BY benchmark DESC, name
+        ''').fetchall()
+    return [
+        {'id': wod_id, 'name': name, 'type': wod_type, 'time_cap': time_cap, 'rounds': rounds,
+         'description': description, 'benchmark': bool(benchmark)}
+        for wod_id, name, wod_type, time_cap, rounds, description, benchmark in rows
+    ]
+
+
+def get_wod_movements(wod_id):
+    with connection() as conn:
+        return conn.execute('''
+            SELECT m.name, wm.reps, wm.weight
+            FROM wod_movements wm
+            JOIN crossfit_movements m ON m.id = wm.movement_id
+            WHERE wm.wod_id = ?
+            ORDER BY wm.position
+        ''', (wod_id,)).fetchall()
+
+
+def create_wod(name, wod_type, time_cap, rounds, movement_rows, description=''):
+    # `movement_rows` : tuples (movement_id, reps, weight)
+    name = ' '.join(name.split())
+    if not name:
+        raise ValueError("Nom de WOD vide")
+    if wod_type not in wods.WOD_TYPES:
+        raise ValueError(f"Type de WOD inconnu : {wod_type}")
+    if not movement_rows:
+        raise ValueError("Aucun mouvement dans le WOD")
+    try:
+        with transaction() as conn:
+            return _add_wod(conn, name, wod_type, time_cap, rounds, description, movement_rows)
+    except sqlite3.IntegrityError:
+        raise ValueError(f"Le WOD {name} existe déjà") from None
+
+
+def record_wod_result(conn, wod_id, user_id, rounds=0, reps=0, seconds=None, capped=False,
+                      date=None, notes=''):
+    """Enregistre un résultat et met à jour classement et tendances.
+
+    Renvoie (result_id, record) ; record est vrai si le résultat bat le
+    meilleur précédent de l'athlète sur ce WOD.
+    """
+    row = conn.execute('SELECT wod_type FROM wods WHERE id = ?', (wod_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"WOD inconnu : {wod_id}")
+    wod_type = row[0]
+    score = wods.score(wod_type, rounds, reps, seconds, capped)
+    if date is None:
+        date = int(time.time())
+    previous = conn.execute(
+        'SELECT score FROM wod_bests WHERE wod_id = ? AND user_id = ?', (wod_id, user_id)
+    ).fetchone()
+    result_id = conn.execute('''
+        INSERT INTO wod_results (wod_id, user_id, date, rounds, reps, seconds, capped, score, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (wod_id, user_id, date, rounds, reps, None if capped else seconds, int(capped),
+          score, notes)).lastrowid
+    record = previous is not None and score > previous[0]
+
+    conn.execute('''
+        INSERT INTO wod_bests (wod_id, user_id, result_id, score, date)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (wod_id, user_id) DO UPDATE SET
+            result_id = excluded.result_id,
+            score = excluded.score,
+            date = excluded.date
+        WHERE excluded.score > wod_bests.score
+    ''', (wod_id, user_id, result_id, score, date))
+    conn.execute('''
+        INSERT INTO wod_trends (user_id, month, wod_type, results, prs)
+        VALUES (?, strftime('%Y-%m', ?, 'unixepoch', 'localtime'), ?, 1, ?)
+        ON CONFLICT (user_id, month, wod_type) DO UPDATE SET
+            results = results + 1,
+            prs = prs + excluded.prs
+    ''', (user_id, date, wod_type, int(record)))
+    return result_id, record
+
+
+def save_wod_result(wod_id, user_id, rounds=0, reps=0, seconds=None, capped=False, date=None, notes=''):
+    with transaction() as conn:
+        return record_wod_result(conn, wod_id, user_id, rounds, reps, seconds, capped, date, notes)
+
+
+def rebuild_wod_stats():
+    # Recalcule classements et tendances à partir de tous les résultats
+    with transaction() as conn:
+        conn.execute('DELETE FROM wod_bests')
+        conn.execute('DELETE FROM wod_trends')
+        conn.execute(WOD_BESTS_SQL)
+        conn.execute(WOD_TRENDS_SQL)
+        return conn.execute('SELECT COUNT(*) FROM wod_bests').fetchone()[0]
+
+
+def _wod_result(wod_type, rounds, reps, seconds, capped, date, **extra):
+    return dict(extra, score=wods.format_score(wod_type, rounds, reps, seconds, capped),
+                rounds=rounds, reps=reps, seconds=seconds, capped=bool(capped), date=date)
+
+
+def get_leaderboard(wod_id, limit=10):
+    """Meilleur résultat de chaque athlète sur un WOD, du premier au dernier.
+
+    Lecture de l'index (wod_id, score DESC, date) dans l'ordre du classement.
+    """
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT u.name, w.wod_type, r.rounds, r.reps, r.seconds, r.capped, b.date
+            FROM wod_bests b
+            JOIN wods w ON w.id = b.wod_id
+            JOIN users u ON u.id = b.user_id
+            JOIN wod_results r ON r.id = b.result_id
+            WHERE b.wod_id = ?
+            ORDER BY b.score DESC, b.date
+            LIMIT ?
+        ''', (wod_id, limit)).fetchall()
+    return [
+        _wod_result(wod_type, rounds, reps, seconds, capped, date, rank=rank, athlete=name)
+        for rank, (name, wod_type, rounds, reps, seconds, capped, date) in enumerate(rows, 1)
+    ]
+
+
+def get_wod_rank(wod_id, user_id=DEFAULT_USER_ID):
+    # (rang de l'athlète, nombre d'athlètes classés), rang None sans résultat
+    with connection() as conn:
+        total = conn.execute('SELECT COUNT(*) FROM wod_bests WHERE wod_id = ?', (wod_id,)).fetchone()[0]
+        row = conn.execute('''
+            SELECT (SELECT COUNT(*) FROM wod_bests WHERE wod_id = b.wod_id AND score > b.score) + 1
+            FROM wod_bests b
+            WHERE b.wod_id = ? AND b.user_id = ?
+        ''', (wod_id, user_id)).fetchone()
+    return (row[0] if row else None), total
+
+
+def get_wod_bests(user_id=DEFAULT_USER_ID):
+    # Records de l'athlète, un par WOD réalisé
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT w.id, w.name, w.wod_type, r.rounds, r.reps, r.seconds, r.capped, b.date
+            FROM wod_bests b
+            JOIN wods w ON w.id = b.wod_id
+            JOIN wod_results r ON r.id = b.result_id
+            WHERE b.user_id = ?
+            ORDER BY w.name
+        ''', (user_id,)).fetchall()
+    return [
+        _wod_result(wod_type, rounds, reps, seconds, capped, date, wod_id=wod_id, name=name, type=wod_type)
+        for wod_id, name, wod_type, rounds, reps, seconds, capped, date in rows
+    ]
+
+
+def get_wod_trends(user_id=DEFAULT_USER_ID):
+    # Compteurs mensuels (month, wod_type, results, prs), lus dans l'ordre de la clé
+    with connection() as conn:
+        return conn.execute('''
+            SELECT month, wod_type, results, prs FROM wod_trends
+            WHERE user_id = ?
+            ORDER BY month, wod_type
+        ''', (user_id,)).fetchall()
+
+
+def get_wod_history(wod_id, user_id=DEFAULT_USER_ID):
+    # Résultats de l'athlète sur un WOD, du plus ancien au plus récent
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT w.wod_type, r.rounds, r.reps, r.seconds, r.capped, r.date, r.score, r.notes
+            FROM wod_results r
+            JOIN wods w ON w.id = r.wod_id
+            WHERE r.user_id = ? AND r.wod_id = ?
+            ORDER BY r.date
+        ''', (user_id, wod_id)).fetchall()
+    return [
+        _wod_result(wod_type, rounds, reps, seconds, capped, date, value=score, notes=notes)
+        for wod_type, rounds, reps, seconds, capped, date, score, notes in rows
+    ]
@@ -1,22 +1,317 @@
+import argparse
+import math
+import os
 import sqlite3
+import sys
+from datetime import date, datetime
+
+import analytics
+import changelog
+import db
+import exporter
+import importer
+import instrumentation
+import movements
+import program
+import recommendations
 
 def print_tables():
-    conn = sqlite3.connect('workout.db')
+    conn = sqlite3.connect(db.DB_PATH)
     c = conn.cursor()
-    
+
+    # Colonnes nommées : l'ordre de SELECT * change avec les migrations
     print("=== Table sessions ===")
-    c.execute("SELECT * FROM sessions")
+    c.execute("SELECT id, date, type FROM sessions ORDER BY id")
     sessions = c.fetchall()
     for session in sessions:
-        print(f"ID: {session[0]}, Date: {session[1]}, Type: {session[2]}")
-        
+        print(f"ID: {session[0]}, Date: {datetime.fromtimestamp(session[1]):%d/%m/%Y %H:%M}, Type: {session[2]}")
+
     print("\n=== Table exercises ===")
-    c.execute("SELECT * FROM exercises")
+    c.execute("""
+        SELECT e.id, e.session_id, c.name, e.weight, e.reps
+        FROM exercises e JOIN exercise_catalog c ON c.id = e.exercise_id
+        ORDER BY e.id
+    """)
     exercises = c.fetchall()
     for exercise in exercises:
-        print(f"ID: {exercise[0]}, Session: {exercise[1]}, Exercise: {exercise[2]}, Set: {exercise[3]}, Reps: {exercise[4]}, Weight: {exercise[5]}")
-    
+        print(f"ID: {exercise[0]}, Session: {exercise[1]}, Exercise: {exercise[2]}, Weight: {exercise[3]}, Reps: {exercise[4]}")
+
     conn.close()
 
+def rebuild_records():
+    db.init_database()
+    count = db.rebuild_personal_records()
+    print(f"{count} records personnels recalculés")
+
+def find_user(name):
+    # Identifiant d'un athlète existant, tous les athlètes sans nom
+    if not name:
+        return db.ALL_USERS
+    user_id = {user_name: id_ for id_, user_name in db.get_users()}.get(name)
+    if user_id is None:
+        raise SystemExit(f"Athlète inconnu : {name}")
+    return user_id
+
+def rebuild_search():
+    db.init_database()
+    count = db.rebuild_search_index()
+    print(f"{count} séances indexées")
+
+def rebuild_daily():
+    db.init_database()
+    with db.transaction() as conn:
+        count = db.rebuild_daily_summary(conn)
+    print(f"{count} jours d'entraînement recalculés")
+
+def rebuild_wods():
+    db.init_database()
+    count = db.rebuild_wod_stats()
+    print(f"{count} meilleurs résultats de WOD recalculés")
+
+def search(text, user=None, limit=20):
+    db.init_database()
+    for session in db.search_sessions(text, find_user(user), limit=limit):
+        print(f"{session['id']:>8}  {datetime.fromtimestamp(session['date']):%d/%m/%Y}  "
+              f"{session['type']:<20} {session['snippet']}")
+
+def check_stats(fix=False):
+    db.init_database()
+    stored, expected = db.check_stats_rollup(fix=fix)
+    consistent = True
+    for user_id in sorted(set(stored) | set(expected)):
+        print(f"--- Athlète {user_id}")
+        stored_row = stored.get(user_id, dict.fromkeys(db.STATS_COLUMNS))
+        expected_row = expected.get(user_id, dict.fromkeys(db.STATS_COLUMNS))
+        for column in db.STATS_COLUMNS:
+            # Le volume cumulé par les triggers peut différer d'un arrondi
+            matches = stored_row[column] == expected_row[column] or (
+                None not in (stored_row[column], expected_row[column])
+                and math.isclose(stored_row[column], expected_row[column], abs_tol=1e-6)
+            )
+            status = "OK" if matches else "ÉCART"
+            consistent = consistent and status == "OK"
+            print(f"{column:<15} stocké: {stored_row[column]!s:<12} recalculé: {expected_row[column]!s:<12} {status}")
+    if not consistent:
+        print("Compteurs corrigés" if fix else "Relancer avec --fix pour corriger")
+    return consistent or fix
+
+def import_logs(path, file_format=None, default_type=importer.DEFAULT_SESSION_TYPE,
+                chunk_size=importer.SESSIONS_PER_TRANSACTION, restart=False, user=None, offline=False):
+    user_id = db.DEFAULT_USER_ID
+    if user:
+        db.init_database()
+        with db.transaction() as conn:
+            user_id = db.get_user_id(conn, user)
+    result = importer.import_file(path, file_format, default_type, chunk_size, restart, user_id=user_id,
+                                  offline=offline)
+    if result['rejected']:
+        print(f"{len(result['rejected'])} lignes ignorées :")
+        for line_number, reason in result['rejected'][:20]:
+            print(f"  ligne {line_number} : {reason}")
+        if len(result['rejected']) > 20:
+            print("  ...")
+
+def export_history(path, file_format=None, days_filter=None, session_type=None, user=None):
+    file_format = file_format or (path.rsplit('.', 1)[-1] if path.endswith(('.jsonl', '.parquet')) else 'csv')
+    db.init_database()
+    user_id = find_user(user)
+    if path == "-":
+        count = exporter.export_to_file(sys.stdout.buffer, file_format, user_id, days_filter, session_type)
+    else:
+        count = exporter.export_to_path(path, file_format, user_id, days_filter, session_type)
+    print(f"{count} séries exportées", file=sys.stderr)
+
+def export_changes(path, since=0):
+    db.init_database()
+    if path == "-":
+        count, last = changelog.export_changes(sys.stdout, since)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            count, last = changelog.export_changes(f, since)
+    print(f"{count} modifications exportées (seq {since} → {last}), "
+          f"prochain export : --since {last}", file=sys.stderr)
+
+def apply_changes(path):
+    db.init_database()
+    if path == "-":
+        applied, last = changelog.apply_changes(sys.stdin)
+    else:
+        with open(path, encoding='utf-8') as f:
+            applied, last = changelog.apply_changes(f)
+    print(f"{applied} modifications appliquées, dernier seq de la source : {last}")
+
+def page_reads(user_id):
+    # Lectures des pages de l'application pour un athlète, dans l'ordre d'une visite
+    db.get_users()
+    db.get_stats(user_id)
+    db.get_recent_performances(user_id=user_id)
+    db.get_open_draft(user_id)
+    for workout in program.compile_program().values():
+        db.get_personal_records(workout.exercise_names, user_id)
+        recommendations.recommend(workout, user_id)
+    with db.connection() as conn:
+        movements.load_index(conn)
+    for wod in db.get_wods():
+        db.get_wod_movements(wod['id'])
+        db.get_leaderboard(wod['id'])
+        db.get_wod_rank(wod['id'], user_id)
+        db.get_wod_history(wod['id'], user_id)
+    db.get_wod_bests(user_id)
+    db.get_wod_trends(user_id)
+    sessions, _cursor = db.get_sessions_page(user_id)
+    for session in sessions[:5]:
+        db.get_session_details(session['id'], user_id)
+    years = db.get_training_years(user_id)
+    if years:
+        db.get_daily_summary(date(years[0], 1, 1), date(years[0], 12, 31), user_id)
+    with db.connection() as conn:
+        analytics.compute(conn, 'epley', user_id)
+
+def print_query_plan(conn, event):
+    # Arbre de EXPLAIN QUERY PLAN, indenté selon le parent de chaque étape
+    try:
+        steps = conn.execute(f"EXPLAIN QUERY PLAN {event.sql}", event.parameters).fetchall()
+    except sqlite3.Error as e:
+        print(f"    (plan indisponible : {e})")
+        return
+    depths = {0: 0}
+    for step_id, parent, _unused, detail in steps:
+        depths[step_id] = depths.get(parent, 0) + 1
+        print(f"    {'  ' * (depths[step_id] - 1)}{detail}")
+
+def slow_queries(user=None, repeat=3, top=15, explain=5):
+    db.init_database()
+    user_id = find_user(user) if user else db.DEFAULT_USER_ID
+    instrumentation.queries.clear()
+    # Premier passage à froid (cache de pages, copie colonnaire), suivants à chaud
+    for _ in range(repeat):
+        page_reads(user_id)
+    groups = instrumentation.summarize(instrumentation.queries.snapshot())
+
+    print(f"=== Requêtes les plus coûteuses ({repeat} passages sur les pages) ===")
+    print(f"{'appels':>6} {'total ms':>9} {'max ms':>8} {'lignes':>8}  requête")
+    for group in groups[:top]:
+        print(f"{group['calls']:>6} {group['total_ms']:>9.2f} {group['max_ms']:>8.2f} {group['rows']:>8}  "
+              f"{group['sql'][:100]}")
+
+    print("\n=== Plans des requêtes les plus coûteuses ===")
+    explained = [group for group in groups if group['slowest'].parameters is not None][:explain]
+    with db.connection() as conn:
+        for group in explained:
+            print(f"\n{group['sql']}")
+            print_query_plan(conn, group['slowest'])
+
+def sizes():
+    db.init_database()
+    with db.connection() as conn:
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        wal_path = db.DB_PATH + '-wal'
+        wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        print(f"Pages : {page_count} de {page_size} octets ({page_count * page_size / 1024:.0f} Ko), "
+              f"{free_pages} libres ; WAL : {wal_size / 1024:.0f} Ko")
+
+        kinds = {name: (kind, table) for name, kind, table in conn.execute(
+            "SELECT name, type, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')"
+        )}
+        try:
+            objects = conn.execute(
+                'SELECT name, COUNT(*), SUM(pgsize) FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC'
+            ).fetchall()
+        except sqlite3.OperationalError:
+            print("Taille par table indisponible : SQLite compilé sans dbstat")
+            return
+
+        print(f"\n{'objet':<40} {'type':<6} {'table':<24} {'pages':>7} {'Ko':>8} {'%':>5} {'lignes':>9}")
+        for name, pages, size in objects:
+            kind, table = kinds.get(name, ('', ''))
+            rows = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0] if kind == 'table' else ''
+            print(f"{name:<40} {kind:<6} {table:<24} {pages:>7} {size / 1024:>8.0f} "
+                  f"{pages * 100 / page_count:>5.1f} {rows:>9}")
+
+def verify_changelog():
+    db.init_database()
+    expected, replayed = changelog.verify_replay()
+    for table in db.CHANGELOG_TABLES:
+        status = "OK" if expected[table] == replayed[table] else "ÉCART"
+        print(f"{table:<18} {expected[table][:16]} {replayed[table][:16]} {status}")
+    return expected == replayed
+
 if __name__ == "__main__":
-    print_tables()
+    parser = argparse.ArgumentParser(description="Outils de maintenance de workout.db")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("dump", help="Afficher le contenu des tables (par défaut)")
+    subparsers.add_parser("rebuild-records", help="Recalculer la table personal_records")
+    subparsers.add_parser("rebuild-search", help="Reconstruire l'index de recherche plein texte")
+    subparsers.add_parser("rebuild-daily", help="Recalculer daily_summary (après un changement de fuseau horaire)")
+    subparsers.add_parser("rebuild-wods", help="Recalculer classements et tendances des WODs")
+    search_parser = subparsers.add_parser("search", help="Chercher des séances (exercices, type, activités, notes)")
+    search_parser.add_argument("text", help="Mots cherchés, tous requis, en début de mot")
+    search_parser.add_argument("--user", help="Seulement cet athlète")
+    search_parser.add_argument("--limit", type=int, default=20, help="Nombre de séances affichées")
+    check_parser = subparsers.add_parser("check-stats", help="Vérifier les compteurs de stats_rollup")
+    check_parser.add_argument("--fix", action="store_true", help="Remplacer les compteurs par le recalcul")
+    import_parser = subparsers.add_parser("import", help="Importer un historique CSV ou JSON lines (reprise automatique)")
+    import_parser.add_argument("path", help="Fichier à importer (colonnes date, exercice, poids, reps, type, notes)")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="Déduit de l'extension par défaut")
+    import_parser.add_argument("--type", default=importer.DEFAULT_SESSION_TYPE,
+                               help="Type de séance des lignes qui n'en ont pas")
+    import_parser.add_argument("--chunk", type=int, default=importer.SESSIONS_PER_TRANSACTION,
+                               help="Séances par transaction")
+    import_parser.add_argument("--restart", action="store_true",
+                               help="Supprimer les séances déjà importées depuis ce fichier et repartir du début")
+    import_parser.add_argument("--user", help="Athlète des séances importées (créé au besoin), le premier par défaut")
+    import_parser.add_argument("--offline", action="store_true",
+                               help="Application arrêtée : index et triggers suspendus pendant l'import (plus rapide)")
+    export_parser = subparsers.add_parser("export", help="Exporter l'historique (CSV, JSON lines ou Parquet)")
+    export_parser.add_argument("path", help="Fichier de sortie, - pour la sortie standard")
+    export_parser.add_argument("--format", choices=exporter.EXPORT_FORMATS, help="Déduit de l'extension par défaut")
+    export_parser.add_argument("--days", type=int, help="Seulement les N derniers jours")
+    export_parser.add_argument("--type", help="Seulement ce type de séance")
+    export_parser.add_argument("--user", help="Seulement cet athlète")
+    changes_export_parser = subparsers.add_parser("changes-export", help="Exporter les modifications depuis un seq (JSON lines)")
+    changes_export_parser.add_argument("path", help="Fichier de sortie, - pour la sortie standard")
+    changes_export_parser.add_argument("--since", type=int, default=0, help="Dernier seq déjà exporté")
+    changes_apply_parser = subparsers.add_parser("changes-apply", help="Appliquer un export de modifications")
+    changes_apply_parser.add_argument("path", help="Fichier produit par changes-export, - pour l'entrée standard")
+    subparsers.add_parser("changes-verify", help="Rejouer le journal dans une base vide et comparer les empreintes")
+    slow_parser = subparsers.add_parser("slow-queries",
+                                        help="Requêtes les plus coûteuses des pages et leurs plans (EXPLAIN QUERY PLAN)")
+    slow_parser.add_argument("--user", help="Athlète dont les pages sont lues, le premier par défaut")
+    slow_parser.add_argument("--repeat", type=int, default=3, help="Passages sur les pages")
+    slow_parser.add_argument("--top", type=int, default=15, help="Requêtes affichées")
+    slow_parser.add_argument("--explain", type=int, default=5, help="Requêtes dont le plan est affiché")
+    subparsers.add_parser("sizes", help="Taille et nombre de pages de chaque table et index")
+    args = parser.parse_args()
+
+    if args.command == "rebuild-records":
+        rebuild_records()
+    elif args.command == "rebuild-search":
+        rebuild_search()
+    elif args.command == "rebuild-daily":
+        rebuild_daily()
+    elif args.command == "rebuild-wods":
+        rebuild_wods()
+    elif args.command == "search":
+        search(args.text, args.user, args.limit)
+    elif args.command == "check-stats":
+        if not check_stats(fix=args.fix):
+            raise SystemExit(1)
+    elif args.command == "import":
+        import_logs(args.path, args.format, args.type, args.chunk, args.restart, args.user, args.offline)
+    elif args.command == "export":
+        export_history(args.path, args.format, args.days, args.type, args.user)
+    elif args.command == "changes-export":
+        export_changes(args.path, args.since)
+    elif args.command == "changes-apply":
+        apply_changes(args.path)
+    elif args.command == "changes-verify":
+        if not verify_changelog():
+            raise SystemExit(1)
+    elif args.command == "slow-queries":
+        slow_queries(args.user, args.repeat, args.top, args.explain)
+    elif args.command == "sizes":
+        sizes()
+    else:
+        print_tables()
@@ -0,0 +1,184 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import weakref
+from datetime import datetime
+from functools import lru_cache
+
+import db
+
+# Séries lues par fetchmany et écrites par bloc
+EXPORT_CHUNK = 5000
+
+# Mêmes colonnes que celles reconnues par importer.py : un export se réimporte
+EXPORT_COLUMNS = ('date', 'type', 'exercise', 'weight', 'reps', 'notes')
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def iter_chunks(conn, user_id, days_filter=None, session_type=None, chunk_size=EXPORT_CHUNK):
+    """Séries filtrées comme l'historique, par blocs de `chunk_size` lignes.
+
+    Le curseur SQLite est parcouru au fil de l'écriture : la mémoire
+    utilisée ne dépend que de la taille des blocs.
+    """
+    where, params = db._history_filters(user_id, days_filter, session_type)
+    # CROSS JOIN fixe l'ordre des boucles : séances parcourues dans l'index
+    # (date, id), séries de chacune via idx_exercises_session. SQLite ne trie
+    # alors que les séries d'une séance, et non tout le résultat avant la
+    # première ligne
+    cursor = conn.execute(f'''
+        SELECT s.date, s.type, c.name, e.weight, e.reps, s.notes
+        FROM sessions s
+        CROSS JOIN exercises e ON e.session_id = s.id
+        JOIN exercise_catalog c ON c.id = e.exercise_id
+        {where}
+        ORDER BY s.date, s.id, e.id
+    ''', params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+# Dates en heure locale (décalage de chaque date, heure d'été comprise) ;
+# les séries d'une séance partagent la même date
+@lru_cache(maxsize=1024)
+def local_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp)
+
+
+def local_iso(timestamp):
+    # Format relu par importer.parse_date
+    return local_datetime(timestamp).isoformat()
+
+
+def text_rows(rows):
+    return [
+        (local_iso(date), session_type, name, weight, reps, notes or '')
+        for date, session_type, name, weight, reps, notes in rows
+    ]
+
+
+def write_csv(chunks, f):
+    writer = csv.writer(f)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(text_rows(rows))
+
+
+def write_jsonl(chunks, f):
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    for rows in chunks:
+        f.write(''.join(
+            encoder.encode(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in text_rows(rows)
+        ))
+
+
+def write_parquet(chunks, f):
+    # pyarrow est facultatif : seul l'export Parquet en a besoin
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("L'export Parquet nécessite pyarrow (pip install pyarrow)") from None
+
+    schema = pa.schema([
+        ('date', pa.timestamp('s')),
+        ('type', pa.string()),
+        ('exercise', pa.string()),
+        ('weight', pa.float64()),
+        ('reps', pa.int64()),
+        ('notes', pa.string()),
+    ])
+    # Un groupe de lignes Parquet par bloc
+    with pq.ParquetWriter(f, schema) as writer:
+        for rows in chunks:
+            dates, types, names, weights, reps, notes = zip(*rows)
+            writer.write_batch(pa.record_batch([
+                # Horodatage sans fuseau, en heure locale comme les exports texte
+                pa.array([local_datetime(date) for date in dates], pa.timestamp('s')),
+                pa.array(types, pa.string()),
+                pa.array(names, pa.string()),
+                pa.array(weights, pa.float64()),
+                pa.array(reps, pa.int64()),
+                pa.array([note or '' for note in notes], pa.string()),
+            ], schema=schema))
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'parquet': write_parquet,
+}
+
+
+def export(f, file_format, user_id, days_filter=None, session_type=None, chunk_size=EXPORT_CHUNK):
+    """Écrit l'historique filtré dans `f` et renvoie le nombre de séries.
+
+    `f` est un fichier texte pour csv/jsonl, binaire pour parquet ;
+    `user_id` vaut db.ALL_USERS pour exporter tous les athlètes.
+    """
+    if file_format not in WRITERS:
+        raise ValueError(f"Format d'export inconnu : {file_format}")
+    exported = 0
+
+    def counting(chunks):
+        nonlocal exported
+        for rows in chunks:
+            exported += len(rows)
+            yield rows
+
+    with db.connection() as conn:
+        WRITERS[file_format](counting(iter_chunks(conn, user_id, days_filter, session_type, chunk_size)), f)
+    return exported
+
+
+def export_to_path(path, file_format, user_id, days_filter=None, session_type=None):
+    with open(path, 'wb') as f:
+        return export_to_file(f, file_format, user_id, days_filter, session_type)
+
+
+def export_to_file(binary_file, file_format, user_id, days_filter=None, session_type=None):
+    # Fichier binaire (fichier temporaire, sortie standard) pour tous les formats
+    if file_format == 'parquet':
+        return export(binary_file, file_format, user_id, days_filter, session_type)
+    text = io.TextIOWrapper(binary_file, encoding='utf-8', newline='')
+    try:
+        return export(text, file_format, user_id, days_filter, session_type)
+    finally:
+        text.flush()
+        text.detach()
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class TemporaryExport:
+    """Export écrit dans un fichier temporaire, supprimé par close(), dès que
+    l'objet est libéré (export remplacé, session Streamlit fermée) ou à
+    l'arrêt du processus."""
+    __slots__ = ('path', 'count', 'close', '__weakref__')
+
+    def __init__(self, file_format, user_id, days_filter=None, session_type=None):
+        with tempfile.NamedTemporaryFile(suffix=f'.{file_format}', delete=False) as f:
+            # Enregistré avant l'écriture : un export en échec ne laisse pas de fichier
+            self.close = weakref.finalize(self, _remove_file, f.name)
+            self.path = f.name
+            self.count = export_to_file(f, file_format, user_id, days_filter, session_type)
+
+    def __repr__(self):
+        return f"TemporaryExport({self.path!r}, {self.count} séries)"
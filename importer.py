@@ -0,0 +1,402 @@
+import csv
+import hashlib
+import json
+import os
+import time
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+from itertools import groupby, islice
+
+import columnar
+import db
+import program
+
+# Type de séance des lignes qui n'en précisent pas
+DEFAULT_SESSION_TYPE = 'Import'
+
+# Séances insérées par transaction
+SESSIONS_PER_TRANSACTION = 500
+
+# Intervalle minimal entre deux lignes d'avancement, en secondes
+PROGRESS_INTERVAL = 2.0
+
+# Colonnes reconnues, avec les noms rencontrés dans les exports courants
+FIELD_ALIASES = {
+    'date': ('date', 'datetime', 'timestamp', 'jour'),
+    'type': ('type', 'session_type', 'seance', 'workout'),
+    'exercise': ('exercise', 'exercice', 'name', 'nom', 'exercise_name'),
+    'weight': ('weight', 'poids', 'weight_kg', 'kg', 'charge'),
+    'reps': ('reps', 'repetitions', 'rep'),
+    'notes': ('notes', 'note', 'commentaire', 'comment'),
+}
+
+DATE_FORMATS = (
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y',
+)
+
+# Index et triggers des tables remplies par un import hors ligne (offline=True,
+# application arrêtée) : reconstruits une seule fois à la fin plutôt que tenus
+# à jour ligne par ligne
+DEFERRED_TABLES = ('sessions', 'exercises')
+DEFERRED_TRIGGERS = ('trg_stats_%', 'trg_search_%', 'trg_daily_%')
+
+
+def normalize(name):
+    # Clé de comparaison des noms : sans accents, casse ni espaces superflus
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(name.casefold().split())
+
+
+def read_records(path, file_format):
+    """Lignes brutes du fichier : (numéro de ligne, dict)."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if file_format == 'jsonl':
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+            return
+        # Les tableurs français exportent souvent avec des points-virgules
+        try:
+            dialect = csv.Sniffer().sniff(f.read(4096), delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        f.seek(0)
+        reader = csv.DictReader(f, dialect=dialect)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def parse_date(value):
+    if isinstance(value, (int, float)):
+        return int(value)
+    return _parse_date_text(str(value).strip())
+
+
+# Les séries d'une même séance répètent la même date : une analyse par valeur
+@lru_cache(maxsize=1024)
+def _parse_date_text(value):
+    if value.isdigit():
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return int(datetime.strptime(value, fmt).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f"date illisible : {value!r}")
+
+
+def parse_number(value):
+    # Virgule décimale acceptée (82,5)
+    if isinstance(value, str):
+        value = value.strip().replace(',', '.')
+    return float(value)
+
+
+def _field_map(record):
+    keys = {normalize(key): key for key in record if key is not None}
+    return {
+        field: next((keys[alias] for alias in aliases if alias in keys), None)
+        for field, aliases in FIELD_ALIASES.items()
+    }
+
+
+def parse_records(records, resolve, default_type=DEFAULT_SESSION_TYPE, rejected=None):
+    """Séries normalisées : (ligne, date, type, exercice, poids, reps, notes).
+
+    Les lignes invalides sont écartées et ajoutées à `rejected` sous la
+    forme (ligne, raison).
+    """
+    fields = None
+    for line_number, record in records:
+        if fields is None or any(key not in record for key in fields.values() if key):
+            fields = _field_map(record)
+        try:
+            if not (fields['date'] and fields['exercise'] and fields['weight'] and fields['reps']):
+                raise ValueError("colonnes date, exercice, poids ou reps manquantes")
+            weight = parse_number(record[fields['weight']])
+            reps = int(parse_number(record[fields['reps']]))
+            if weight < 0 or reps <= 0:
+                raise ValueError(f"série invalide : {weight} kg × {reps}")
+            exercise = resolve(record[fields['exercise']])
+            if not exercise:
+                raise ValueError("nom d'exercice vide")
+            yield (
+                line_number,
+                parse_date(record[fields['date']]),
+                (fields['type'] and str(record[fields['type']] or '').strip()) or default_type,
+                exercise,
+                weight,
+                reps,
+                (fields['notes'] and str(record[fields['notes']] or '').strip()) or '',
+            )
+        except (ValueError, TypeError, KeyError) as e:
+            if rejected is not None:
+                rejected.append((line_number, str(e)))
+
+
+def group_sessions(sets):
+    """Séances : séries consécutives de même date et même type.
+
+    Renvoie (dernière ligne, date, type, notes, [(exercice, poids, reps)]).
+    """
+    for (date, session_type), rows in groupby(sets, key=lambda row: (row[1], row[2])):
+        rows = list(rows)
+        notes = next((row[6] for row in rows if row[6]), '')
+        yield rows[-1][0], date, session_type, notes, [(row[3], row[4], row[5]) for row in rows]
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ExerciseResolver:
+    """Rattache les noms du fichier aux exercices du programme et du catalogue.
+
+    La comparaison ignore accents, casse et espaces ; un nom inconnu est
+    gardé tel quel et créé dans le catalogue à l'insertion.
+    """
+
+    __slots__ = ('known', 'resolved', 'new_names')
+
+    def __init__(self, conn):
+        names = [name for day in program.compile_program().values() for name in day.exercise_names]
+        names += [name for (name,) in conn.execute('SELECT name FROM exercise_catalog')]
+        self.known = {}
+        for name in names:
+            self.known.setdefault(normalize(name), name)
+        self.resolved = {}
+        self.new_names = set()
+
+    def __call__(self, raw_name):
+        # Les mêmes libellés reviennent à chaque séance : un seul calcul par libellé
+        if raw_name in self.resolved:
+            return self.resolved[raw_name]
+        name = ' '.join(str(raw_name or '').split())
+        key = normalize(name)
+        if key not in self.known:
+            self.known[key] = name
+            self.new_names.add(name)
+        self.resolved[raw_name] = self.known[key]
+        return self.known[key]
+
+
+def fingerprint(path):
+    # Taille et début du fichier : suffisant pour détecter un autre fichier
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read(65536))
+    return f"{os.path.getsize(path)}:{digest.hexdigest()}"
+
+
+def defer_schema(conn):
+    # Supprime index et triggers (compteurs, recherche, calendrier) des
+    # tables importées, en gardant leur définition pour les recréer même
+    # après une interruption
+    if conn.execute('SELECT COUNT(*) FROM deferred_schema').fetchone()[0]:
+        return
+    placeholders = ', '.join('?' * len(DEFERRED_TABLES))
+    patterns = ' OR '.join(['name LIKE ?'] * len(DEFERRED_TRIGGERS))
+    objects = conn.execute(f'''
+        SELECT name, type, sql FROM sqlite_master
+        WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL
+          AND (type = 'index' OR (type = 'trigger' AND ({patterns})))
+    ''', (*DEFERRED_TABLES, *DEFERRED_TRIGGERS)).fetchall()
+    conn.executemany('INSERT INTO deferred_schema (name, type, sql) VALUES (?, ?, ?)', objects)
+    for name, object_type, _sql in objects:
+        conn.execute(f'DROP {object_type.upper()} IF EXISTS "{name}"')
+
+
+def restore_schema(conn):
+    for name, sql in conn.execute('SELECT name, sql FROM deferred_schema').fetchall():
+        conn.execute(sql)
+        conn.execute('DELETE FROM deferred_schema WHERE name = ?', (name,))
+
+
+def insert_sessions(conn, sessions, user_id=db.DEFAULT_USER_ID):
+    """Insère un lot de séances ; renvoie (id de la première, séries insérées).
+
+    Les identifiants sont attribués ici pour insérer séances et séries en
+    deux executemany, sans lastrowid ligne par ligne : l'appelant doit avoir
+    ouvert la transaction par BEGIN IMMEDIATE, pour qu'aucune autre écriture
+    ne prenne ces ids entre leur lecture et les insertions. Ils suivent le
+    compteur AUTOINCREMENT (sqlite_sequence), que SQLite avance lui-même à
+    l'insertion : les ids de séances supprimées ne sont jamais réattribués.
+    """
+    next_id = conn.execute(
+        "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'sessions'), 0) + 1"
+    ).fetchone()[0]
+    exercise_ids = db.get_exercise_ids(
+        conn, [name for session in sessions for name, _weight, _reps in session[4]]
+    )
+    session_rows = []
+    set_rows = []
+    for session_id, (_line, date, session_type, notes, sets) in enumerate(sessions, next_id):
+        session_rows.append((session_id, user_id, date, session_type, notes))
+        set_rows.extend((session_id, exercise_ids[name], weight, reps) for name, weight, reps in sets)
+    conn.executemany(
+        'INSERT INTO sessions (id, user_id, date, type, notes) VALUES (?, ?, ?, ?, ?)', session_rows
+    )
+    conn.executemany(
+        'INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, ?, ?)', set_rows
+    )
+    return next_id, len(set_rows)
+
+
+def delete_imported_sessions(conn, source):
+    """Supprime les séances des lots déjà importés depuis `source`.
+
+    Séries, activités et records qui les référencent sont supprimés avec
+    elles, ainsi que leurs documents de recherche ; compteurs, résumé
+    quotidien et records sont recalculés en fin d'import. Renvoie le nombre
+    de séances.
+    """
+    in_batches = '''EXISTS (
+        SELECT 1 FROM import_batches b
+        WHERE b.source = ? AND {id} BETWEEN b.first_session_id AND b.last_session_id
+    )'''
+    for table in ('exercises', 'warmups', 'finishers', 'personal_records'):
+        conn.execute(f'DELETE FROM {table} WHERE {in_batches.format(id="session_id")}', (source,))
+    conn.execute(f'DELETE FROM session_search WHERE {in_batches.format(id="rowid")}', (source,))
+    deleted = conn.execute(f'DELETE FROM sessions WHERE {in_batches.format(id="id")}', (source,)).rowcount
+    conn.execute('DELETE FROM import_batches WHERE source = ?', (source,))
+    return deleted
+
+
+def _rate(lines, elapsed):
+    return f"{lines / elapsed if elapsed else 0:,.0f}".replace(',', ' ')
+
+
+def import_file(path, file_format=None, default_type=DEFAULT_SESSION_TYPE,
+                chunk_size=SESSIONS_PER_TRANSACTION, restart=False, report=print,
+                user_id=db.DEFAULT_USER_ID, offline=False):
+    """Importe un fichier CSV ou JSON lines de séries dans la base.
+
+    Les séances sont insérées par lots dans des transactions successives ;
+    l'avancement est enregistré dans la même transaction que chaque lot,
+    un import interrompu reprend donc après la dernière séance validée.
+    Les fichiers doivent regrouper les séries d'une même séance sur des
+    lignes consécutives. Renvoie le dict d'avancement final.
+
+    Par défaut, index et triggers restent en place : l'application peut
+    écrire pendant l'import. Avec offline=True (application arrêtée), ils
+    sont supprimés le temps de l'import puis reconstruits en une passe,
+    plus rapide sur un gros historique.
+    """
+    db.init_database()
+    source = os.path.abspath(path)
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    file_fingerprint = fingerprint(path)
+
+    with db.transaction() as conn:
+        if restart:
+            previous = conn.execute('SELECT sessions FROM import_progress WHERE source = ?', (source,)).fetchone()
+            if offline:
+                defer_schema(conn)
+            deleted = delete_imported_sessions(conn, source)
+            # Import antérieur au suivi des lots : ses séances seraient dupliquées
+            if previous and previous[0] and not deleted:
+                raise ValueError(f"séances de l'import précédent de {path} introuvables : "
+                                 "les supprimer avant de relancer avec --restart")
+            if deleted:
+                report(f"{deleted} séances de l'import précédent supprimées")
+            conn.execute('DELETE FROM import_progress WHERE source = ?', (source,))
+        progress = conn.execute(
+            'SELECT fingerprint, lines_done, sessions, sets, finished_at FROM import_progress WHERE source = ?',
+            (source,)
+        ).fetchone()
+        if progress is None:
+            conn.execute(
+                'INSERT INTO import_progress (source, fingerprint, started_at) VALUES (?, ?, ?)',
+                (source, file_fingerprint, int(time.time()))
+            )
+            progress = (file_fingerprint, 0, 0, 0, None)
+        elif progress[0] != file_fingerprint:
+            raise ValueError(f"{path} a changé depuis l'import précédent (relancer avec --restart)")
+        elif progress[4] is not None:
+            report(f"{path} déjà importé ({progress[2]} séances, {progress[3]} séries)")
+            return {'lines': progress[1], 'sessions': progress[2], 'sets': progress[3], 'rejected': []}
+        if offline:
+            defer_schema(conn)
+        else:
+            # Schéma laissé différé par un import hors ligne interrompu :
+            # rétabli avant que l'application n'écrive à nouveau
+            restore_schema(conn)
+        resolver = ExerciseResolver(conn)
+
+    lines_done, sessions_done, sets_done = progress[1], progress[2], progress[3]
+    if lines_done:
+        report(f"Reprise après la ligne {lines_done} ({sessions_done} séances déjà importées)")
+
+    rejected = []
+    records = ((line, record) for line, record in read_records(path, file_format) if line > lines_done)
+    sessions = group_sessions(parse_records(records, resolver, default_type, rejected))
+
+    started = time.perf_counter()
+    last_report = started
+    imported_lines = 0
+    for chunk in chunked(sessions, chunk_size):
+        with db.transaction() as conn:
+            # Verrou d'écriture pris avant la lecture des ids par insert_sessions
+            conn.execute('BEGIN IMMEDIATE')
+            if offline:
+                first_id, sets = insert_sessions(conn, chunk, user_id)
+            else:
+                # Un document de recherche par séance, écrit après ses séries
+                with db.search_deferred(conn):
+                    first_id, sets = insert_sessions(conn, chunk, user_id)
+                db.index_sessions(conn, first_id, first_id + len(chunk) - 1)
+            conn.execute(
+                'INSERT INTO import_batches (source, first_session_id, last_session_id) VALUES (?, ?, ?)',
+                (source, first_id, first_id + len(chunk) - 1)
+            )
+            sets_done += sets
+            sessions_done += len(chunk)
+            imported_lines += chunk[-1][0] - lines_done
+            lines_done = chunk[-1][0]
+            conn.execute(
+                'UPDATE import_progress SET lines_done = ?, sessions = ?, sets = ? WHERE source = ?',
+                (lines_done, sessions_done, sets_done, source)
+            )
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL:
+            report(f"ligne {lines_done} : {sessions_done} séances, {sets_done} séries "
+                   f"({_rate(imported_lines, now - started)} lignes/s)")
+            last_report = now
+
+    # Index, triggers et tables dérivées reconstruits en une passe (aussi
+    # après un import en ligne : rattrape un import hors ligne interrompu)
+    report("Reconstruction des index, compteurs, records et de la recherche...")
+    with db.transaction() as conn:
+        restore_schema(conn)
+        db.index_new_sessions(conn)
+        # Tous les athlètes : les séances enregistrées pendant l'import n'ont
+        # pas non plus été comptées
+        db.rebuild_daily_summary(conn)
+    db.check_stats_rollup(fix=True)
+    db.rebuild_personal_records()
+    columnar.sync()
+    # Marqué terminé en dernier : une interruption avant relance la reconstruction
+    with db.transaction() as conn:
+        conn.execute(
+            'UPDATE import_progress SET finished_at = ? WHERE source = ?', (int(time.time()), source)
+        )
+
+    elapsed = time.perf_counter() - started
+    report(f"{sessions_done} séances, {sets_done} séries importées en {elapsed:.1f} s "
+           f"({_rate(imported_lines, elapsed)} lignes/s)")
+    if resolver.new_names:
+        report(f"Exercices ajoutés au catalogue : {', '.join(sorted(resolver.new_names))}")
+    return {'lines': lines_done, 'sessions': sessions_done, 'sets': sets_done, 'rejected': rejected}
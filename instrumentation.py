@@ -0,0 +1,242 @@
+# Instrumentation des requêtes SQL et des rendus de pages : chaque exécution
+# est notée (texte, durée, lignes) dans des tampons circulaires en mémoire,
+# partagés par tous les threads du processus
+import collections
+import itertools
+import re
+import sqlite3
+import threading
+import time
+
+# Événements gardés : les plus anciens sont écrasés
+QUERY_LOG_SIZE = 2000
+RENDER_LOG_SIZE = 200
+
+# Lignes lues à la fois quand un curseur est parcouru par une boucle
+ITERATION_BATCH = 256
+
+# Listes de paramètres générées (IN (?, ?, ...)) regroupées en une requête
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+_sequence = itertools.count(1)
+
+
+class QueryEvent:
+    """Exécution d'une requête ; durée et lignes cumulées jusqu'à la
+    lecture de la dernière ligne (l'essentiel du travail de SQLite a lieu
+    pendant la lecture, pas dans execute)."""
+    __slots__ = ('sequence', 'sql', 'parameters', 'thread', 'duration_ms', 'rows')
+
+    def __init__(self, sql, parameters=None):
+        self.sequence = next(_sequence)
+        self.sql = sql
+        # Gardés pour EXPLAIN QUERY PLAN ; None pour executemany et executescript
+        self.parameters = parameters
+        self.thread = threading.get_ident()
+        self.duration_ms = 0.0
+        self.rows = 0
+
+    def __repr__(self):
+        return f"QueryEvent({statement_key(self.sql)[:40]!r}, {self.duration_ms:.2f} ms, {self.rows} lignes)"
+
+
+class RenderEvent:
+    """Rendu d'une page (un rerun du script ou d'un fragment) et requêtes
+    de son thread."""
+    __slots__ = ('page', 'duration_ms', 'queries', 'query_ms', 'rows', 'reruns', 'finished_at')
+
+    def __init__(self, page, duration_ms, queries, query_ms, rows, reruns):
+        self.page = page
+        self.duration_ms = duration_ms
+        self.queries = queries
+        self.query_ms = query_ms
+        self.rows = rows
+        # Rang du rerun dans l'interaction (1 = déclenché par l'utilisateur)
+        self.reruns = reruns
+        self.finished_at = time.time()
+
+    def __repr__(self):
+        return f"RenderEvent({self.page!r}, {self.duration_ms:.0f} ms, {self.queries} requêtes)"
+
+
+class RingBuffer:
+    def __init__(self, size):
+        self._events = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def last(self):
+        with self._lock:
+            return self._events[-1] if self._events else None
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._events)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+
+queries = RingBuffer(QUERY_LOG_SIZE)
+renders = RingBuffer(RENDER_LOG_SIZE)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    __slots__ = ('event',)
+
+    def _start(self, sql, parameters=None):
+        self.event = QueryEvent(sql, parameters)
+        queries.append(self.event)
+        return time.perf_counter()
+
+    def _stop(self, started, rows=0):
+        self.event.duration_ms += (time.perf_counter() - started) * 1000
+        self.event.rows += rows
+
+    def _count_changes(self):
+        # Écriture : lignes modifiées plutôt que lues
+        if self.description is None:
+            self.event.rows = max(self.rowcount, 0)
+
+    def execute(self, sql, parameters=()):
+        started = self._start(sql, parameters)
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._stop(started)
+        self._count_changes()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = self._start(sql)
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._stop(started)
+        self._count_changes()
+        return self
+
+    def executescript(self, sql_script):
+        started = self._start(sql_script)
+        try:
+            super().executescript(sql_script)
+        finally:
+            self._stop(started)
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._stop(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._stop(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._stop(started, len(rows))
+        return rows
+
+    def __iter__(self):
+        # Lignes lues par paquets (fetchmany, mesuré) puis rendues une à une
+        # par itertools.chain : pas d'appel Python par ligne
+        return itertools.chain.from_iterable(self._batches())
+
+    def _batches(self):
+        while True:
+            rows = self.fetchmany(ITERATION_BATCH)
+            if not rows:
+                return
+            yield rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connexion dont toutes les requêtes passent par InstrumentedCursor.
+
+    Connection.execute de sqlite3 n'appelle pas Cursor.execute : les
+    raccourcis sont donc redéfinis ici.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def last_sequence():
+    # Numéro de la dernière requête notée, repère de début d'un rerun
+    event = queries.last()
+    return event.sequence if event else 0
+
+
+def queries_since(sequence, thread=None):
+    """Requêtes notées après `sequence`, d'un seul thread si précisé."""
+    return [
+        event for event in queries.snapshot()
+        if event.sequence > sequence and (thread is None or event.thread == thread)
+    ]
+
+
+def thread_queries(sequence):
+    # Requêtes du thread courant (celui du rerun) depuis `sequence`
+    return queries_since(sequence, threading.get_ident())
+
+
+def record_render(page, started, sequence, reruns=1):
+    # Rendu terminé : durée depuis `started` (perf_counter) et requêtes du
+    # thread courant depuis `sequence`
+    events = thread_queries(sequence)
+    render = RenderEvent(
+        page,
+        (time.perf_counter() - started) * 1000,
+        len(events),
+        sum(event.duration_ms for event in events),
+        sum(event.rows for event in events),
+        reruns,
+    )
+    renders.append(render)
+    return render
+
+
+def statement_key(sql):
+    # Texte normalisé : espaces compactés, listes de paramètres regroupées
+    return _PLACEHOLDER_LIST.sub('(?...)', ' '.join(sql.split()))
+
+
+def summarize(events):
+    """Requêtes regroupées par texte normalisé, les plus coûteuses d'abord.
+
+    Chaque groupe garde son exécution la plus lente (paramètres compris,
+    pour EXPLAIN QUERY PLAN).
+    """
+    groups = {}
+    for event in events:
+        key = statement_key(event.sql)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {'sql': key, 'calls': 1, 'total_ms': event.duration_ms,
+                           'max_ms': event.duration_ms, 'rows': event.rows, 'slowest': event}
+            continue
+        group['calls'] += 1
+        group['total_ms'] += event.duration_ms
+        group['rows'] += event.rows
+        if event.duration_ms > group['max_ms']:
+            group['max_ms'] = event.duration_ms
+            group['slowest'] = event
+    return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
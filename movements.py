@@ -0,0 +1,264 @@
+# Catalogue des mouvements CrossFit et son index à facettes, chargé une
+# seule fois par processus
+import numpy as np
+
+# Valeurs de chaque facette, dans l'ordre d'affichage des filtres
+FACETS = {
+    'category': ('Gymnastique', 'Haltérophilie', 'Cardio', 'Mobilité'),
+    'level': ('Débutant', 'Intermédiaire', 'Avancé'),
+    'equipment': ('Poids du corps', 'Barre', 'Haltères', 'Kettlebell', 'Machine',
+                  'Anneaux', 'Box', 'Médecine-ball', 'Corde'),
+}
+
+# Mouvements de base : (nom, catégorie, niveau, équipements possibles).
+# Un mouvement faisable avec plusieurs équipements donne une entrée par
+# équipement, « Thruster (haltères) »
+BASE_MOVEMENTS = (
+    # Gymnastique
+    ('Air squat', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Pompe', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Pompe sur les genoux', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Pompe déclinée', 'Gymnastique', 'Intermédiaire', ('Poids du corps', 'Box')),
+    ('Burpee', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Burpee box jump over', 'Gymnastique', 'Intermédiaire', ('Box',)),
+    ('Burpee pull-up', 'Gymnastique', 'Avancé', ('Poids du corps',)),
+    ('Fente marchée', 'Gymnastique', 'Débutant', ('Poids du corps', 'Haltères', 'Kettlebell', 'Barre')),
+    ('Fente sautée', 'Gymnastique', 'Intermédiaire', ('Poids du corps',)),
+    ('Pistol squat', 'Gymnastique', 'Avancé', ('Poids du corps', 'Kettlebell')),
+    ('Sit-up', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('GHD sit-up', 'Gymnastique', 'Intermédiaire', ('Machine',)),
+    ('V-up', 'Gymnastique', 'Intermédiaire', ('Poids du corps',)),
+    ('Hollow rock', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Planche', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('L-sit', 'Gymnastique', 'Intermédiaire', ('Poids du corps', 'Anneaux')),
+    ('Superman', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Back extension', 'Gymnastique', 'Débutant', ('Machine',)),
+    ('Knee raise', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Hanging knee raise', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Toes-to-bar', 'Gymnastique', 'Intermédiaire', ('Poids du corps',)),
+    ('Knees-to-elbows', 'Gymnastique', 'Intermédiaire', ('Poids du corps',)),
+    ('Ring row', 'Gymnastique', 'Débutant', ('Anneaux',)),
+    ('Jumping pull-up', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Strict pull-up', 'Gymnastique', 'Intermédiaire', ('Poids du corps', 'Anneaux')),
+    ('Kipping pull-up', 'Gymnastique', 'Intermédiaire', ('Poids du corps',)),
+    ('Butterfly pull-up', 'Gymnastique', 'Avancé', ('Poids du corps',)),
+    ('Chest-to-bar pull-up', 'Gymnastique', 'Avancé', ('Poids du corps',)),
+    ('Weighted pull-up', 'Gymnastique', 'Avancé', ('Haltères', 'Kettlebell')),
+    ('Bar muscle-up', 'Gymnastique', 'Avancé', ('Poids du corps',)),
+    ('Ring muscle-up', 'Gymnastique', 'Avancé', ('Anneaux',)),
+    ('Ring dip', 'Gymnastique', 'Intermédiaire', ('Anneaux',)),
+    ('Bench dip', 'Gymnastique', 'Débutant', ('Box',)),
+    ('Ring support hold', 'Gymnastique', 'Débutant', ('Anneaux',)),
+    ('Handstand hold', 'Gymnastique', 'Intermédiaire', ('Poids du corps',)),
+    ('Wall walk', 'Gymnastique', 'Intermédiaire', ('Poids du corps',)),
+    ('Pike push-up', 'Gymnastique', 'Intermédiaire', ('Poids du corps', 'Box')),
+    ('Strict handstand push-up', 'Gymnastique', 'Avancé', ('Poids du corps',)),
+    ('Kipping handstand push-up', 'Gymnastique', 'Avancé', ('Poids du corps',)),
+    ('Deficit handstand push-up', 'Gymnastique', 'Avancé', ('Poids du corps',)),
+    ('Handstand walk', 'Gymnastique', 'Avancé', ('Poids du corps',)),
+    ('Rope climb', 'Gymnastique', 'Intermédiaire', ('Corde',)),
+    ('Legless rope climb', 'Gymnastique', 'Avancé', ('Corde',)),
+    ('Rope pull from floor', 'Gymnastique', 'Débutant', ('Corde',)),
+    ('Box jump', 'Gymnastique', 'Débutant', ('Box',)),
+    ('Box step-up', 'Gymnastique', 'Débutant', ('Box', 'Haltères', 'Kettlebell')),
+    ('Box jump over', 'Gymnastique', 'Intermédiaire', ('Box',)),
+    ('Broad jump', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Tuck jump', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Bear crawl', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Inchworm', 'Gymnastique', 'Débutant', ('Poids du corps',)),
+    ('Skin the cat', 'Gymnastique', 'Avancé', ('Anneaux',)),
+    ('Front lever', 'Gymnastique', 'Avancé', ('Poids du corps', 'Anneaux')),
+    ('Ab wheel rollout', 'Gymnastique', 'Intermédiaire', ('Machine',)),
+    # Haltérophilie et force
+    ('Deadlift', 'Haltérophilie', 'Débutant', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Sumo deadlift high pull', 'Haltérophilie', 'Intermédiaire', ('Barre', 'Kettlebell')),
+    ('Romanian deadlift', 'Haltérophilie', 'Débutant', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Back squat', 'Haltérophilie', 'Débutant', ('Barre',)),
+    ('Front squat', 'Haltérophilie', 'Intermédiaire', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Overhead squat', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères')),
+    ('Goblet squat', 'Haltérophilie', 'Débutant', ('Haltères', 'Kettlebell')),
+    ('Zercher squat', 'Haltérophilie', 'Intermédiaire', ('Barre',)),
+    ('Box squat', 'Haltérophilie', 'Débutant', ('Barre', 'Box')),
+    ('Strict press', 'Haltérophilie', 'Débutant', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Push press', 'Haltérophilie', 'Intermédiaire', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Push jerk', 'Haltérophilie', 'Intermédiaire', ('Barre', 'Haltères')),
+    ('Split jerk', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères')),
+    ('Bench press', 'Haltérophilie', 'Débutant', ('Barre', 'Haltères')),
+    ('Floor press', 'Haltérophilie', 'Débutant', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Bent-over row', 'Haltérophilie', 'Débutant', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Pendlay row', 'Haltérophilie', 'Intermédiaire', ('Barre',)),
+    ('Renegade row', 'Haltérophilie', 'Intermédiaire', ('Haltères', 'Kettlebell')),
+    ('Good morning', 'Haltérophilie', 'Intermédiaire', ('Barre',)),
+    ('Hip thrust', 'Haltérophilie', 'Débutant', ('Barre', 'Haltères')),
+    ('Power clean', 'Haltérophilie', 'Intermédiaire', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Hang power clean', 'Haltérophilie', 'Intermédiaire', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Squat clean', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères')),
+    ('Hang squat clean', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères')),
+    ('Clean and jerk', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères')),
+    ('Power snatch', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Hang power snatch', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères')),
+    ('Squat snatch', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères')),
+    ('Muscle snatch', 'Haltérophilie', 'Intermédiaire', ('Barre',)),
+    ('Snatch balance', 'Haltérophilie', 'Avancé', ('Barre',)),
+    ('Thruster', 'Haltérophilie', 'Intermédiaire', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Cluster', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères')),
+    ('Devil press', 'Haltérophilie', 'Intermédiaire', ('Haltères',)),
+    ('Man maker', 'Haltérophilie', 'Avancé', ('Haltères',)),
+    ('Kettlebell swing russe', 'Haltérophilie', 'Débutant', ('Kettlebell',)),
+    ('Kettlebell swing américain', 'Haltérophilie', 'Intermédiaire', ('Kettlebell',)),
+    ('Turkish get-up', 'Haltérophilie', 'Intermédiaire', ('Kettlebell', 'Haltères')),
+    ('Snatch unilatéral', 'Haltérophilie', 'Intermédiaire', ('Haltères', 'Kettlebell')),
+    ('Clean and jerk unilatéral', 'Haltérophilie', 'Intermédiaire', ('Haltères', 'Kettlebell')),
+    ('Overhead walking lunge', 'Haltérophilie', 'Avancé', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Front rack lunge', 'Haltérophilie', 'Intermédiaire', ('Barre', 'Haltères', 'Kettlebell')),
+    ('Farmer carry', 'Haltérophilie', 'Débutant', ('Haltères', 'Kettlebell')),
+    ('Overhead carry', 'Haltérophilie', 'Intermédiaire', ('Haltères', 'Kettlebell', 'Barre')),
+    ('Wall ball', 'Haltérophilie', 'Débutant', ('Médecine-ball',)),
+    ('Medicine ball clean', 'Haltérophilie', 'Débutant', ('Médecine-ball',)),
+    ('Ball slam', 'Haltérophilie', 'Débutant', ('Médecine-ball',)),
+    ('Sandbag over shoulder', 'Haltérophilie', 'Intermédiaire', ('Machine',)),
+    ('Sled push', 'Haltérophilie', 'Débutant', ('Machine',)),
+    ('Sled pull', 'Haltérophilie', 'Débutant', ('Machine',)),
+    # Cardio
+    ('Rameur', 'Cardio', 'Débutant', ('Machine',)),
+    ('Assault bike', 'Cardio', 'Débutant', ('Machine',)),
+    ('Bike erg', 'Cardio', 'Débutant', ('Machine',)),
+    ('Ski erg', 'Cardio', 'Débutant', ('Machine',)),
+    ('Tapis de course', 'Cardio', 'Débutant', ('Machine',)),
+    ('Course à pied', 'Cardio', 'Débutant', ('Poids du corps',)),
+    ('Sprint', 'Cardio', 'Intermédiaire', ('Poids du corps',)),
+    ('Shuttle run', 'Cardio', 'Débutant', ('Poids du corps',)),
+    ('Single-under', 'Cardio', 'Débutant', ('Corde',)),
+    ('Double-under', 'Cardio', 'Intermédiaire', ('Corde',)),
+    ('Triple-under', 'Cardio', 'Avancé', ('Corde',)),
+    ('Crossover', 'Cardio', 'Avancé', ('Corde',)),
+    ('Mountain climber', 'Cardio', 'Débutant', ('Poids du corps',)),
+    ('Jumping jack', 'Cardio', 'Débutant', ('Poids du corps',)),
+    ('High knees', 'Cardio', 'Débutant', ('Poids du corps',)),
+    ('Battle rope', 'Cardio', 'Débutant', ('Corde',)),
+    ('Lateral burpee', 'Cardio', 'Intermédiaire', ('Poids du corps', 'Barre')),
+    ('Step-up cardio', 'Cardio', 'Débutant', ('Box',)),
+    # Mobilité
+    ('Étirement couch stretch', 'Mobilité', 'Débutant', ('Poids du corps', 'Box')),
+    ('Pigeon', 'Mobilité', 'Débutant', ('Poids du corps',)),
+    ('Rotation thoracique', 'Mobilité', 'Débutant', ('Poids du corps',)),
+    ('World greatest stretch', 'Mobilité', 'Débutant', ('Poids du corps',)),
+    ('Squat profond tenu', 'Mobilité', 'Débutant', ('Poids du corps', 'Kettlebell')),
+    ('Cossack squat', 'Mobilité', 'Intermédiaire', ('Poids du corps', 'Kettlebell')),
+    ('Dislocation d\'épaules', 'Mobilité', 'Débutant', ('Corde', 'Barre')),
+    ('Pass-through', 'Mobilité', 'Débutant', ('Barre',)),
+    ('Mobilité de cheville', 'Mobilité', 'Débutant', ('Poids du corps', 'Box')),
+    ('Ouverture de hanche 90/90', 'Mobilité', 'Débutant', ('Poids du corps',)),
+    ('Jefferson curl', 'Mobilité', 'Intermédiaire', ('Haltères', 'Kettlebell', 'Barre')),
+    ('Bretzel', 'Mobilité', 'Intermédiaire', ('Poids du corps',)),
+    ('Pont', 'Mobilité', 'Intermédiaire', ('Poids du corps',)),
+    ('Suspension passive', 'Mobilité', 'Débutant', ('Poids du corps', 'Anneaux')),
+    ('German hang', 'Mobilité', 'Avancé', ('Anneaux',)),
+    ('Pancake', 'Mobilité', 'Intermédiaire', ('Poids du corps',)),
+    ('Grand écart facial', 'Mobilité', 'Avancé', ('Poids du corps',)),
+    ('Overhead squat PVC', 'Mobilité', 'Débutant', ('Barre',)),
+    ('Windmill', 'Mobilité', 'Intermédiaire', ('Kettlebell', 'Haltères')),
+    ('Halo', 'Mobilité', 'Débutant', ('Kettlebell', 'Haltères')),
+)
+
+
+def catalogue(base=BASE_MOVEMENTS):
+    """Lignes (nom, catégorie, niveau, équipement), une par variante."""
+    rows = []
+    for name, category, level, equipment in base:
+        for item in equipment:
+            label = name if len(equipment) == 1 else f"{name} ({item.lower()})"
+            rows.append((label, category, level, item))
+    return rows
+
+
+class Movement:
+    __slots__ = ('id', 'name', 'category', 'level', 'equipment')
+
+    def __init__(self, id, name, category, level, equipment):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.level = level
+        self.equipment = equipment
+
+    def __repr__(self):
+        return f"Movement({self.name!r}, {self.category}, {self.level}, {self.equipment})"
+
+
+def _bitset(positions, size):
+    # Entier dont les bits `positions` sont à 1, construit en O(taille)
+    bits = np.zeros(size, dtype=np.uint8)
+    bits[positions] = 1
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+
+class FacetIndex:
+    """Index à facettes en mémoire, un bitset par valeur de facette.
+
+    Le bit i d'un bitset (entier Python) désigne le i-ème mouvement ;
+    combiner des filtres est un ET d'entiers et compter un bit_count(),
+    sans requête SQL.
+    """
+    __slots__ = ('movements', 'by_id', 'bitsets', 'all_bits')
+
+    def __init__(self, movements):
+        self.movements = tuple(sorted(movements, key=lambda movement: movement.name.casefold()))
+        self.by_id = {movement.id: movement for movement in self.movements}
+        size = len(self.movements)
+        self.all_bits = (1 << size) - 1
+        self.bitsets = {}
+        for facet, known in FACETS.items():
+            positions = {value: [] for value in known}
+            for position, movement in enumerate(self.movements):
+                positions.setdefault(getattr(movement, facet), []).append(position)
+            self.bitsets[facet] = {value: _bitset(found, size) for value, found in positions.items()}
+
+    def __len__(self):
+        return len(self.movements)
+
+    def match(self, filters):
+        # filters : facette -> valeur, ou liste de valeurs acceptées (OU) ;
+        # None ou liste vide pour « Tous »
+        bits = self.all_bits
+        for facet, value in filters.items():
+            if not value:
+                continue
+            values = self.bitsets[facet]
+            if isinstance(value, str):
+                bits &= values.get(value, 0)
+            else:
+                accepted = 0
+                for item in value:
+                    accepted |= values.get(item, 0)
+                bits &= accepted
+        return bits
+
+    def facet_counts(self, filters):
+        """Mouvements par valeur de chaque facette.
+
+        Chaque facette est comptée avec les filtres des autres seulement :
+        la valeur choisie n'efface pas ses voisines de la liste.
+        """
+        counts = {}
+        for facet, values in self.bitsets.items():
+            others = self.match({other: value for other, value in filters.items() if other != facet})
+            counts[facet] = {value: (bits & others).bit_count() for value, bits in values.items()}
+        return counts
+
+    def select(self, bits):
+        # Mouvements des bits à 1, dans l'ordre alphabétique
+        if not bits:
+            return []
+        raw = np.frombuffer(bits.to_bytes((len(self.movements) + 7) // 8, 'little'), dtype=np.uint8)
+        return [self.movements[position] for position in np.flatnonzero(np.unpackbits(raw, bitorder='little'))]
+
+    def search(self, filters):
+        return self.select(self.match(filters))
+
+
+def load_index(conn):
+    return FacetIndex(
+        Movement(*row)
+        for row in conn.execute('SELECT id, name, category, level, equipment FROM crossfit_movements')
+    )
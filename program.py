@@ -0,0 +1,148 @@
+# Programme d'entraînement et sa version compilée, analysée une seule fois
+WORKOUT_PROGRAM = {
+    'PUSH (Lundi)': {
+        'echauffement': ['Tapis (5 min)', 'Élastique'],
+        'exercices': [
+            'Pec deck - 2 séries',
+            'Développé couché machine convergente - 3 séries',
+            'Biceps corde à la poulie (prise marteau) - 3 séries',
+            'Décliné à la machine convergente - 2 séries',
+            'Curl biceps unilatéral poulie - 3 séries',
+            'Dips - 3 séries',
+            'Curl biceps machine - 3 séries',
+            'Développé militaire machine - 3 séries',
+            'Élévation frontale haltère - 3 séries',
+            'Élévation latérale machine - 3 séries'
+        ],
+        'finisher': 'Tapis (20 min de marche)'
+    },
+    'PULL (Mardi)': {
+        'echauffement': ['Tapis (5 min)', 'Élastique'],
+        'exercices': [
+            'Tirage vertical - 3 séries',
+            'Tirage vertical (prise serrée) - 3 séries',
+            'Extension triceps unilatéral poulie haute - 3 séries',
+            'Tirage horizontal (coude levé, arrière d\'épaule) - 3 séries',
+            'Tirage horizontal (coude collé) - 3 séries',
+            'Extension triceps nuque poulie - 3 séries',
+            'Extension triceps unilatéral poulie (prise marteau) - 3 séries'
+        ],
+        'finisher': 'Tapis (20 min de marche)'
+    },
+    'LEG (Mercredi)': {
+        'echauffement': ['Vélo (10 min)', 'Échauffement cheville, genou, hanche'],
+        'exercices': [
+            'Leg extension unilatéral - 4 séries',
+            'Belt squat - 3 séries',
+            'Hip thrust - 3 séries',
+            'Presse - 3 séries',
+            'Abdos - 3 séries',
+            'Lombaires - 3 séries'
+        ],
+        'finisher': 'Tapis (20 min de marche)'
+    },
+    'PUSH (Jeudi)': {
+        'echauffement': ['Tapis (5 min)', 'Élastique'],
+        'exercices': [
+            'Pec deck - 3 séries',
+            'Curl biceps machine - 3 séries',
+            'Développé incliné machine convergente - 4 séries',
+            'Curl biceps (prise marteau) - 4 séries',
+            'Dips - 3 séries',
+            'Développé militaire haltères - 3 séries',
+            'Élévation frontale haltère - 3 séries',
+            'Élévation latérale poulie - 3 séries'
+        ],
+        'finisher': 'Tapis (20 min de marche)'
+    },
+    'PULL (Vendredi)': {
+        'echauffement': ['Tapis (5 min)', 'Élastique'],
+        'exercices': [
+            'Tirage vertical unilatéral - 3 séries',
+            'Extension triceps unilatéral poulie - 3 séries',
+            'Tirage horizontal (prise marteau) - 3 séries',
+            'Extension triceps nuque poulie - 3 séries',
+            'Oiseau à la machine - 3 séries',
+            'Extension triceps à la poulie vis-à-vis - 3 séries'
+        ],
+        'finisher': 'Tapis (20 min de marche)'
+    },
+    'LEG (Samedi)': {
+        'echauffement': ['Vélo (10 min)', 'Échauffement cheville, genou, hanche'],
+        'exercices': [
+            'Leg extension - 3 séries',
+            'Presse - 3 séries',
+            'Fentes - 3 séries',
+            'Ischios - 4 séries',
+            'Hip thrust - 3 séries',
+            'Abdos - 3 séries',
+            'Lombaires - 3 séries'
+        ],
+        'finisher': 'Tapis (20 min de marche)'
+    }
+}
+
+# Durées par défaut quand le libellé n'en précise pas, en minutes
+DEFAULT_WARMUP_DURATION = 5
+DEFAULT_FINISHER_DURATION = 20
+
+
+class Exercise:
+    __slots__ = ('name', 'num_sets', 'label')
+
+    def __init__(self, name, num_sets, label):
+        self.name = name
+        self.num_sets = num_sets
+        self.label = label
+
+    def __repr__(self):
+        return f"Exercise({self.name!r}, {self.num_sets})"
+
+
+class Activity:
+    __slots__ = ('name', 'default_duration')
+
+    def __init__(self, name, default_duration):
+        self.name = name
+        self.default_duration = default_duration
+
+    def __repr__(self):
+        return f"Activity({self.name!r}, {self.default_duration})"
+
+
+class WorkoutDay:
+    __slots__ = ('name', 'warmups', 'exercises', 'finisher', 'exercise_names')
+
+    def __init__(self, name, warmups, exercises, finisher):
+        self.name = name
+        self.warmups = warmups
+        self.exercises = exercises
+        self.finisher = finisher
+        self.exercise_names = tuple(exercise.name for exercise in exercises)
+
+    def __repr__(self):
+        return f"WorkoutDay({self.name!r}, {len(self.exercises)} exercices)"
+
+
+def parse_exercise(label):
+    # 'Pec deck - 2 séries' -> Exercise('Pec deck', 2)
+    name, sets = label.split(' - ')
+    return Exercise(name, int(sets.split()[0]), label)
+
+
+def parse_activity(label, default_duration):
+    # 'Tapis (20 min de marche)' -> Activity('Tapis (20 min de marche)', 20)
+    duration = int(label.split('(')[1].split()[0]) if '(' in label else default_duration
+    return Activity(label, duration)
+
+
+def compile_program(program=WORKOUT_PROGRAM):
+    return {
+        name: WorkoutDay(
+            name,
+            tuple(parse_activity(label, DEFAULT_WARMUP_DURATION) for label in day['echauffement']),
+            tuple(parse_exercise(label) for label in day['exercices']),
+            parse_activity(day['finisher'], DEFAULT_FINISHER_DURATION),
+        )
+        for name, day in program.items()
+    }
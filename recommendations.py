@@ -0,0 +1,171 @@
+# Charges et répétitions suggérées pour chaque série d'une séance, calculées
+# en une fois au démarrage à partir des dernières séances de chaque exercice
+import time
+
+import numpy as np
+
+import analytics
+import db
+
+# Séances récentes prises en compte par exercice, et ancienneté maximale
+HISTORY_SESSIONS = 6
+LOOKBACK_DAYS = 365
+
+# Double progression : on ajoute des reps jusqu'au haut de la fourchette sur
+# toutes les séries, puis on charge et on repart du bas
+REP_RANGE = (8, 12)
+WEIGHT_INCREMENT = 2.5
+# Pas des champs de poids de l'application
+WEIGHT_STEP = 1.25
+
+# Décharge : 1RM estimé de la dernière séance tombé à plus de 10 % sous le
+# meilleur des précédentes, ou tendance qui en perd autant sur la fenêtre ;
+# charge à -10 %. Le retour de 12 à 8 reps d'une double progression coûte
+# jusqu'à 9,5 % de 1RM estimé (Epley) et ne doit pas déclencher de décharge
+DELOAD_DROP = 0.10
+DELOAD_FACTOR = 0.9
+DELOAD_MIN_SESSIONS = 3
+
+STATUSES = ('nouveau', 'progression', 'maintien', 'décharge')
+
+
+class Recommendation:
+    __slots__ = ('exercise', 'status', 'sets', 'e1rm', 'trend', 'sessions')
+
+    def __init__(self, exercise, status, sets, e1rm=None, trend=None, sessions=0):
+        self.exercise = exercise
+        self.status = status
+        # (poids, reps) suggérés, un par série ; vide sans historique
+        self.sets = sets
+        self.e1rm = e1rm
+        # Pente du 1RM estimé, en kg par séance
+        self.trend = trend
+        self.sessions = sessions
+
+    def __repr__(self):
+        return f"Recommendation({self.exercise!r}, {self.status!r}, {len(self.sets)} séries)"
+
+    def suggestion(self, set_number):
+        # Série au-delà de celles prévues : la dernière est répétée
+        if not self.sets:
+            return None
+        return self.sets[min(set_number, len(self.sets)) - 1]
+
+
+def round_weight(weight):
+    return round(weight / WEIGHT_STEP) * WEIGHT_STEP
+
+
+def _group_starts(*keys):
+    # Début de chaque groupe de lignes consécutives de mêmes clés
+    change = np.zeros(len(keys[0]), dtype=bool)
+    change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+def session_trends(exercise_ids, session_ids, weights, reps):
+    """Indicateurs par exercice, vectorisés sur toutes les séries.
+
+    Les tableaux sont triés par exercice puis par séance (de la plus
+    ancienne à la plus récente). Renvoie les débuts de séance, et par
+    exercice : dernière séance (indice dans les séances), nombre de
+    séances, pente et dernier 1RM estimé, meilleur 1RM des séances
+    précédentes, reps minimales de la dernière séance.
+    """
+    e1rm = analytics.estimated_1rm(weights, reps)
+    session_starts = _group_starts(exercise_ids, session_ids)
+    session_e1rm = np.maximum.reduceat(e1rm, session_starts)
+    session_min_reps = np.minimum.reduceat(reps, session_starts)
+    session_exercise = exercise_ids[session_starts]
+
+    first = _group_starts(session_exercise)
+    counts = np.diff(np.append(first, len(session_exercise)))
+    last = first + counts - 1
+    group = np.repeat(np.arange(len(first)), counts)
+
+    # Moindres carrés de 1RM estimé = a + pente × rang de la séance
+    x = np.arange(len(session_e1rm)) - np.repeat(first, counts)
+    sum_x = np.bincount(group, x)
+    sum_y = np.bincount(group, session_e1rm)
+    sum_xy = np.bincount(group, x * session_e1rm)
+    sum_xx = np.bincount(group, x * x)
+    denominator = counts * sum_xx - sum_x ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denominator > 0, (counts * sum_xy - sum_x * sum_y) / denominator, 0.0)
+
+    previous = session_e1rm.copy()
+    previous[last] = -np.inf
+    previous_best = np.maximum.reduceat(previous, first)
+
+    return {
+        'session_starts': session_starts,
+        'last': last,
+        'sessions': counts,
+        'slope': slope,
+        'e1rm': session_e1rm[last],
+        'previous_best': previous_best,
+        'min_reps': session_min_reps[last],
+    }
+
+
+def classify(trends):
+    # Statut de chaque exercice : progression, maintien ou décharge
+    declining = trends['e1rm'] < trends['previous_best'] * (1 - DELOAD_DROP)
+    declining |= trends['slope'] * (trends['sessions'] - 1) < -DELOAD_DROP * trends['previous_best']
+    deload = (trends['sessions'] >= DELOAD_MIN_SESSIONS) & declining
+    progress = ~deload & (trends['min_reps'] >= REP_RANGE[1])
+    return np.where(deload, 'décharge', np.where(progress, 'progression', 'maintien'))
+
+
+def next_sets(status, last_sets, num_sets):
+    # Séries suggérées à partir de celles de la dernière séance
+    suggested = []
+    for set_number in range(num_sets):
+        weight, reps = last_sets[min(set_number, len(last_sets) - 1)]
+        if status == 'progression':
+            suggested.append((round_weight(weight + WEIGHT_INCREMENT), REP_RANGE[0]))
+        elif status == 'décharge':
+            suggested.append((round_weight(weight * DELOAD_FACTOR), int(reps)))
+        else:
+            suggested.append((float(weight), int(min(reps + 1, REP_RANGE[1]))))
+    return suggested
+
+
+def recommend(workout, user_id=db.DEFAULT_USER_ID, now=None):
+    """Recommandations pour chaque exercice d'une journée du programme.
+
+    Une seule requête (db.get_recent_sets) pour tous les exercices, puis
+    des calculs NumPy sur l'ensemble des séries lues.
+    """
+    since = int(now or time.time()) - LOOKBACK_DAYS * 86400
+    rows = db.get_recent_sets(workout.exercise_names, user_id, HISTORY_SESSIONS, since)
+    recommendations = {
+        exercise.name: Recommendation(exercise.name, 'nouveau', [])
+        for exercise in workout.exercises
+    }
+    if not rows:
+        return recommendations
+
+    exercise_ids, names, session_ids, _dates, weights, reps = zip(*rows)
+    exercise_ids = np.array(exercise_ids, dtype=np.int64)
+    weights = np.array(weights, dtype=np.float64)
+    reps = np.array(reps, dtype=np.int64)
+    trends = session_trends(exercise_ids, np.array(session_ids, dtype=np.int64), weights, reps)
+    statuses = classify(trends)
+
+    session_starts = np.append(trends['session_starts'], len(rows))
+    num_sets = {exercise.name: exercise.num_sets for exercise in workout.exercises}
+    for index, last in enumerate(trends['last']):
+        start, end = session_starts[last], session_starts[last + 1]
+        name = names[start]
+        recommendations[name] = Recommendation(
+            name,
+            str(statuses[index]),
+            next_sets(statuses[index], list(zip(weights[start:end], reps[start:end])), num_sets[name]),
+            float(trends['e1rm'][index]),
+            float(trends['slope'][index]),
+            int(trends['sessions'][index]),
+        )
+    return recommendations
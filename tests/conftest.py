@@ -0,0 +1,32 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Modules de l'application, à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import exporter
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # Base neuve, migrée, propre à chaque test
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'workout.db'))
+    db.init_database()
+    yield
+    db.get_pool().close()
+
+
+@pytest.fixture
+def paris(monkeypatch):
+    # Fuseau avec heure d'été, quel que soit celui de la machine
+    monkeypatch.setenv('TZ', 'Europe/Paris')
+    time.tzset()
+    exporter.local_datetime.cache_clear()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+    exporter.local_datetime.cache_clear()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+import analytics
+
+
+def reference_lttb(x, y, budget):
+    # Algorithme d'origine (Steinarsson), point par point
+    n = len(y)
+    every = (n - 2) / (budget - 2)
+    selected = [0]
+    previous = 0
+    for bucket in range(budget - 2):
+        start, end = int(bucket * every) + 1, int((bucket + 1) * every) + 1
+        next_start, next_end = end, min(int((bucket + 2) * every) + 1, n)
+        next_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        next_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        areas = [
+            abs((x[previous] - next_x) * (y[index] - y[previous])
+                - (x[previous] - x[index]) * (next_y - y[previous]))
+            for index in range(start, end)
+        ]
+        previous = start + areas.index(max(areas))
+        selected.append(previous)
+    return selected + [n - 1]
+
+
+def test_lttb_matches_reference_algorithm():
+    rng = np.random.default_rng(7)
+    x = np.cumsum(rng.integers(1, 86400 * 3, 5000)).astype(np.float64)
+    y = np.cumsum(rng.normal(0, 2.5, 5000))
+    for budget in (3, 10, 400, 4999):
+        assert analytics.lttb(x, y, budget).tolist() == reference_lttb(x.tolist(), y.tolist(), budget)
+
+
+def test_lttb_keeps_extremes_and_bounds():
+    y = np.zeros(10_000)
+    y[2_345], y[7_777] = 180.0, -50.0
+    selected = analytics.lttb(np.arange(10_000), y, 50)
+
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 9_999
+    assert np.all(np.diff(selected) > 0)
+    assert {2_345, 7_777} <= set(selected.tolist())
+    # Série déjà sous le budget : tous les points
+    assert analytics.lttb(np.arange(20), np.ones(20), 50).tolist() == list(range(20))
+
+
+def test_downsample_keeps_rows_of_the_frame():
+    dates = pd.date_range('2015-01-01', periods=3_000, freq='D')
+    frame = pd.DataFrame({'date': dates, 'e1rm': np.linspace(60.0, 140.0, 3_000), 'exercise': 'Squat'})
+
+    sampled = analytics.downsample(frame, 'date', 'e1rm', budget=100)
+    assert len(sampled) == 100
+    assert list(sampled.columns) == list(frame.columns)
+    assert sampled['date'].iloc[0] == dates[0] and sampled['date'].iloc[-1] == dates[-1]
+    assert analytics.downsample(frame.head(50), 'date', 'e1rm', budget=100).equals(frame.head(50))
+
+
+def test_period_volume_groups_weeks_by_month_over_budget():
+    weeks = pd.date_range('2010-01-04', periods=600, freq='W-MON')
+    weekly = pd.DataFrame({'week': weeks, 'volume': 1000.0, 'sets': 12})
+
+    assert analytics.period_volume(weekly, budget=600)[1] == 'semaine'
+    monthly, period = analytics.period_volume(weekly, budget=400)
+    assert period == 'mois'
+    assert len(monthly) <= 400
+    assert monthly['volume'].sum() == weekly['volume'].sum()
+    assert monthly['sets'].sum() == weekly['sets'].sum()
@@ -0,0 +1,117 @@
+import io
+
+import changelog
+import columnar
+import db
+
+
+def save_sessions():
+    warmups = [{'name': 'Rameur', 'duration': 10, 'notes': ''}]
+    finisher = {'name': 'Gainage', 'duration': 5, 'notes': 'dur'}
+    first = db.save_session('PUSH (Lundi)', [
+        {'name': 'Pec deck', 'weight': 40.0, 'reps': 10},
+        {'name': 'Pec deck', 'weight': 42.5, 'reps': 8},
+    ], warmups, finisher, 1_700_000_000)
+    second = db.save_session('PULL (Mardi)', [
+        {'name': 'Tirage vertical', 'weight': 50.0, 'reps': 12},
+    ], warmups, None, 1_700_086_400, notes='genou sensible')
+    return first, second
+
+
+def test_replay_matches_database(database):
+    first, second = save_sessions()
+    with db.transaction() as conn:
+        conn.execute('UPDATE exercises SET weight = 45.0, reps = 6 WHERE session_id = ?', (first,))
+        conn.execute("UPDATE sessions SET notes = 'corrigée' WHERE id = ?", (first,))
+        # personal_records (non répliquée) référence aussi la séance
+        for table in ('exercises', 'warmups', 'finishers', 'personal_records'):
+            conn.execute(f'DELETE FROM {table} WHERE session_id = ?', (second,))
+        conn.execute('DELETE FROM sessions WHERE id = ?', (second,))
+
+    expected, replayed = changelog.verify_replay()
+
+    assert set(expected) == set(db.CHANGELOG_TABLES)
+    assert replayed == expected
+
+
+def test_apply_export_to_empty_database(database, tmp_path, monkeypatch):
+    first, _second = save_sessions()
+    with db.transaction() as conn:
+        conn.execute('UPDATE exercises SET weight = 45.0 WHERE session_id = ?', (first,))
+    export = io.StringIO()
+    changelog.export_changes(export)
+    with db.connection() as conn:
+        expected = changelog.table_checksums(conn)
+
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'copie.db'))
+    db.init_database()
+    changelog.apply_changes(export.getvalue().splitlines())
+    with db.connection() as conn:
+        # Chaque base a son identifiant : seules les tables répliquées comptent
+        assert changelog.table_checksums(conn) == expected
+    # Export rejoué : rien de nouveau à appliquer
+    assert changelog.apply_changes(export.getvalue().splitlines())[0] == 0
+    db.get_pool().close()
+
+
+def test_applied_update_reaches_columnar_copy(database, tmp_path, monkeypatch):
+    first, _second = save_sessions()
+    source = db.DB_PATH
+    export = io.StringIO()
+    _count, last = changelog.export_changes(export)
+
+    copy = str(tmp_path / 'copie.db')
+    monkeypatch.setattr(db, 'DB_PATH', copy)
+    db.init_database()
+    changelog.apply_changes(export.getvalue().splitlines())
+    assert 45.0 not in columnar.load()['weight']
+
+    monkeypatch.setattr(db, 'DB_PATH', source)
+    with db.transaction() as conn:
+        conn.execute('UPDATE exercises SET weight = 45.0 WHERE session_id = ?', (first,))
+    export = io.StringIO()
+    changelog.export_changes(export, since=last)
+
+    monkeypatch.setattr(db, 'DB_PATH', copy)
+    changelog.apply_changes(export.getvalue().splitlines())
+    assert list(columnar.load()['weight']) == [45.0, 45.0, 50.0]
+    db.get_pool().close()
+
+
+def test_applied_delete_clears_local_references(database, tmp_path, monkeypatch):
+    _first, second = save_sessions()
+    with db.transaction() as conn:
+        fran = conn.execute("SELECT id FROM wods WHERE name = 'Fran'").fetchone()[0]
+        result, _record = db.record_wod_result(conn, fran, db.DEFAULT_USER_ID, seconds=240)
+    source = db.DB_PATH
+    export = io.StringIO()
+    _count, last = changelog.export_changes(export)
+
+    copy = str(tmp_path / 'copie.db')
+    monkeypatch.setattr(db, 'DB_PATH', copy)
+    db.init_database()
+    changelog.apply_changes(export.getvalue().splitlines())
+    with db.connection() as conn:
+        # Records et classement recalculés sur la copie : ils référencent
+        # la séance et le résultat supprimés ensuite à la source
+        assert conn.execute('SELECT COUNT(*) FROM personal_records WHERE session_id = ?', (second,)).fetchone()[0]
+        assert conn.execute('SELECT COUNT(*) FROM wod_bests WHERE result_id = ?', (result,)).fetchone()[0]
+
+    monkeypatch.setattr(db, 'DB_PATH', source)
+    with db.transaction() as conn:
+        for table in ('exercises', 'warmups', 'finishers', 'personal_records'):
+            conn.execute(f'DELETE FROM {table} WHERE session_id = ?', (second,))
+        conn.execute('DELETE FROM sessions WHERE id = ?', (second,))
+        conn.execute('DELETE FROM wod_bests WHERE result_id = ?', (result,))
+        conn.execute('DELETE FROM wod_results WHERE id = ?', (result,))
+    export = io.StringIO()
+    changelog.export_changes(export, since=last)
+    with db.connection() as conn:
+        expected = changelog.table_checksums(conn)
+
+    monkeypatch.setattr(db, 'DB_PATH', copy)
+    changelog.apply_changes(export.getvalue().splitlines())
+    with db.connection() as conn:
+        assert changelog.table_checksums(conn) == expected
+        assert conn.execute('SELECT COUNT(*) FROM wod_bests').fetchone()[0] == 0
+    db.get_pool().close()
@@ -0,0 +1,54 @@
+import columnar
+import db
+
+
+def save(weight, date):
+    return db.save_session('PUSH (Lundi)', [{'name': 'Pec deck', 'weight': weight, 'reps': 10}], [], None, date)
+
+
+def test_sync_appends_new_sets(database):
+    save(40.0, 1_700_000_000)
+    assert columnar.sync() == 1
+    # Journal inchangé : rien à relire
+    assert columnar.sync() == 0
+    save(42.5, 1_700_086_400)
+    assert columnar.sync() == 1
+    assert list(columnar.load()['weight']) == [40.0, 42.5]
+
+
+def test_sync_rebuilds_after_in_place_update(database):
+    first = save(40.0, 1_700_000_000)
+    save(42.5, 1_700_086_400)
+    columnar.sync()
+    generation = columnar.version()[0]
+    with db.transaction() as conn:
+        conn.execute('UPDATE exercises SET weight = 45.0 WHERE session_id = ?', (first,))
+        conn.execute('UPDATE sessions SET date = date + 3600 WHERE id = ?', (first,))
+
+    columns = columnar.load()
+    assert columnar.version()[0] != generation
+    assert list(columns['weight']) == [45.0, 42.5]
+    assert columns['date'][0] == 1_700_003_600
+
+
+def test_draft_writes_leave_copy_untouched(database):
+    save(40.0, 1_700_000_000)
+    columnar.sync()
+    version = columnar.version()
+    draft_id = db.start_draft('PUSH (Lundi)')
+    with db.transaction() as conn:
+        db.write_draft_set(conn, draft_id, 'Pec deck', 1, 1, 50.0, 8)
+    assert columnar.sync() == 0
+    assert columnar.version() == version
+
+
+def test_large_integers_keep_their_precision(database):
+    session_id = 2 ** 53 + 1
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO sessions (id, user_id, date, type) VALUES (?, ?, ?, 'Import')",
+                     (session_id, db.DEFAULT_USER_ID, 1_700_000_000))
+        exercise_id = db.get_exercise_ids(conn, ['Pec deck'])['Pec deck']
+        conn.execute('INSERT INTO exercises (session_id, exercise_id, weight, reps) VALUES (?, ?, 40.0, 10)',
+                     (session_id, exercise_id))
+    columns = columnar.load()
+    assert int(columns['session_id'][0]) == session_id
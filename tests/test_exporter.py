@@ -0,0 +1,110 @@
+import csv
+import gc
+import io
+import json
+import os
+import time
+
+import pytest
+
+import db
+import exporter
+import importer
+
+
+def test_parquet_dates_match_csv_across_dst(database, paris):
+    pq = pytest.importorskip('pyarrow.parquet')
+    # 15 janvier (UTC+1) et 15 juillet (UTC+2), 18:00 à Paris
+    for timestamp in (1705338000, 1721059200):
+        db.save_session('PUSH (Lundi)', [{'name': 'Pec deck', 'weight': 40.0, 'reps': 10}],
+                        [], None, timestamp)
+
+    text = io.StringIO()
+    exporter.export(text, 'csv', db.ALL_USERS)
+    csv_dates = [row['date'] for row in csv.DictReader(io.StringIO(text.getvalue()))]
+    binary = io.BytesIO()
+    exporter.export(binary, 'parquet', db.ALL_USERS)
+    binary.seek(0)
+    parquet_dates = [value.isoformat() for value in pq.read_table(binary).column('date').to_pylist()]
+
+    assert csv_dates == ['2024-01-15T18:00:00', '2024-07-15T18:00:00']
+    assert parquet_dates == csv_dates
+
+
+def save_history():
+    camille = db.create_user('Camille')
+    db.save_session('PUSH (Lundi)', [{'name': 'Pec deck', 'weight': 40.0, 'reps': 10},
+                                     {'name': 'Pec deck', 'weight': 40.0, 'reps': 10}],
+                    [], None, 1_700_000_000, notes='épaule, "gauche"')
+    db.save_session('LEG (Samedi)', [{'name': 'Squat', 'weight': 100.0, 'reps': 5}], [], None,
+                    int(time.time()) - 86400)
+    db.save_session('LEG (Samedi)', [{'name': 'Squat', 'weight': 60.0, 'reps': 8}], [], None,
+                    1_700_000_000, user_id=camille)
+    return camille
+
+
+def exported(file_format, user_id, days_filter=None, session_type=None):
+    text = io.StringIO()
+    count = exporter.export(text, file_format, user_id, days_filter, session_type)
+    return count, text.getvalue()
+
+
+def test_exported_csv_reimports_as_the_same_history(database, tmp_path):
+    save_history()
+    count, text = exported('csv', db.DEFAULT_USER_ID)
+    assert count == 3
+    path = tmp_path / 'export.csv'
+    path.write_text(text, encoding='utf-8')
+
+    other = db.create_user('Sacha')
+    importer.import_file(str(path), user_id=other, report=lambda *args: None)
+    assert exported('csv', other) == (count, text)
+
+
+def test_jsonl_rows_follow_the_filters(database):
+    camille = save_history()
+    _count, text = exported('jsonl', camille)
+    assert [json.loads(line) for line in text.splitlines()] == [{
+        'date': exporter.local_iso(1_700_000_000), 'type': 'LEG (Samedi)', 'exercise': 'Squat',
+        'weight': 60.0, 'reps': 8, 'notes': '',
+    }]
+    assert exported('csv', db.ALL_USERS)[0] == 4
+    assert exported('csv', db.ALL_USERS, days_filter=30)[0] == 1
+    assert exported('csv', db.DEFAULT_USER_ID, session_type='PUSH (Lundi)')[0] == 2
+    with pytest.raises(ValueError):
+        exported('xlsx', db.ALL_USERS)
+
+
+def test_rows_are_streamed_in_chunks(database):
+    save_history()
+    with db.connection() as conn:
+        chunks = list(exporter.iter_chunks(conn, db.ALL_USERS, chunk_size=3))
+    assert [len(rows) for rows in chunks] == [3, 1]
+    # Ordre chronologique, séries d'une séance dans l'ordre de saisie
+    dates = [row[0] for rows in chunks for row in rows]
+    assert dates == sorted(dates)
+
+
+def test_temporary_export_removes_its_file(database, monkeypatch):
+    save_history()
+    export = exporter.TemporaryExport('csv', db.ALL_USERS)
+    assert export.count == 4 and os.path.exists(export.path)
+    export.close()
+    assert not os.path.exists(export.path)
+
+    def failing(chunks, f):
+        raise OSError("disque plein")
+
+    removed = []
+
+    def remove_file(path):
+        removed.append(path)
+        os.remove(path)
+
+    # Export en échec : le fichier commencé est supprimé avec l'objet
+    monkeypatch.setitem(exporter.WRITERS, 'csv', failing)
+    monkeypatch.setattr(exporter, '_remove_file', remove_file)
+    with pytest.raises(OSError):
+        exporter.TemporaryExport('csv', db.ALL_USERS)
+    gc.collect()
+    assert len(removed) == 1 and not os.path.exists(removed[0])
@@ -0,0 +1,20 @@
+import pytest
+
+import db
+
+
+def test_history_reads_are_scoped_to_one_athlete(database):
+    other = db.create_user('Camille')
+    mine = db.save_session('PUSH (Lundi)', [{'name': 'Pec deck', 'weight': 40.0, 'reps': 10}], [], None,
+                           1_700_000_000, notes='genou')
+    theirs = db.save_session('PUSH (Lundi)', [{'name': 'Pec deck', 'weight': 60.0, 'reps': 8}], [], None,
+                             1_700_086_400, user_id=other, notes='genou')
+
+    assert [session['id'] for session in db.get_sessions_history(db.DEFAULT_USER_ID)] == [mine]
+    assert [session['id'] for session in db.get_sessions_page(other)[0]] == [theirs]
+    assert [session['id'] for session in db.search_sessions('genou', other)] == [theirs]
+    assert db.get_session_details(theirs, db.DEFAULT_USER_ID) is None
+    # Tous les athlètes seulement sur demande explicite
+    assert [session['id'] for session in db.get_sessions_history(db.ALL_USERS)] == [theirs, mine]
+    with pytest.raises(ValueError):
+        db.get_sessions_history(None)
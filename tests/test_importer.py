@@ -0,0 +1,73 @@
+import db
+import importer
+
+CSV = '''date;exercice;poids;reps
+01/03/2024 18:00;Pec deck;40;10
+01/03/2024 18:00;Pec deck;42,5;8
+02/03/2024 18:00;Tirage vertical;50;12
+03/03/2024 18:00;Tirage vertical;52,5;10
+'''
+
+
+def counts():
+    with db.connection() as conn:
+        return (conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0],
+                conn.execute('SELECT COUNT(*) FROM exercises').fetchone()[0],
+                conn.execute('SELECT COUNT(*) FROM session_search').fetchone()[0])
+
+
+def test_restart_replaces_previous_import(database, tmp_path):
+    path = tmp_path / 'historique.csv'
+    path.write_text(CSV, encoding='utf-8')
+    importer.import_file(str(path), chunk_size=2, report=lambda message: None)
+    # Séance enregistrée depuis l'application entre les deux imports
+    db.save_session('PUSH (Lundi)', [{'name': 'Pec deck', 'weight': 45.0, 'reps': 6}], [], None, None)
+    assert counts() == (4, 5, 4)
+
+    result = importer.import_file(str(path), chunk_size=2, restart=True, report=lambda message: None)
+
+    assert result['sessions'] == 3
+    assert counts() == (4, 5, 4)
+    stats = db.get_stats()
+    assert (stats['total_sessions'], stats['total_sets']) == (4, 5)
+
+
+def session_ids():
+    with db.connection() as conn:
+        return [row[0] for row in conn.execute('SELECT id FROM sessions ORDER BY id')]
+
+
+def test_restart_does_not_reuse_session_ids(database, tmp_path):
+    path = tmp_path / 'historique.csv'
+    path.write_text(CSV, encoding='utf-8')
+    importer.import_file(str(path), report=lambda message: None)
+    previous = session_ids()
+
+    importer.import_file(str(path), restart=True, report=lambda message: None)
+
+    # Les séances supprimées gardent leurs ids dans le journal et les exports
+    assert min(session_ids()) > max(previous)
+
+
+def test_live_import_keeps_triggers_for_concurrent_saves(database, tmp_path, monkeypatch):
+    path = tmp_path / 'historique.csv'
+    path.write_text(CSV, encoding='utf-8')
+    chunked = importer.chunked
+
+    def saving_between_chunks(iterable, size):
+        # Séance enregistrée par l'application entre deux lots de l'import
+        for index, chunk in enumerate(chunked(iterable, size)):
+            if index == 1:
+                with db.connection() as conn:
+                    assert not conn.execute('SELECT COUNT(*) FROM deferred_schema').fetchone()[0]
+                db.save_session('PUSH (Lundi)', [{'name': 'Pec deck', 'weight': 45.0, 'reps': 6}],
+                                [], None, None, notes='pendant import')
+            yield chunk
+
+    monkeypatch.setattr(importer, 'chunked', saving_between_chunks)
+    importer.import_file(str(path), chunk_size=2, report=lambda message: None)
+
+    assert counts() == (4, 5, 4)
+    assert [session['id'] for session in db.search_sessions('pendant', db.DEFAULT_USER_ID)] == [3]
+    stored, computed = db.check_stats_rollup()
+    assert stored == computed
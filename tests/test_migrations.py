@@ -0,0 +1,111 @@
+import sqlite3
+
+import pytest
+
+import changelog
+import db
+
+# Schéma créé par la première version de l'application, sans user_version
+LEGACY_SCHEMA = '''
+    CREATE TABLE sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        type TEXT,
+        notes TEXT
+    );
+    CREATE TABLE exercises (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        name TEXT,
+        weight REAL,
+        reps INTEGER,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    );
+    CREATE TABLE warmups (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        activity TEXT,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    );
+    CREATE TABLE finishers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        activity TEXT,
+        duration INTEGER,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    );
+'''
+
+
+@pytest.fixture
+def legacy_database(tmp_path, monkeypatch):
+    path = str(tmp_path / 'workout.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    # Dates texte en heure locale, 18:00 à Paris en hiver puis en été
+    conn.executemany('INSERT INTO sessions (id, date, type, notes) VALUES (?, ?, ?, ?)', [
+        (1, '2024-01-15 18:00:00', 'LEG (Samedi)', 'genou sensible'),
+        (2, '2024-07-15 18:00:00', 'LEG (Samedi)', ''),
+    ])
+    conn.executemany('INSERT INTO exercises (session_id, name, weight, reps) VALUES (?, ?, ?, ?)', [
+        (1, 'Squat', 90.0, 5),
+        (1, 'Squat', 90.0, 5),
+        (2, 'Squat', 100.0, 5),
+        # Série sans séance : non reprise
+        (None, 'Squat', 200.0, 1),
+    ])
+    conn.execute("INSERT INTO warmups (session_id, activity) VALUES (1, 'Vélo (10 min)')")
+    conn.execute("INSERT INTO finishers (session_id, activity, duration) VALUES (2, 'Tapis', 20)")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db, 'DB_PATH', path)
+    yield
+    db.get_pool().close()
+
+
+def test_legacy_database_migrates_to_current_schema(legacy_database, paris):
+    db.init_database()
+
+    with db.connection() as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == db.SCHEMA_VERSION
+    history = db.get_sessions_history(db.DEFAULT_USER_ID)
+    assert [session['date'] for session in history] == [1721059200, 1705338000]
+    assert [(exercise['name'], exercise['weight']) for exercise in history[1]['exercises']] == [
+        ('Squat', 90.0), ('Squat', 90.0)
+    ]
+    assert history[0]['finishers'] == [{'activity': 'Tapis', 'duration': 20, 'notes': ''}]
+
+    # Tables dérivées recalculées depuis l'historique repris
+    assert db.get_personal_records(['Squat'])['Squat'][:2] == (100.0, 5)
+    assert db.get_stats() == {'total_sessions': 2, 'total_sets': 3, 'total_volume': 1400.0,
+                              'max_weight': 100.0}
+    assert [day['day'] for day in db.get_daily_summary('2024-01-01', '2024-12-31')] == [
+        '2024-01-15', '2024-07-15'
+    ]
+    assert [session['id'] for session in db.search_sessions('genou', db.DEFAULT_USER_ID)] == [1]
+    # Lignes existantes journalisées : le journal reconstruit toute la base
+    expected, replayed = changelog.verify_replay()
+    assert replayed == expected
+
+
+def test_migrations_run_once(database):
+    with db.connection() as conn:
+        wods = conn.execute('SELECT COUNT(*) FROM wods').fetchone()[0]
+        changes = conn.execute('SELECT COUNT(*) FROM changelog').fetchone()[0]
+        assert db.migrate(conn) == db.SCHEMA_VERSION
+        assert conn.execute('SELECT COUNT(*) FROM wods').fetchone()[0] == wods
+        assert conn.execute('SELECT COUNT(*) FROM changelog').fetchone()[0] == changes
+
+
+def test_failed_migration_is_rolled_back(database, monkeypatch):
+    def broken(conn):
+        conn.execute('CREATE TABLE half_done (id INTEGER PRIMARY KEY)')
+        raise sqlite3.OperationalError("migration interrompue")
+
+    monkeypatch.setattr(db, 'MIGRATIONS', db.MIGRATIONS + ((db.SCHEMA_VERSION + 1, broken),))
+    with db.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            db.migrate(conn)
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == db.SCHEMA_VERSION
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+        assert conn.execute('PRAGMA foreign_keys').fetchone()[0] == 1
@@ -0,0 +1,53 @@
+import itertools
+
+import db
+import movements
+
+
+def brute_force(catalogue, filters):
+    def accepts(movement, facet, value):
+        if not value:
+            return True
+        accepted = [value] if isinstance(value, str) else value
+        return getattr(movement, facet) in accepted
+
+    return [movement for movement in catalogue
+            if all(accepts(movement, facet, value) for facet, value in filters.items())]
+
+
+def test_search_matches_a_full_scan(database):
+    with db.connection() as conn:
+        index = movements.load_index(conn)
+    assert len(index) == len(movements.catalogue())
+
+    for category, level in itertools.product((None,) + movements.FACETS['category'],
+                                             (None,) + movements.FACETS['level']):
+        for equipment in (None, ['Barre'], ['Haltères', 'Kettlebell'], []):
+            filters = {'category': category, 'level': level, 'equipment': equipment}
+            assert index.search(filters) == brute_force(index.movements, filters)
+
+
+def test_facet_counts_ignore_their_own_filter(database):
+    with db.connection() as conn:
+        index = movements.load_index(conn)
+    filters = {'category': 'Haltérophilie', 'level': 'Avancé', 'equipment': None}
+    counts = index.facet_counts(filters)
+
+    # Les autres niveaux restent comptés pour la catégorie choisie
+    assert counts['level'] == {
+        level: len(brute_force(index.movements, {'category': 'Haltérophilie', 'level': level}))
+        for level in movements.FACETS['level']
+    }
+    assert counts['equipment']['Barre'] == len(brute_force(index.movements, {**filters, 'equipment': 'Barre'}))
+    assert sum(counts['category'].values()) == len(brute_force(index.movements, {'level': 'Avancé'}))
+
+
+def test_results_are_sorted_and_unknown_values_match_nothing():
+    index = movements.FacetIndex(
+        movements.Movement(position, name, category, level, equipment)
+        for position, (name, category, level, equipment) in enumerate(movements.catalogue())
+    )
+    names = [movement.name for movement in index.search({})]
+    assert names == sorted(names, key=str.casefold)
+    assert index.search({'equipment': 'Trampoline'}) == []
+    assert movements.FacetIndex([]).search({'level': 'Débutant'}) == []
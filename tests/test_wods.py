@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+import db
+import wods
+
+JANUARY = 1_704_110_400  # 1er janvier 2024, midi UTC
+
+
+def wod_id(name):
+    return next(wod['id'] for wod in db.get_wods() if wod['name'] == name)
+
+
+def derived_tables():
+    with db.connection() as conn:
+        return (
+            conn.execute('SELECT wod_id, user_id, result_id, score, date FROM wod_bests ORDER BY 1, 2').fetchall(),
+            conn.execute('SELECT user_id, month, wod_type, results, prs FROM wod_trends ORDER BY 1, 2, 3').fetchall(),
+        )
+
+
+def test_leaderboard_ranks_best_result_per_athlete(database):
+    fran = wod_id('Fran')
+    camille, sacha = db.create_user('Camille'), db.create_user('Sacha')
+    db.save_wod_result(fran, db.DEFAULT_USER_ID, seconds=300, date=JANUARY)
+    assert db.save_wod_result(fran, db.DEFAULT_USER_ID, seconds=270, date=JANUARY + 86400)[1]
+    assert not db.save_wod_result(fran, db.DEFAULT_USER_ID, seconds=320, date=JANUARY + 2 * 86400)[1]
+    # Time cap atteint : classé après tous les temps
+    db.save_wod_result(fran, camille, reps=80, capped=True, date=JANUARY)
+    db.save_wod_result(fran, sacha, seconds=240, date=JANUARY)
+
+    leaderboard = db.get_leaderboard(fran)
+    assert [(row['rank'], row['athlete'], row['score']) for row in leaderboard] == [
+        (1, 'Sacha', '4:00'), (2, 'Athlète 1', '4:30'), (3, 'Camille', 'CAP + 80 reps'),
+    ]
+    assert db.get_wod_rank(fran, camille) == (3, 3)
+    assert db.get_wod_rank(wod_id('Cindy'), camille) == (None, 0)
+    assert db.get_wod_trends() == [('2024-01', 'For Time', 3, 1)]
+
+
+def test_incremental_stats_match_a_rebuild(database):
+    rng = random.Random(3)
+    athletes = [db.DEFAULT_USER_ID] + [db.create_user(f'Athlète {index}') for index in range(2, 6)]
+    fran, cindy = wod_id('Fran'), wod_id('Cindy')
+    for day in range(120):
+        date = JANUARY + day * 86400
+        for athlete in rng.sample(athletes, 2):
+            if rng.random() < 0.5:
+                capped = rng.random() < 0.2
+                db.save_wod_result(fran, athlete, reps=rng.randint(0, 89) if capped else 0,
+                                   seconds=rng.randint(150, 600), capped=capped, date=date)
+            else:
+                # Égalités fréquentes : le premier résultat reste le record
+                db.save_wod_result(cindy, athlete, rounds=rng.randint(15, 20), reps=rng.choice((0, 5)),
+                                   date=date)
+
+    incremental = derived_tables()
+    db.rebuild_wod_stats()
+    assert derived_tables() == incremental
+
+
+def test_invalid_results_are_rejected(database):
+    with pytest.raises(ValueError):
+        db.save_wod_result(wod_id('Fran'), db.DEFAULT_USER_ID)
+    with pytest.raises(ValueError):
+        db.save_wod_result(wod_id('Cindy'), db.DEFAULT_USER_ID, rounds=10, reps=wods.ROUND_WEIGHT)
+    assert derived_tables() == ([], [])
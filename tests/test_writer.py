@@ -0,0 +1,119 @@
+import logging
+import threading
+
+import pytest
+
+import db
+import writer
+
+
+def save_operation(conn, weight):
+    return db.insert_session(conn, 'PUSH (Lundi)', [{'name': 'Pec deck', 'weight': weight, 'reps': 10}],
+                             [], None, 1_700_000_000)
+
+
+def test_failed_commit_hook_is_logged_and_counted(database, caplog):
+    queue = writer.WriteBehindQueue()
+
+    def failing_sync():
+        raise OSError("disque plein")
+
+    queue.on_commit(failing_sync)
+    with caplog.at_level(logging.ERROR, logger='writer'):
+        queue.submit(save_operation, 40.0, changes_history=True).result(timeout=5)
+        queue.close()
+
+    metrics = queue.metrics()
+    assert metrics['hook_errors'] == 1
+    assert 'disque plein' in metrics['last_hook_error']
+    assert 'failing_sync' in caplog.text
+
+
+def hold(conn, started, release):
+    # Occupe le thread d'écriture : les opérations suivantes s'accumulent dans la file
+    started.set()
+    release.wait(5)
+
+
+def failing_operation(conn):
+    save_operation(conn, 50.0)
+    raise ValueError("série invalide")
+
+
+def blocked_queue(**options):
+    queue = writer.WriteBehindQueue(**options)
+    started, release = threading.Event(), threading.Event()
+    queue.submit(hold, started, release)
+    started.wait(5)
+    return queue, release
+
+
+def session_weights():
+    with db.connection() as conn:
+        return [row[0] for row in conn.execute('SELECT weight FROM exercises ORDER BY id')]
+
+
+def test_queued_operations_share_one_commit(database):
+    queue, release = blocked_queue()
+    futures = [queue.submit(save_operation, 40.0 + index) for index in range(5)]
+    release.set()
+
+    session_ids = [future.result(timeout=5) for future in futures]
+    # Ordre de soumission conservé
+    assert session_ids == sorted(session_ids)
+    assert session_weights() == [40.0, 41.0, 42.0, 43.0, 44.0]
+    metrics = queue.metrics()
+    assert metrics['batches'] == 2
+    assert metrics['last_batch_size'] == 5
+    queue.close()
+
+
+def test_failed_operation_is_rolled_back_alone(database):
+    queue, release = blocked_queue()
+    first = queue.submit(save_operation, 40.0)
+    failed = queue.submit(failing_operation)
+    last = queue.submit(save_operation, 42.5)
+    release.set()
+
+    with pytest.raises(ValueError):
+        failed.result(timeout=5)
+    assert first.result(timeout=5) and last.result(timeout=5)
+    assert session_weights() == [40.0, 42.5]
+    assert queue.metrics()['errors'] == 1
+    queue.close()
+
+
+def test_commit_hooks_follow_history_changes(database):
+    queue = writer.WriteBehindQueue()
+    calls = []
+    queue.on_commit(lambda: calls.append(session_weights()))
+
+    queue.submit(save_operation, 40.0).result(timeout=5)
+    assert calls == []
+    queue.submit(save_operation, 42.5, changes_history=True).result(timeout=5)
+    # Appelé après le commit : le lot est visible
+    assert calls == [[40.0, 42.5]]
+    with pytest.raises(ValueError):
+        queue.submit(failing_operation, changes_history=True).result(timeout=5)
+    assert len(calls) == 1
+    queue.close()
+
+
+def test_full_queue_rejects_new_writes(database):
+    queue, release = blocked_queue(max_queue=1, put_timeout=0.01)
+    queued = queue.submit(save_operation, 40.0)
+    with pytest.raises(RuntimeError):
+        queue.submit(save_operation, 42.5)
+    release.set()
+    queued.result(timeout=5)
+    queue.close()
+
+
+def test_close_drains_pending_writes(database):
+    queue, release = blocked_queue()
+    futures = [queue.submit(save_operation, 40.0), queue.submit(save_operation, 42.5)]
+    release.set()
+    queue.close()
+
+    assert all(future.done() for future in futures)
+    assert session_weights() == [40.0, 42.5]
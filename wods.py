@@ -0,0 +1,72 @@
+# Définitions des WODs et score des résultats, comparable quel que soit le
+# type : plus le score est haut, meilleur est le résultat
+
+# Types de WOD, dans l'ordre du formulaire
+WOD_TYPES = ('AMRAP', 'For Time', 'EMOM', 'Tabata', 'Chipper')
+
+# Types classés au temps (le plus court gagne) ; les autres aux répétitions
+TIMED_TYPES = ('For Time', 'Chipper')
+
+# AMRAP : les rounds complets priment, les reps du round entamé départagent
+ROUND_WEIGHT = 10_000
+
+# For Time non terminé dans le time cap : classé après tous les temps, au
+# nombre de reps faites
+CAPPED_SCORE = -10_000_000
+
+# WODs de référence : (nom, type, time cap en minutes, rounds, description,
+# mouvements (nom du catalogue, reps par round, charge en kg))
+BENCHMARK_WODS = (
+    ('Fran', 'For Time', 10, 1, "21-15-9 thrusters 43 kg, pull-ups",
+     (('Thruster (barre)', 45, 43.0), ('Kipping pull-up', 45, None))),
+    ('Grace', 'For Time', 10, 1, "30 clean and jerks 61 kg",
+     (('Clean and jerk (barre)', 30, 61.0),)),
+    ('Isabel', 'For Time', 10, 1, "30 snatches 61 kg",
+     (('Power snatch (barre)', 30, 61.0),)),
+    ('Karen', 'For Time', 15, 1, "150 wall balls 9 kg",
+     (('Wall ball', 150, 9.0),)),
+    ('Diane', 'For Time', 15, 1, "21-15-9 deadlifts 102 kg, handstand push-ups",
+     (('Deadlift (barre)', 45, 102.0), ('Kipping handstand push-up', 45, None))),
+    ('Annie', 'For Time', 15, 1, "50-40-30-20-10 double-unders, sit-ups",
+     (('Double-under', 150, None), ('Sit-up', 150, None))),
+    ('Helen', 'For Time', 20, 3, "3 rounds : 400 m course, 21 kettlebell swings 24 kg, 12 pull-ups",
+     (('Course à pied', 400, None), ('Kettlebell swing américain', 21, 24.0), ('Kipping pull-up', 12, None))),
+    ('Cindy', 'AMRAP', 20, None, "20 min : 5 pull-ups, 10 pompes, 15 air squats",
+     (('Kipping pull-up', 5, None), ('Pompe', 10, None), ('Air squat', 15, None))),
+)
+
+
+def is_timed(wod_type):
+    return wod_type in TIMED_TYPES
+
+
+def score(wod_type, rounds=0, reps=0, seconds=None, capped=False):
+    """Score d'un résultat : plus haut = meilleur, pour tous les types."""
+    if rounds < 0 or reps < 0:
+        raise ValueError("Rounds et reps doivent être positifs")
+    if is_timed(wod_type):
+        if capped:
+            return float(CAPPED_SCORE + reps)
+        if not seconds or seconds <= 0:
+            raise ValueError("Temps manquant pour un WOD chronométré")
+        return -float(seconds)
+    if wod_type == 'AMRAP':
+        if reps >= ROUND_WEIGHT:
+            raise ValueError(f"Plus de {ROUND_WEIGHT - 1} reps dans le round entamé")
+        return float(rounds * ROUND_WEIGHT + reps)
+    # EMOM, Tabata : total des reps
+    return float(reps)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def format_score(wod_type, rounds, reps, seconds, capped):
+    # Résultat tel qu'on l'annonce au tableau
+    if is_timed(wod_type):
+        return f"CAP + {reps} reps" if capped else format_duration(seconds)
+    if wod_type == 'AMRAP':
+        return f"{rounds} rounds + {reps} reps"
+    return f"{reps} reps"
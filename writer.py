@@ -0,0 +1,150 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import db
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Thread d'écriture unique devant SQLite.
+
+    Les écritures (fonctions `operation(conn, *args)` de db.py) sont mises
+    en file et exécutées par un seul thread, qui en regroupe plusieurs dans
+    une même transaction (group commit). L'appelant récupère un Future et
+    n'attend pas la fin de l'écriture. Chaque opération tourne dans son
+    propre SAVEPOINT : une opération en échec est annulée seule, les autres
+    du lot sont validées.
+    """
+
+    def __init__(self, pool=None, max_queue=256, max_batch=32, put_timeout=5.0):
+        self.pool = pool or db.get_pool()
+        self.max_batch = max_batch
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._commit_hooks = []
+        self._lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'operations': 0,
+            'errors': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'last_commit_ms': 0.0,
+            'max_commit_ms': 0.0,
+            'total_commit_ms': 0.0,
+            # Fonctions de on_commit en échec : données dérivées périmées
+            'hook_errors': 0,
+            'last_hook_error': None,
+        }
+        self._thread = threading.Thread(target=self._run, name='workout-writer', daemon=True)
+        self._thread.start()
+        # Vider la file avant l'arrêt du processus
+        atexit.register(self.close)
+
+    def submit(self, operation, *args, changes_history=False):
+        # changes_history : l'opération modifie l'historique des séances, les
+        # fonctions de on_commit sont appelées une fois son lot validé
+        future = Future()
+        try:
+            self._queue.put((operation, args, future, changes_history), timeout=self.put_timeout)
+        except queue.Full:
+            raise RuntimeError("File d'écriture saturée, réessayer dans un instant") from None
+        return future
+
+    def on_commit(self, callback):
+        # Appelé dans le thread d'écriture après chaque lot validé dont une
+        # opération modifiant l'historique a réussi (pas pour le seul journal
+        # de la séance en cours)
+        self._commit_hooks.append(callback)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_commit_ms'] = stats['total_commit_ms'] / stats['batches'] if stats['batches'] else 0.0
+        del stats['total_commit_ms']
+        return stats
+
+    def close(self, timeout=10):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            # Regrouper ce qui attend déjà dans la file, sans attendre davantage
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._write(batch)
+                    return
+                batch.append(job)
+            self._write(batch)
+
+    def _write(self, batch):
+        outcomes = []
+        started = time.perf_counter()
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    for operation, args, _future, _changes_history in batch:
+                        conn.execute('SAVEPOINT operation')
+                        try:
+                            result = operation(conn, *args)
+                        except Exception as e:
+                            conn.execute('ROLLBACK TO operation')
+                            conn.execute('RELEASE operation')
+                            outcomes.append((False, e))
+                        else:
+                            conn.execute('RELEASE operation')
+                            outcomes.append((True, result))
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            # Échec du commit lui-même (disque plein, base verrouillée...)
+            outcomes = [(False, e)] * len(batch)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        errors = sum(1 for ok, _ in outcomes if not ok)
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['operations'] += len(batch)
+            self._stats['errors'] += errors
+            self._stats['last_batch_size'] = len(batch)
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+            self._stats['last_commit_ms'] = elapsed_ms
+            self._stats['max_commit_ms'] = max(self._stats['max_commit_ms'], elapsed_ms)
+            self._stats['total_commit_ms'] += elapsed_ms
+
+        history_changed = any(ok and job[3] for job, (ok, _value) in zip(batch, outcomes))
+        if history_changed:
+            for callback in self._commit_hooks:
+                try:
+                    callback()
+                except Exception as e:
+                    name = getattr(callback, '__qualname__', repr(callback))
+                    logger.exception("Échec de %s après un lot validé", name)
+                    with self._lock:
+                        self._stats['hook_errors'] += 1
+                        self._stats['last_hook_error'] = f"{name} : {e}"
+
+        for (_operation, _args, future, _changes_history), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)